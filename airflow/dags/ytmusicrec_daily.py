@@ -7,14 +7,19 @@ from airflow import DAG
 from airflow.providers.standard.operators.python import PythonOperator
 from airflow.models.xcom_arg import XComArg
 
+from ytmusicrec.settings import xcom_handoff_mode
 from ytmusicrec.pipeline import (
     task_collect_youtube_to_mssql,
     task_score_themes_to_mssql_and_csv,
+    task_export_columnar,
     task_generate_prompts_to_mssql_and_md,
     task_publish_outputs,
 )
 
 LOCAL_TZ = pendulum.timezone("America/New_York")
+# reference: downstream tasks get only the run date and load themes/prompts themselves
+# (ytmusicrec/handoff.py), so XCom rows stay small.
+HANDOFF = xcom_handoff_mode()
 
 with DAG(
     dag_id="ytmusicrec_daily",
@@ -54,7 +59,17 @@ with DAG(
     generate = PythonOperator(
         task_id="generate_prompts_to_mssql_and_md",
         python_callable=task_generate_prompts_to_mssql_and_md,
-        op_kwargs={"run_date": run_date, "top_themes": top_themes},
+        op_kwargs=(
+            {"run_date": run_date}
+            if HANDOFF == "reference"
+            else {"run_date": run_date, "top_themes": top_themes, "profile_themes": score_out["profile_themes"]}
+        ),
+    )
+
+    export = PythonOperator(
+        task_id="export_columnar",
+        python_callable=task_export_columnar,
+        op_kwargs={"run_date": run_date},
     )
 
     gen_out = XComArg(generate)
@@ -62,12 +77,17 @@ with DAG(
     publish = PythonOperator(
         task_id="publish_outputs",
         python_callable=task_publish_outputs,
-        op_kwargs={
-            "run_date": run_date,
-            "top_themes": top_themes,
-            "suno": gen_out["suno"],
-            "repo_md_path": gen_out["repo_md_path"],
-        },
+        op_kwargs=(
+            {"run_date": run_date}
+            if HANDOFF == "reference"
+            else {
+                "run_date": run_date,
+                "top_themes": top_themes,
+                "suno": gen_out["suno"],
+                "repo_md_path": gen_out["repo_md_path"],
+            }
+        ),
     )
 
     collect >> score >> generate >> publish
+    score >> export
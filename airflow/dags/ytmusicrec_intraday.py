@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pendulum
+from airflow import DAG
+from airflow.providers.standard.operators.python import PythonOperator
+from airflow.models.xcom_arg import XComArg
+
+from ytmusicrec.pipeline import (
+    task_collect_youtube_to_mssql,
+    task_score_themes_to_mssql_and_csv,
+)
+
+LOCAL_TZ = pendulum.timezone("America/New_York")
+
+# Hourly delta collection + rescoring. Prompts/publishing stay on the daily DAG.
+with DAG(
+    dag_id="ytmusicrec_intraday",
+    description="ytmusicrec: incremental YouTube collection -> rescore today's themes",
+    schedule="15 * * * *",
+    start_date=pendulum.datetime(2026, 1, 1, tz=LOCAL_TZ),
+    catchup=False,
+    max_active_runs=1,
+    default_args={
+        "owner": "you",
+    },
+    tags=["ytmusicrec"],
+) as dag:
+
+    collect = PythonOperator(
+        task_id="collect_youtube_incremental",
+        python_callable=task_collect_youtube_to_mssql,
+        op_kwargs={"incremental": True},
+        retries=2,
+        retry_delay=timedelta(minutes=2),
+    )
+
+    score = PythonOperator(
+        task_id="score_themes_to_mssql_and_csv",
+        python_callable=task_score_themes_to_mssql_and_csv,
+        op_kwargs={"run_date": XComArg(collect)["run_date"]},
+    )
+
+    collect >> score
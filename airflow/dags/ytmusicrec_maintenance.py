@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pendulum
+from airflow import DAG
+from airflow.providers.standard.operators.python import PythonOperator
+
+from ytmusicrec.pipeline import task_apply_retention
+
+LOCAL_TZ = pendulum.timezone("America/New_York")
+
+# Off-hours housekeeping, well clear of the 09:00 daily run. Retention moves rows in
+# small batches, so an overlap with an intraday run only slows it down.
+with DAG(
+    dag_id="ytmusicrec_maintenance",
+    description="ytmusicrec: Videos retention (compress descriptions, archive stale videos)",
+    schedule="30 3 * * *",
+    start_date=pendulum.datetime(2026, 1, 1, tz=LOCAL_TZ),
+    catchup=False,
+    max_active_runs=1,
+    default_args={
+        "owner": "you",
+    },
+    tags=["ytmusicrec"],
+) as dag:
+
+    retention = PythonOperator(
+        task_id="apply_retention",
+        python_callable=task_apply_retention,
+        retries=1,
+        retry_delay=timedelta(minutes=10),
+    )
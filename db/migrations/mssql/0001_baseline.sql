@@ -1,5 +1,6 @@
--- ytmusicrec schema (idempotent)
--- NOTE: This file is executed via pyodbc. Do NOT use the 'GO' batch separator.
+-- 0001 baseline: the original idempotent schema.
+-- Kept idempotent so databases created before SchemaVersion existed upgrade cleanly.
+-- Executed via pyodbc; lines that are exactly GO are split into separate batches.
 
 IF OBJECT_ID('dbo.Videos','U') IS NULL
 BEGIN
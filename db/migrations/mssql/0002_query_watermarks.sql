@@ -0,0 +1,23 @@
+-- 0002: per (region, query string) high-water mark for incremental collection.
+-- Keyed by q rather than query_name because feedback-loop names (auto_N) are not stable.
+
+IF OBJECT_ID('dbo.QueryWatermarks', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.QueryWatermarks (
+    region_code NVARCHAR(10) NOT NULL,
+    q NVARCHAR(400) NOT NULL,
+    last_fetched_at DATETIME2 NOT NULL,
+    updated_at DATETIME2 NOT NULL CONSTRAINT DF_QueryWatermarks_updated_at DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_QueryWatermarks PRIMARY KEY (region_code, q)
+  );
+END
+GO
+
+-- Incremental runs look up already-stored videos inside the days_back window.
+IF NOT EXISTS (
+  SELECT 1 FROM sys.indexes
+  WHERE name = 'IX_Videos_PublishedAt' AND object_id = OBJECT_ID('dbo.Videos')
+)
+BEGIN
+  CREATE INDEX IX_Videos_PublishedAt ON dbo.Videos (published_at) INCLUDE (query);
+END
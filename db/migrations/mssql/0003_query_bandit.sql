@@ -0,0 +1,24 @@
+-- 0003: marginal-yield stats per query and persisted bandit state for the query scheduler.
+
+IF COL_LENGTH('dbo.DailyQueryStats', 'new_video_count') IS NULL
+BEGIN
+  ALTER TABLE dbo.DailyQueryStats ADD
+    new_video_count INT NULL,
+    score_sum FLOAT NULL,
+    quota_units INT NULL;
+END
+GO
+
+IF OBJECT_ID('dbo.QueryBanditState', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.QueryBanditState (
+    region_code NVARCHAR(10) NOT NULL,
+    q NVARCHAR(400) NOT NULL,
+    pulls INT NOT NULL,
+    reward_sum FLOAT NOT NULL,
+    reward_sq_sum FLOAT NOT NULL,
+    last_run_date DATE NULL,
+    updated_at DATETIME2 NOT NULL CONSTRAINT DF_QueryBanditState_updated_at DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_QueryBanditState PRIMARY KEY (region_code, q)
+  );
+END
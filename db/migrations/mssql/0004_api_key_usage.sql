@@ -0,0 +1,14 @@
+-- 0004: per-key YouTube quota ledger, one row per key per quota day (Pacific time).
+-- key_id is a truncated SHA-256 of the key; raw keys are never stored.
+
+IF OBJECT_ID('dbo.ApiKeyUsage', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.ApiKeyUsage (
+    usage_date DATE NOT NULL,
+    key_id NVARCHAR(16) NOT NULL,
+    units_used INT NOT NULL,
+    exhausted BIT NOT NULL,
+    updated_at DATETIME2 NOT NULL CONSTRAINT DF_ApiKeyUsage_updated_at DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_ApiKeyUsage PRIMARY KEY (usage_date, key_id)
+  );
+END
@@ -0,0 +1,28 @@
+-- 0005: multi-region collection.
+-- VideoRegions records which region(s) surfaced each video on a run date (dbo.Videos stays
+-- one row per video, which is the cross-region dedup); DailyRegionThemes holds per-region
+-- rankings next to the merged global ranking in dbo.DailyThemes.
+
+IF OBJECT_ID('dbo.VideoRegions', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.VideoRegions (
+    run_date DATE NOT NULL,
+    region_code NVARCHAR(10) NOT NULL,
+    video_id NVARCHAR(32) NOT NULL,
+    query NVARCHAR(200) NULL,
+    CONSTRAINT PK_VideoRegions PRIMARY KEY (run_date, region_code, video_id)
+  );
+END
+GO
+
+IF OBJECT_ID('dbo.DailyRegionThemes', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.DailyRegionThemes (
+    run_date DATE NOT NULL,
+    region_code NVARCHAR(10) NOT NULL,
+    theme NVARCHAR(200) NOT NULL,
+    score FLOAT NOT NULL,
+    examples_json NVARCHAR(MAX) NULL,
+    CONSTRAINT PK_DailyRegionThemes PRIMARY KEY (run_date, region_code, theme)
+  );
+END
@@ -0,0 +1,13 @@
+-- 0006: cached MinHash signatures for title-derived theme clustering (ytmusicrec/themes.py).
+-- algo identifies the tokenizer/hash version; rows of another version are recomputed.
+
+IF OBJECT_ID('dbo.VideoSignatures', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.VideoSignatures (
+    video_id NVARCHAR(32) NOT NULL CONSTRAINT PK_VideoSignatures PRIMARY KEY,
+    algo NVARCHAR(32) NOT NULL,
+    signature VARBINARY(512) NOT NULL,
+    terms NVARCHAR(1000) NOT NULL,
+    computed_at DATETIME2 NOT NULL CONSTRAINT DF_VideoSignatures_computed_at DEFAULT SYSUTCDATETIME()
+  );
+END
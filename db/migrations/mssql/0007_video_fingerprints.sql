@@ -0,0 +1,30 @@
+-- 0007: near-duplicate detection (ytmusicrec/dedup.py).
+-- Videos gains duration_seconds from contentDetails; VideoFingerprints holds each video's
+-- title SimHash and the canonical (earliest-seen) video of its duplicate group.
+
+IF COL_LENGTH('dbo.Videos', 'duration_seconds') IS NULL
+BEGIN
+  ALTER TABLE dbo.Videos ADD duration_seconds INT NULL;
+END
+GO
+
+IF OBJECT_ID('dbo.VideoFingerprints', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.VideoFingerprints (
+    video_id NVARCHAR(32) NOT NULL CONSTRAINT PK_VideoFingerprints PRIMARY KEY,
+    algo NVARCHAR(32) NOT NULL,
+    simhash BIGINT NULL,
+    duration_seconds INT NULL,
+    canonical_video_id NVARCHAR(32) NOT NULL,
+    published_at DATETIME2 NULL,
+    computed_at DATETIME2 NOT NULL CONSTRAINT DF_VideoFingerprints_computed_at DEFAULT SYSUTCDATETIME()
+  );
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VideoFingerprints_PublishedAt' AND object_id = OBJECT_ID('dbo.VideoFingerprints'))
+BEGIN
+  CREATE INDEX IX_VideoFingerprints_PublishedAt
+    ON dbo.VideoFingerprints (published_at)
+    INCLUDE (algo, simhash, duration_seconds, canonical_video_id);
+END
@@ -0,0 +1,21 @@
+-- 0008: top example videos per theme as rows instead of a JSON blob on DailyThemes.
+-- New writes leave DailyThemes.examples_json NULL; rows written before this migration keep
+-- their blob and are read through it (see fetch_daily_themes_range).
+
+IF OBJECT_ID('dbo.DailyThemeExamples', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.DailyThemeExamples (
+    run_date DATE NOT NULL,
+    theme NVARCHAR(200) NOT NULL,
+    rank TINYINT NOT NULL,
+    video_id NVARCHAR(32) NOT NULL,
+    score FLOAT NOT NULL,
+    CONSTRAINT PK_DailyThemeExamples PRIMARY KEY (run_date, theme, rank)
+  );
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_DailyThemeExamples_VideoId' AND object_id = OBJECT_ID('dbo.DailyThemeExamples'))
+BEGIN
+  CREATE INDEX IX_DailyThemeExamples_VideoId ON dbo.DailyThemeExamples (video_id);
+END
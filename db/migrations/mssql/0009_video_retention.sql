@@ -0,0 +1,34 @@
+-- 0009: retention for dbo.Videos (ytmusicrec/retention.py).
+-- VideoDescriptions holds COMPRESS()ed (gzip) descriptions moved out of Videos once a video
+-- is older than the inline window; readers COALESCE the inline column with DECOMPRESS().
+-- VideosArchive receives stale videos in small batches; PAGE compression suits its
+-- write-once, rarely-read rows (available on every edition since 2016 SP1).
+
+IF OBJECT_ID('dbo.VideoDescriptions', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.VideoDescriptions (
+    video_id NVARCHAR(32) NOT NULL CONSTRAINT PK_VideoDescriptions PRIMARY KEY,
+    description_gz VARBINARY(MAX) NOT NULL,
+    moved_at DATETIME2 NOT NULL CONSTRAINT DF_VideoDescriptions_moved_at DEFAULT SYSUTCDATETIME()
+  );
+END
+GO
+
+IF OBJECT_ID('dbo.VideosArchive', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.VideosArchive (
+    video_id NVARCHAR(32) NOT NULL,
+    query NVARCHAR(200) NULL,
+    title NVARCHAR(400) NULL,
+    description_gz VARBINARY(MAX) NULL,
+    channel_title NVARCHAR(200) NULL,
+    published_at DATETIME2 NULL,
+    view_count BIGINT NULL,
+    like_count BIGINT NULL,
+    comment_count BIGINT NULL,
+    duration_seconds INT NULL,
+    fetched_at DATETIME2 NOT NULL,
+    archived_at DATETIME2 NOT NULL CONSTRAINT DF_VideosArchive_archived_at DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_VideosArchive PRIMARY KEY (video_id) WITH (DATA_COMPRESSION = PAGE)
+  );
+END
@@ -0,0 +1,27 @@
+-- 0010: channel enrichment (ytmusicrec/channels.py).
+-- Videos (and VideosArchive) gain the uploading channel's id; Channels caches channels.list
+-- statistics, refreshed once fetched_at is older than channels.ttl_days. subscriber_count is
+-- NULL for channels that hide it.
+
+IF COL_LENGTH('dbo.Videos', 'channel_id') IS NULL
+BEGIN
+  ALTER TABLE dbo.Videos ADD channel_id NVARCHAR(32) NULL;
+END
+GO
+
+IF COL_LENGTH('dbo.VideosArchive', 'channel_id') IS NULL
+BEGIN
+  ALTER TABLE dbo.VideosArchive ADD channel_id NVARCHAR(32) NULL;
+END
+GO
+
+IF OBJECT_ID('dbo.Channels', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.Channels (
+    channel_id NVARCHAR(32) NOT NULL CONSTRAINT PK_Channels PRIMARY KEY,
+    subscriber_count BIGINT NULL,
+    video_count BIGINT NULL,
+    view_count BIGINT NULL,
+    fetched_at DATETIME2 NOT NULL
+  );
+END
@@ -0,0 +1,14 @@
+-- 0011: per-video feature store (ytmusicrec/features.py).
+-- One row per video with values derived once from its title: the normalized title tokens
+-- dedup fingerprints (normalize_title). Rows are computed for newly seen videos only, and only
+-- while dedup is enabled; a different `version` is recomputed.
+
+IF OBJECT_ID('dbo.VideoFeatures', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.VideoFeatures (
+    video_id NVARCHAR(32) NOT NULL CONSTRAINT PK_VideoFeatures PRIMARY KEY,
+    version SMALLINT NOT NULL,
+    title_tokens NVARCHAR(400) NULL,
+    computed_at DATETIME2 NOT NULL CONSTRAINT DF_VideoFeatures_computed_at DEFAULT SYSUTCDATETIME()
+  );
+END
@@ -0,0 +1,43 @@
+-- 0012: query profiles (ytmusicrec/profiles.py).
+-- One collection pass searches the union of every profile's queries, so dbo.Videos.query
+-- only remembers one of the queries that found a video. VideoQueries records every
+-- query string that returned each video on a run date; a profile's videos are the ones
+-- its queries returned. Each profile's ranking and prompts sit next to the global ones.
+
+IF OBJECT_ID('dbo.VideoQueries', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.VideoQueries (
+    run_date DATE NOT NULL,
+    q NVARCHAR(400) NOT NULL,
+    video_id NVARCHAR(32) NOT NULL,
+    CONSTRAINT PK_VideoQueries PRIMARY KEY (run_date, q, video_id)
+  );
+END
+GO
+
+IF OBJECT_ID('dbo.DailyProfileThemes', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.DailyProfileThemes (
+    run_date DATE NOT NULL,
+    profile NVARCHAR(64) NOT NULL,
+    theme NVARCHAR(200) NOT NULL,
+    score FLOAT NOT NULL,
+    examples_json NVARCHAR(MAX) NULL,
+    CONSTRAINT PK_DailyProfileThemes PRIMARY KEY (run_date, profile, theme)
+  );
+END
+GO
+
+IF OBJECT_ID('dbo.DailyProfilePrompts', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.DailyProfilePrompts (
+    run_date DATE NOT NULL,
+    profile NVARCHAR(64) NOT NULL,
+    rank INT NOT NULL,
+    tool NVARCHAR(10) NOT NULL,
+    prompt NVARCHAR(1000) NOT NULL,
+    theme_tags NVARCHAR(400) NULL,
+    created_at DATETIME2 NOT NULL CONSTRAINT DF_DailyProfilePrompts_CreatedAt DEFAULT (SYSUTCDATETIME()),
+    CONSTRAINT PK_DailyProfilePrompts PRIMARY KEY (run_date, profile, tool, rank)
+  );
+END
@@ -0,0 +1,22 @@
+-- 0013: memory profiles of pipeline stages (ytmusicrec/memprofile.py, Settings.memory_profile).
+-- One row per profiled stage execution: the region code for collect, '' for whole-run stages.
+-- Rows are only ever added, so a retried task leaves one row per attempt.
+
+IF OBJECT_ID('dbo.StageMemory', 'U') IS NULL
+BEGIN
+  CREATE TABLE dbo.StageMemory (
+    stage_memory_id BIGINT IDENTITY(1,1) NOT NULL CONSTRAINT PK_StageMemory PRIMARY KEY,
+    run_date DATE NOT NULL,
+    stage NVARCHAR(64) NOT NULL,
+    scope NVARCHAR(64) NOT NULL,
+    row_count INT NULL,
+    peak_bytes BIGINT NOT NULL,
+    retained_bytes BIGINT NOT NULL,
+    bytes_per_row FLOAT NULL,
+    max_rss_bytes BIGINT NULL,
+    seconds FLOAT NOT NULL,
+    top_sites_json NVARCHAR(MAX) NULL,
+    recorded_at DATETIME2 NOT NULL CONSTRAINT DF_StageMemory_RecordedAt DEFAULT (SYSUTCDATETIME())
+  );
+  CREATE INDEX IX_StageMemory_Stage_RunDate ON dbo.StageMemory (stage, run_date);
+END
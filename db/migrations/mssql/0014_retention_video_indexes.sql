@@ -0,0 +1,5 @@
+-- 0014: retention (ytmusicrec/retention.py) deletes an archived video's per-run side rows by
+-- video_id; without these indexes every batch would scan the whole table.
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VideoRegions_VideoId' AND object_id = OBJECT_ID('dbo.VideoRegions'))
+  CREATE INDEX IX_VideoRegions_VideoId ON dbo.VideoRegions (video_id);
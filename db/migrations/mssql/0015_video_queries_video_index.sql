@@ -0,0 +1,4 @@
+-- 0015: retention deletes an archived video's VideoQueries rows by video_id (see 0014).
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VideoQueries_VideoId' AND object_id = OBJECT_ID('dbo.VideoQueries'))
+  CREATE INDEX IX_VideoQueries_VideoId ON dbo.VideoQueries (video_id);
@@ -0,0 +1,91 @@
+-- 0001 baseline for the embedded SQLite backend.
+-- Mirrors db/migrations/mssql/0001_baseline.sql table-for-table; column types use the
+-- DATE/DATETIME declared types so ytmusicrec.sqlite_store converts them back to date/datetime.
+
+CREATE TABLE IF NOT EXISTS Videos (
+  video_id TEXT NOT NULL PRIMARY KEY,
+  query TEXT NULL,
+  title TEXT NULL,
+  description TEXT NULL,
+  channel_title TEXT NULL,
+  published_at DATETIME NULL,
+  view_count INTEGER NULL,
+  like_count INTEGER NULL,
+  comment_count INTEGER NULL,
+  fetched_at DATETIME NOT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_Videos_FetchedAt ON Videos (fetched_at);
+
+CREATE TABLE IF NOT EXISTS Runs (
+  run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  run_date DATE NOT NULL,
+  region_code TEXT NOT NULL,
+  query_count INTEGER NOT NULL,
+  video_count INTEGER NOT NULL,
+  created_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+CREATE UNIQUE INDEX IF NOT EXISTS UX_Runs_RunDate_Region ON Runs (run_date, region_code);
+
+CREATE TABLE IF NOT EXISTS DailyThemes (
+  run_date DATE NOT NULL,
+  theme TEXT NOT NULL,
+  score REAL NOT NULL,
+  examples_json TEXT NULL,
+  PRIMARY KEY (run_date, theme)
+);
+
+CREATE TABLE IF NOT EXISTS DailyPrompts (
+  prompt_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  run_date DATE NOT NULL,
+  tool TEXT NOT NULL,
+  prompt TEXT NOT NULL,
+  theme_tags TEXT NULL,
+  created_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+CREATE UNIQUE INDEX IF NOT EXISTS UX_DailyPrompts_Unique ON DailyPrompts (run_date, tool, prompt);
+
+CREATE TABLE IF NOT EXISTS QueryCache (
+  run_date DATE NOT NULL,
+  region_code TEXT NOT NULL,
+  query_name TEXT NOT NULL,
+  q TEXT NULL,
+  video_ids_json TEXT NOT NULL,
+  fetched_at DATETIME NOT NULL,
+  PRIMARY KEY (run_date, region_code, query_name)
+);
+
+CREATE TABLE IF NOT EXISTS DailyThemeTrends (
+  run_date DATE NOT NULL,
+  theme TEXT NOT NULL,
+  score REAL NOT NULL,
+  prev_score REAL NULL,
+  delta_1d REAL NULL,
+  avg_7d REAL NULL,
+  momentum REAL NULL,
+  computed_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  PRIMARY KEY (run_date, theme)
+);
+
+CREATE TABLE IF NOT EXISTS DailyQueryStats (
+  run_date DATE NOT NULL,
+  region_code TEXT NOT NULL,
+  query_name TEXT NOT NULL,
+  q TEXT NOT NULL,
+  video_count INTEGER NOT NULL,
+  total_views INTEGER NULL,
+  total_likes INTEGER NULL,
+  total_comments INTEGER NULL,
+  computed_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  PRIMARY KEY (run_date, region_code, query_name)
+);
+
+CREATE TABLE IF NOT EXISTS DailyPromptHistory (
+  run_date DATE NOT NULL,
+  tool TEXT NOT NULL,
+  prompt TEXT NOT NULL,
+  prompt_hash BLOB NOT NULL,
+  theme_tags TEXT NULL,
+  created_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  PRIMARY KEY (run_date, tool, prompt_hash)
+);
+CREATE INDEX IF NOT EXISTS IX_DailyPromptHistory_ToolDate ON DailyPromptHistory (tool, run_date);
@@ -0,0 +1,11 @@
+-- 0002: per (region, query string) high-water mark for incremental collection.
+
+CREATE TABLE IF NOT EXISTS QueryWatermarks (
+  region_code TEXT NOT NULL,
+  q TEXT NOT NULL,
+  last_fetched_at DATETIME NOT NULL,
+  updated_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  PRIMARY KEY (region_code, q)
+);
+
+CREATE INDEX IF NOT EXISTS IX_Videos_PublishedAt ON Videos (published_at);
@@ -0,0 +1,16 @@
+-- 0003: marginal-yield stats per query and persisted bandit state for the query scheduler.
+
+ALTER TABLE DailyQueryStats ADD COLUMN new_video_count INTEGER NULL;
+ALTER TABLE DailyQueryStats ADD COLUMN score_sum REAL NULL;
+ALTER TABLE DailyQueryStats ADD COLUMN quota_units INTEGER NULL;
+
+CREATE TABLE IF NOT EXISTS QueryBanditState (
+  region_code TEXT NOT NULL,
+  q TEXT NOT NULL,
+  pulls INTEGER NOT NULL,
+  reward_sum REAL NOT NULL,
+  reward_sq_sum REAL NOT NULL,
+  last_run_date DATE NULL,
+  updated_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  PRIMARY KEY (region_code, q)
+);
@@ -0,0 +1,10 @@
+-- 0004: per-key YouTube quota ledger, one row per key per quota day (Pacific time).
+
+CREATE TABLE IF NOT EXISTS ApiKeyUsage (
+  usage_date DATE NOT NULL,
+  key_id TEXT NOT NULL,
+  units_used INTEGER NOT NULL,
+  exhausted INTEGER NOT NULL,
+  updated_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  PRIMARY KEY (usage_date, key_id)
+);
@@ -0,0 +1,18 @@
+-- 0005: multi-region collection (see mssql/0005_multi_region.sql).
+
+CREATE TABLE IF NOT EXISTS VideoRegions (
+  run_date DATE NOT NULL,
+  region_code TEXT NOT NULL,
+  video_id TEXT NOT NULL,
+  query TEXT NULL,
+  PRIMARY KEY (run_date, region_code, video_id)
+);
+
+CREATE TABLE IF NOT EXISTS DailyRegionThemes (
+  run_date DATE NOT NULL,
+  region_code TEXT NOT NULL,
+  theme TEXT NOT NULL,
+  score REAL NOT NULL,
+  examples_json TEXT NULL,
+  PRIMARY KEY (run_date, region_code, theme)
+);
@@ -0,0 +1,9 @@
+-- 0006: cached MinHash signatures (see mssql/0006_video_signatures.sql).
+
+CREATE TABLE IF NOT EXISTS VideoSignatures (
+  video_id TEXT NOT NULL PRIMARY KEY,
+  algo TEXT NOT NULL,
+  signature BLOB NOT NULL,
+  terms TEXT NOT NULL,
+  computed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,15 @@
+-- 0007: near-duplicate detection (see mssql/0007_video_fingerprints.sql).
+
+ALTER TABLE Videos ADD COLUMN duration_seconds INTEGER NULL;
+
+CREATE TABLE IF NOT EXISTS VideoFingerprints (
+  video_id TEXT NOT NULL PRIMARY KEY,
+  algo TEXT NOT NULL,
+  simhash INTEGER NULL,
+  duration_seconds INTEGER NULL,
+  canonical_video_id TEXT NOT NULL,
+  published_at DATETIME NULL,
+  computed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS IX_VideoFingerprints_PublishedAt ON VideoFingerprints (published_at);
@@ -0,0 +1,12 @@
+-- 0008: top example videos per theme (see mssql/0008_daily_theme_examples.sql).
+
+CREATE TABLE IF NOT EXISTS DailyThemeExamples (
+  run_date DATE NOT NULL,
+  theme TEXT NOT NULL,
+  rank INTEGER NOT NULL,
+  video_id TEXT NOT NULL,
+  score REAL NOT NULL,
+  PRIMARY KEY (run_date, theme, rank)
+);
+
+CREATE INDEX IF NOT EXISTS IX_DailyThemeExamples_VideoId ON DailyThemeExamples (video_id);
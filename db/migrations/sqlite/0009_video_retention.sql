@@ -0,0 +1,24 @@
+-- 0009: retention for Videos (see mssql/0009_video_retention.sql).
+-- Descriptions are zlib-compressed in Python; readers use the ytm_unzip() SQL function
+-- registered in connect().
+
+CREATE TABLE IF NOT EXISTS VideoDescriptions (
+  video_id TEXT NOT NULL PRIMARY KEY,
+  description_gz BLOB NOT NULL,
+  moved_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS VideosArchive (
+  video_id TEXT NOT NULL PRIMARY KEY,
+  query TEXT NULL,
+  title TEXT NULL,
+  description_gz BLOB NULL,
+  channel_title TEXT NULL,
+  published_at DATETIME NULL,
+  view_count INTEGER NULL,
+  like_count INTEGER NULL,
+  comment_count INTEGER NULL,
+  duration_seconds INTEGER NULL,
+  fetched_at DATETIME NOT NULL,
+  archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,12 @@
+-- 0010: channel enrichment (see mssql/0010_channels.sql).
+
+ALTER TABLE Videos ADD COLUMN channel_id TEXT NULL;
+ALTER TABLE VideosArchive ADD COLUMN channel_id TEXT NULL;
+
+CREATE TABLE IF NOT EXISTS Channels (
+  channel_id TEXT NOT NULL PRIMARY KEY,
+  subscriber_count INTEGER NULL,
+  video_count INTEGER NULL,
+  view_count INTEGER NULL,
+  fetched_at DATETIME NOT NULL
+);
@@ -0,0 +1,8 @@
+-- 0011: per-video feature store (see mssql/0011_video_features.sql).
+
+CREATE TABLE IF NOT EXISTS VideoFeatures (
+  video_id TEXT NOT NULL PRIMARY KEY,
+  version INTEGER NOT NULL,
+  title_tokens TEXT NULL,
+  computed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
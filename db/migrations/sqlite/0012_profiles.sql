@@ -0,0 +1,28 @@
+-- 0012: query profiles (see mssql/0012_profiles.sql).
+
+CREATE TABLE IF NOT EXISTS VideoQueries (
+  run_date DATE NOT NULL,
+  q TEXT NOT NULL,
+  video_id TEXT NOT NULL,
+  PRIMARY KEY (run_date, q, video_id)
+);
+
+CREATE TABLE IF NOT EXISTS DailyProfileThemes (
+  run_date DATE NOT NULL,
+  profile TEXT NOT NULL,
+  theme TEXT NOT NULL,
+  score REAL NOT NULL,
+  examples_json TEXT NULL,
+  PRIMARY KEY (run_date, profile, theme)
+);
+
+CREATE TABLE IF NOT EXISTS DailyProfilePrompts (
+  run_date DATE NOT NULL,
+  profile TEXT NOT NULL,
+  rank INTEGER NOT NULL,
+  tool TEXT NOT NULL,
+  prompt TEXT NOT NULL,
+  theme_tags TEXT NULL,
+  created_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  PRIMARY KEY (run_date, profile, tool, rank)
+);
@@ -0,0 +1,17 @@
+-- 0013: memory profiles of pipeline stages (see mssql/0013_stage_memory.sql).
+
+CREATE TABLE IF NOT EXISTS StageMemory (
+  stage_memory_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  run_date DATE NOT NULL,
+  stage TEXT NOT NULL,
+  scope TEXT NOT NULL,
+  row_count INTEGER NULL,
+  peak_bytes INTEGER NOT NULL,
+  retained_bytes INTEGER NOT NULL,
+  bytes_per_row REAL NULL,
+  max_rss_bytes INTEGER NULL,
+  seconds REAL NOT NULL,
+  top_sites_json TEXT NULL,
+  recorded_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+CREATE INDEX IF NOT EXISTS IX_StageMemory_Stage_RunDate ON StageMemory (stage, run_date);
@@ -0,0 +1,3 @@
+-- 0014: video_id indexes for retention deletes (see mssql/0014_retention_video_indexes.sql).
+
+CREATE INDEX IF NOT EXISTS IX_VideoRegions_VideoId ON VideoRegions (video_id);
@@ -0,0 +1,3 @@
+-- 0015: video_id index for retention deletes (see mssql/0015_video_queries_video_index.sql).
+
+CREATE INDEX IF NOT EXISTS IX_VideoQueries_VideoId ON VideoQueries (video_id);
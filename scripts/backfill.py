@@ -0,0 +1,44 @@
+"""Recompute DailyThemes/DailyThemeTrends for a date range (see ytmusicrec/backfill.py).
+
+Examples:
+    python scripts/backfill.py --start 2025-01-01 --end 2025-12-31
+    python scripts/backfill.py --start 2026-01-01 --end 2026-01-31 --workers 4 --dry-run
+    python scripts/backfill.py --start 2026-01-01 --end 2026-03-31 --source arrow
+
+Uses the storage backend and queries.yaml `themes`/`dedup` settings from the
+environment, like the DAG tasks.
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+from datetime import date
+
+from ytmusicrec.backfill import run_backfill
+from ytmusicrec.logging_setup import configure_logging
+from ytmusicrec.settings import load_query_config, load_settings
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--start", type=date.fromisoformat, required=True, help="first run_date (YYYY-MM-DD)")
+    ap.add_argument("--end", type=date.fromisoformat, required=True, help="last run_date, inclusive")
+    ap.add_argument("--workers", type=int, help="scoring processes (default: CPU count)")
+    ap.add_argument("--source", choices=("db", "arrow"), default="db", help="read videos from storage or the Arrow cache")
+    ap.add_argument("--dry-run", action="store_true", help="score and compute trends without writing themes/trends")
+    ap.add_argument("--memory-profile", action="store_true", help="record tracemalloc peaks in StageMemory (YTMUSICREC_MEMORY_PROFILE)")
+    args = ap.parse_args()
+
+    configure_logging()
+    s = load_settings()
+    if args.memory_profile:
+        s = dataclasses.replace(s, memory_profile=True)
+    summary = run_backfill(
+        s, load_query_config(s.repo_root), args.start, args.end, workers=args.workers, dry_run=args.dry_run, source=args.source
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Synthetic-data benchmarks for scoring, rendering and storage writers.
+
+Examples:
+    python scripts/bench.py --sizes 1000,10000,100000 --out output/bench/baseline.json
+    python scripts/bench.py --sizes 1000,10000 --compare output/bench/baseline.json --threshold 0.15
+
+--row-overhead compares the VideoRecord rows with the plain dicts they replaced
+(bytes per row from tracemalloc, build time, compute_video_score time); run it
+with --sizes 1000000 for the 1M-row numbers (the clustering benchmarks at that
+size need several GB of RAM).
+
+Storage writers run only with --writers. The default --backend sqlite uses a
+throwaway embedded database; --backend mssql uses the MSSQL_* environment (point
+it at a local dev instance, never production).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import replace
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from ytmusicrec.logging_setup import configure_logging
+from ytmusicrec.prompts import render_markdown
+from ytmusicrec.records import VideoRecord
+from ytmusicrec.scoring import compute_theme_trends, compute_video_score, score_themes_by_query
+from ytmusicrec.settings import Settings, load_settings
+from ytmusicrec.storage import load_backend
+from ytmusicrec.synthetic import generate_prompts, generate_theme_history, generate_video_rows
+from ytmusicrec.themes import compute_signatures, score_themes_by_cluster
+
+RUN_DATE = date(2026, 1, 15)
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    """Median wall time of `repeat` calls, in seconds."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def _result(name: str, size: int, seconds: float) -> dict[str, Any]:
+    return {
+        "name": name,
+        "size": size,
+        "seconds": round(seconds, 6),
+        "rows_per_sec": round(size / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def bench_compute(sizes: list[int], repeat: int) -> list[dict[str, Any]]:
+    out = []
+    for n in sizes:
+        rows = list(generate_video_rows(n, run_date=RUN_DATE))
+        out.append(_result("compute_video_score", n, _time(lambda rows=rows: [compute_video_score(r) for r in rows], repeat)))
+        out.append(_result("score_themes_by_query", n, _time(lambda rows=rows: score_themes_by_query(rows), repeat)))
+        out.append(_result("compute_signatures", n, _time(lambda rows=rows: compute_signatures(rows), repeat)))
+        signatures = {r["video_id"]: r for r in compute_signatures(rows)}
+        out.append(
+            _result("score_themes_by_cluster", n, _time(lambda rows=rows, signatures=signatures: score_themes_by_cluster(rows, signatures), repeat))
+        )
+    return out
+
+
+def _dict_row(r: VideoRecord, fetched_at: datetime) -> dict[str, Any]:
+    # The shape parse_video_row returned before VideoRecord: aware datetimes, fetched_at shared per run.
+    published_at = r.published_at
+    return {
+        "video_id": r.video_id,
+        "query": r.query,
+        "title": r.title,
+        "description": r.description,
+        "channel_title": r.channel_title,
+        "published_at": published_at.replace(tzinfo=timezone.utc) if published_at else None,
+        "view_count": r.view_count,
+        "like_count": r.like_count,
+        "comment_count": r.comment_count,
+        "duration_seconds": r.duration_seconds,
+        "fetched_at": fetched_at,
+    }
+
+
+def _traced(build: Callable[[], list[Any]]) -> tuple[list[Any], int]:
+    """Build a row list and return it with the bytes allocated for it (strings are shared, so not counted)."""
+    tracemalloc.start()
+    try:
+        rows = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return rows, size
+
+
+def bench_row_overhead(sizes: list[int], repeat: int) -> list[dict[str, Any]]:
+    out = []
+    for n in sizes:
+        records = list(generate_video_rows(n, run_date=RUN_DATE))
+        fetched_at = records[0].fetched_at.replace(tzinfo=timezone.utc)
+        build = {
+            "dict": lambda records=records, fetched_at=fetched_at: [_dict_row(r, fetched_at) for r in records],
+            "record": lambda records=records: [VideoRecord(*r.params()) for r in records],
+        }
+        for kind, fn in build.items():
+            rows, size = _traced(fn)
+            res = _result(f"rows[{kind}]:build", n, _time(fn, repeat))
+            res["bytes_per_row"] = round(size / n, 1)
+            out.append(res)
+            out.append(_result(f"rows[{kind}]:compute_video_score", n, _time(lambda rows=rows: [compute_video_score(r) for r in rows], repeat)))
+            del rows
+    return out
+
+
+def bench_trends(repeat: int) -> list[dict[str, Any]]:
+    out = []
+    for days in (7, 90, 365):
+        history = generate_theme_history(end_date=RUN_DATE, days=days)
+        today = score_themes_by_query(list(generate_video_rows(5000, run_date=RUN_DATE)))
+        out.append(
+            _result(
+                f"compute_theme_trends[{days}d]",
+                len(history),
+                _time(
+                    lambda today=today, history=history: compute_theme_trends(run_date=RUN_DATE, today_themes=today, history_rows=history),
+                    repeat,
+                ),
+            )
+        )
+    return out
+
+
+def bench_render(repeat: int) -> list[dict[str, Any]]:
+    themes = score_themes_by_query(list(generate_video_rows(5000, run_date=RUN_DATE)))
+    gp = generate_prompts(12)
+    # A single render is sub-millisecond; time a batch so the number is stable.
+    n = 200
+    return [_result("render_markdown", n, _time(lambda: [render_markdown(RUN_DATE, themes, gp) for _ in range(n)], repeat))]
+
+
+def bench_settings(backend: str, sqlite_path: Path | None) -> Settings:
+    if backend == "sqlite":
+        path = sqlite_path or Path(tempfile.mkdtemp(prefix="ytmusicrec-bench-")) / "bench.sqlite3"
+        return Settings(youtube_api_key="bench", storage_backend="sqlite", sqlite_path=path)
+    return replace(load_settings(), storage_backend=backend)
+
+
+def bench_writers(s: Settings, sizes: list[int], repeat: int) -> list[dict[str, Any]]:
+    db = load_backend(s)
+    conn = db.connect(s)
+    prefix = f"{s.storage_backend}:"
+    out = []
+    try:
+        db.ensure_schema(conn)
+        for n in sizes:
+            rows = list(generate_video_rows(n, run_date=RUN_DATE))
+            out.append(_result(prefix + "upsert_videos", n, _time(lambda rows=rows: db.upsert_videos(conn, rows), repeat)))
+            out.append(_result(prefix + "fetch_videos_for_date", n, _time(lambda: db.fetch_videos_for_date(conn, RUN_DATE), repeat)))
+
+            themes = score_themes_by_query(rows)
+            out.append(
+                _result(prefix + "write_daily_themes", len(themes), _time(lambda themes=themes: db.write_daily_themes(conn, RUN_DATE, themes), repeat))
+            )
+
+            history = generate_theme_history(end_date=RUN_DATE)
+            trends = compute_theme_trends(run_date=RUN_DATE, today_themes=themes, history_rows=history)
+            out.append(
+                _result(
+                    prefix + "write_daily_theme_trends",
+                    len(trends),
+                    _time(lambda trends=trends: db.write_daily_theme_trends(conn, RUN_DATE, trends), repeat),
+                )
+            )
+    finally:
+        conn.close()
+    return out
+
+
+def compare(current: list[dict[str, Any]], baseline_path: Path, threshold: float) -> list[str]:
+    """Return one message per benchmark that got slower than baseline by more than `threshold`."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    base_by_key = {(b["name"], b["size"]): b for b in baseline["results"]}
+
+    regressions = []
+    for r in current:
+        b = base_by_key.get((r["name"], r["size"]))
+        if not b or not b["seconds"]:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        status = "REGRESSION" if ratio > 1.0 + threshold else "ok"
+        print(f"{status:>10}  {r['name']:<32} n={r['size']:<8} {b['seconds']:.4f}s -> {r['seconds']:.4f}s ({ratio:.2f}x)")
+        if status == "REGRESSION":
+            regressions.append(f"{r['name']} n={r['size']}: {ratio:.2f}x slower")
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1000,10000,100000", help="comma-separated row counts (up to 1000000)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--writers", action="store_true", help="also benchmark the storage writers")
+    ap.add_argument("--row-overhead", action="store_true", help="also compare VideoRecord rows against plain dicts")
+    ap.add_argument("--backend", choices=["sqlite", "mssql"], default="sqlite", help="storage backend for --writers")
+    ap.add_argument("--sqlite-path", type=Path, help="sqlite file for --backend sqlite (default: temp file)")
+    ap.add_argument("--out", type=Path, help="write results as a JSON baseline to this path")
+    ap.add_argument("--compare", type=Path, help="baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown before flagging (0.15 = 15%%)")
+    args = ap.parse_args()
+
+    configure_logging()
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+
+    results = bench_compute(sizes, args.repeat)
+    results += bench_trends(args.repeat)
+    results += bench_render(args.repeat)
+    if args.row_overhead:
+        results += bench_row_overhead(sizes, args.repeat)
+    if args.writers:
+        results += bench_writers(bench_settings(args.backend, args.sqlite_path), sizes, args.repeat)
+
+    for r in results:
+        extra = f"  {r['bytes_per_row']} B/row" if "bytes_per_row" in r else ""
+        print(f"{r['name']:<32} n={r['size']:<8} {r['seconds']:.4f}s  {r['rows_per_sec']} rows/s{extra}")
+
+    if args.out:
+        payload = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print("Wrote baseline:", args.out)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print("❌ Regressions beyond threshold:")
+            for msg in regressions:
+                print("  -", msg)
+            sys.exit(1)
+        print("✅ No regressions beyond threshold")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Export stored days to the Parquet datasets and rebuild the Arrow cache (see ytmusicrec/columnar.py).
+
+The daily DAG exports each run_date itself; use this to seed history or re-export after a backfill.
+
+Examples:
+    python scripts/export_columnar.py --start 2025-01-01 --end 2025-12-31
+    python scripts/export_columnar.py --cache-only --end 2025-12-31 --cache-days 365
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import date, timedelta
+
+from ytmusicrec.columnar import export_day_from_db, rebuild_arrow_cache
+from ytmusicrec.logging_setup import configure_logging
+from ytmusicrec.settings import load_settings
+from ytmusicrec.storage import load_backend
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--start", type=date.fromisoformat, help="first run_date to export (YYYY-MM-DD)")
+    ap.add_argument("--end", type=date.fromisoformat, required=True, help="last run_date, inclusive; the cache ends here")
+    ap.add_argument("--cache-days", type=int, help="days kept in videos.arrow (default YTMUSICREC_EXPORT_CACHE_DAYS)")
+    ap.add_argument("--cache-only", action="store_true", help="only rebuild videos.arrow from existing partitions")
+    args = ap.parse_args()
+
+    configure_logging()
+    s = load_settings()
+    exported: dict[str, dict[str, int]] = {}
+    if not args.cache_only:
+        db = load_backend(s)
+        conn = db.connect(s)
+        try:
+            db.ensure_schema(conn)
+            d = args.start or args.end
+            while d <= args.end:
+                exported[d.isoformat()] = export_day_from_db(db, conn, s.export_dir, d)
+                d += timedelta(days=1)
+        finally:
+            conn.close()
+    cached = rebuild_arrow_cache(s.export_dir, args.end, args.cache_days or s.export_cache_days)
+    print(json.dumps({"export_dir": str(s.export_dir), "days": len(exported), "cached_rows": cached}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
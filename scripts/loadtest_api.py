@@ -0,0 +1,108 @@
+"""Measure read API throughput with a warm cache, a cold one, and conditional GETs.
+
+Examples:
+    python scripts/loadtest_api.py --start 2026-01-01 --end 2026-01-31
+    python scripts/loadtest_api.py --url http://127.0.0.1:8765 --concurrency 16 --requests 5000
+
+Modes:
+    warm         plain GETs after one priming request per path (served from the LRU)
+    cold         GETs with Cache-Control: no-cache, so every request queries storage
+    conditional  GETs with If-None-Match of the primed ETag (expects bodyless 304s)
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+MODES = ("warm", "cold", "conditional")
+
+
+def _request(conn: http.client.HTTPConnection, path: str, headers: dict[str, str]) -> tuple[int, str | None]:
+    conn.request("GET", path, headers=headers)
+    resp = conn.getresponse()
+    resp.read()
+    return resp.status, resp.getheader("ETag")
+
+
+def run_mode(host: str, port: int, paths: list[str], mode: str, total: int, concurrency: int) -> dict[str, object]:
+    etags: dict[str, str | None] = {}
+    prime = http.client.HTTPConnection(host, port, timeout=30)
+    for p in paths:
+        etags[p] = _request(prime, p, {})[1]
+    prime.close()
+
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    lock = threading.Lock()
+    per_worker = max(total // concurrency, 1)
+
+    def worker(offset: int) -> None:
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local_lat: list[float] = []
+        local_status: Counter[int] = Counter()
+        for i in range(per_worker):
+            path = paths[(offset + i) % len(paths)]
+            headers = {}
+            if mode == "cold":
+                headers["Cache-Control"] = "no-cache"
+            elif mode == "conditional" and etags[path]:
+                headers["If-None-Match"] = etags[path]
+            t0 = time.perf_counter()
+            status, _ = _request(conn, path, headers)
+            local_lat.append(time.perf_counter() - t0)
+            local_status[status] += 1
+        conn.close()
+        with lock:
+            latencies.extend(local_lat)
+            statuses.update(local_status)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "statuses": dict(statuses),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://127.0.0.1:8765")
+    ap.add_argument("--start", help="range start for every endpoint (default: server's today)")
+    ap.add_argument("--end", help="range end (default: start)")
+    ap.add_argument("--endpoints", default="/themes,/trends,/prompts")
+    ap.add_argument("--requests", type=int, default=2000, help="requests per mode")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--modes", default=",".join(MODES))
+    args = ap.parse_args()
+
+    u = urlsplit(args.url)
+    query = "&".join(f"{k}={v}" for k, v in (("start", args.start), ("end", args.end)) if v)
+    paths = [f"{e}?{query}" if query else e for e in args.endpoints.split(",") if e]
+
+    for mode in args.modes.split(","):
+        r = run_mode(u.hostname or "127.0.0.1", u.port or 80, paths, mode, args.requests, args.concurrency)
+        print(
+            f"{r['mode']:<12} {r['requests']:>6} req  {r['rps']:>9} req/s  "
+            f"p50 {r['p50_ms']:>7} ms  p95 {r['p95_ms']:>7} ms  {r['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Compare each stage's latest memory profile with the runs before it (see ytmusicrec/memprofile.py).
+
+Reads StageMemory rows (recorded with YTMUSICREC_MEMORY_PROFILE=true or a
+script's --memory-profile) and exits non-zero if any stage's peak bytes per row
+exceeds --threshold times the median of its previous --baseline-runs runs.
+
+Examples:
+    python scripts/memory_report.py --start 2026-01-01 --end 2026-01-31
+    python scripts/memory_report.py --start 2026-01-01 --end 2026-01-31 --stage score --threshold 1.1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import date
+
+from ytmusicrec.dbpool import connection_pool
+from ytmusicrec.logging_setup import configure_logging
+from ytmusicrec.memprofile import memory_report
+from ytmusicrec.settings import load_settings
+from ytmusicrec.storage import load_backend
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--start", type=date.fromisoformat, required=True, help="first run_date (YYYY-MM-DD)")
+    ap.add_argument("--end", type=date.fromisoformat, required=True, help="last run_date, inclusive")
+    ap.add_argument("--stage", help="only this stage (collect, score, export, retention, backfill)")
+    ap.add_argument("--threshold", type=float, default=1.25, help="latest / baseline ratio that counts as a regression")
+    ap.add_argument("--baseline-runs", type=int, default=7, help="earlier runs in the baseline median")
+    args = ap.parse_args()
+
+    configure_logging()
+    s = load_settings()
+    db = load_backend(s)
+    with connection_pool(s).connection() as conn:
+        db.ensure_schema(conn)
+        rows = db.fetch_stage_memory_range(conn, args.start, args.end, args.stage)
+    report = memory_report(rows, threshold=args.threshold, baseline_runs=args.baseline_runs)
+    print(json.dumps(report, indent=2, default=str))
+    sys.exit(1 if any(r["regressed"] for r in report) else 0)
+
+
+if __name__ == "__main__":
+    main()
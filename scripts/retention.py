@@ -0,0 +1,39 @@
+"""Apply the queries.yaml `retention` policy to Videos (see ytmusicrec/retention.py).
+
+The ytmusicrec_maintenance DAG runs this nightly; use the script for a first
+large pass or to check the cutoffs.
+
+Examples:
+    python scripts/retention.py --dry-run
+    python scripts/retention.py --max-batches 1000
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+
+from ytmusicrec.logging_setup import configure_logging
+from ytmusicrec.retention import run_retention
+from ytmusicrec.settings import load_query_config, load_settings
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--max-batches", type=int, help="override retention.max_batches for this run")
+    ap.add_argument("--dry-run", action="store_true", help="print the cutoffs without moving anything (even if disabled)")
+    ap.add_argument("--memory-profile", action="store_true", help="record tracemalloc peaks in StageMemory (YTMUSICREC_MEMORY_PROFILE)")
+    args = ap.parse_args()
+
+    configure_logging()
+    s = load_settings()
+    if args.memory_profile:
+        s = dataclasses.replace(s, memory_profile=True)
+    cfg = load_query_config(s.repo_root)
+    if args.max_batches is not None:
+        cfg["retention"] = {**(cfg.get("retention") or {}), "max_batches": args.max_batches}
+    print(json.dumps(run_retention(s, cfg, dry_run=args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Compare in-database theme scoring (themes.engine: sql) with the Python scorer.
+
+Scores each day in the range both ways without writing themes, and exits
+non-zero if any theme, score or top example differs (see ytmusicrec/score_parity.py).
+With --shuffle, compares the configured Python scorer with itself on shuffled input
+instead, which catches themes that depend on the order rows come back in.
+
+Examples:
+    python scripts/score_parity.py --start 2025-06-01 --end 2025-06-30
+    python scripts/score_parity.py --start 2026-01-01 --end 2026-01-07 --region GB
+    python scripts/score_parity.py --start 2026-01-01 --end 2026-01-07 --shuffle
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import date
+
+from ytmusicrec.logging_setup import configure_logging
+from ytmusicrec.score_parity import run_order_parity, run_score_parity
+from ytmusicrec.settings import load_query_config, load_settings
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--start", type=date.fromisoformat, required=True, help="first run_date (YYYY-MM-DD)")
+    ap.add_argument("--end", type=date.fromisoformat, required=True, help="last run_date, inclusive")
+    ap.add_argument("--region", help="compare one region's themes (DailyRegionThemes) instead of the merged set")
+    ap.add_argument("--tolerance", type=float, default=1e-6, help="relative tolerance for theme scores")
+    ap.add_argument("--shuffle", action="store_true", help="compare scoring as fetched with scoring after a shuffle")
+    args = ap.parse_args()
+
+    configure_logging()
+    s = load_settings()
+    parity = run_order_parity if args.shuffle else run_score_parity
+    summary = parity(s, load_query_config(s.repo_root), args.start, args.end, region_code=args.region, tolerance=args.tolerance)
+    print(json.dumps(summary, indent=2))
+    sys.exit(1 if summary["mismatches"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Serve the read-only themes/trends/prompts API (see ytmusicrec/api.py).
+
+Examples:
+    python scripts/serve_api.py
+    python scripts/serve_api.py --host 0.0.0.0 --port 8765
+    curl 'http://127.0.0.1:8765/themes?start=2026-01-01&end=2026-01-07'
+
+Storage backend and cache settings come from the environment (YTMUSICREC_API_*).
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import replace
+
+from ytmusicrec.api import serve
+from ytmusicrec.logging_setup import configure_logging
+from ytmusicrec.settings import load_settings
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", help="bind address (default YTMUSICREC_API_HOST or 127.0.0.1)")
+    ap.add_argument("--port", type=int, help="port (default YTMUSICREC_API_PORT or 8765)")
+    args = ap.parse_args()
+
+    configure_logging()
+    s = load_settings()
+    s = replace(s, api_host=args.host or s.api_host, api_port=args.port or s.api_port)
+    serve(s)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,9 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from googleapiclient.discovery import build
-
 from ytmusicrec.logging_setup import configure_logging
 from ytmusicrec.settings import load_settings
-from ytmusicrec.sheets import load_creds
+from ytmusicrec.sheets import build_service
 
 
 def main() -> None:
@@ -15,8 +13,7 @@ def main() -> None:
     if not s.google_sheets_spreadsheet_id:
         raise RuntimeError("GOOGLE_SHEETS_SPREADSHEET_ID not set")
 
-    creds = load_creds(s.google_oauth_token_json)
-    service = build("sheets", "v4", credentials=creds, cache_discovery=False)
+    service = build_service(s.google_oauth_token_json, s.google_sheets_base_url)
 
     # Ensure History sheet exists
     meta = service.spreadsheets().get(spreadsheetId=s.google_sheets_spreadsheet_id).execute()
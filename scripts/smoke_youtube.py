@@ -18,9 +18,10 @@ def main() -> None:
         relevance_language="en",
         max_results=5,
         published_after=after,
+        base_url=s.youtube_base_url,
     )
     print("Found ids:", ids)
-    details = fetch_video_details(api_key=s.youtube_api_key, video_ids=ids)
+    details = fetch_video_details(api_key=s.youtube_api_key, video_ids=ids, base_url=s.youtube_base_url)
     print("✅ YouTube smoke test OK. Returned items:", len(details))
 
 
@@ -0,0 +1,73 @@
+"""Run record/replay stand-ins for YouTube, Ollama, Discord and Sheets (see ytmusicrec/standin.py).
+
+Record once against the real services, then replay offline as often as needed:
+
+    python scripts/standin.py --record --upstream ollama=http://localhost:11434
+    python scripts/standin.py --latency-ms 80 --jitter-ms 40 --error-rate 0.01 --max-rps 20
+
+The env assignments printed at startup point the pipeline (or `airflow dags test`)
+at the stand-ins. For Discord keep your webhook's id/token in the URL while
+recording; any values work for replay.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+from ytmusicrec.logging_setup import configure_logging
+from ytmusicrec.standin import SERVICES, Behavior, env_for, start_standins
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--services", default=",".join(SERVICES), help="comma-separated subset of: %(default)s")
+    ap.add_argument("--cassette-dir", type=Path, default=Path("data/cassettes"), help="one <service>.jsonl per service")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--base-port", type=int, help="ports base+0, base+1, ... (default: 9101-9104 per service)")
+    ap.add_argument("--record", action="store_true", help="proxy to the real services and append to the cassettes")
+    ap.add_argument("--upstream", action="append", default=[], metavar="SERVICE=URL", help="override a service's upstream")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="added latency per replayed response")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter on the latency")
+    ap.add_argument("--recorded-latency", action="store_true", help="replay with the upstream latency seen while recording")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of replayed requests answered with --error-status")
+    ap.add_argument("--error-status", type=int, default=503)
+    ap.add_argument("--max-rps", type=float, default=0.0, help="per-service throughput cap; excess requests queue")
+    ap.add_argument("--seed", type=int, help="seed for jitter and error injection")
+    args = ap.parse_args()
+
+    names = [n.strip() for n in args.services.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SERVICES]
+    if unknown:
+        ap.error(f"unknown services: {', '.join(unknown)}")
+    upstreams = dict(u.split("=", 1) for u in args.upstream)
+
+    configure_logging()
+    behavior = Behavior(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        recorded_latency=args.recorded_latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        max_rps=args.max_rps,
+        seed=args.seed,
+    )
+    servers = start_standins(
+        names, args.cassette_dir, host=args.host, base_port=args.base_port, record=args.record, upstreams=upstreams, behavior=behavior
+    )
+    for server in servers:
+        print(env_for(server.service, args.host, server.server_port))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+            print(server.service.name, dict(server.stats))
+
+
+if __name__ == "__main__":
+    main()
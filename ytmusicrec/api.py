@@ -0,0 +1,245 @@
+"""Read-only HTTP API over themes, trends and prompts (stdlib only).
+
+Endpoints (JSON, dates as YYYY-MM-DD, `end` defaults to `start`, `start` to today UTC):
+
+    GET /themes?start=&end=          DailyThemes with examples
+    GET /trends?start=&end=          DailyThemeTrends
+    GET /prompts?start=&end=&tool=   DailyPrompts
+    GET /health                      cache and connection pool stats
+
+Responses are cached whole in an in-process LRU and carry a strong ETag, so a
+client sending If-None-Match gets a bodyless 304. Pipeline stages call
+`bump_cache_stamp` after committing; the cache compares the stamp file's mtime on
+each request (one stat call) and drops everything when it changes. A request with
+``Cache-Control: no-cache`` skips the lookup and refreshes the entry.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import ModuleType
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+
+from ytmusicrec.dbpool import ConnectionPool
+from ytmusicrec.settings import Settings
+from ytmusicrec.storage import load_backend
+
+log = logging.getLogger(__name__)
+
+MAX_RANGE_DAYS = 366
+
+
+def bump_cache_stamp(s: Settings) -> None:
+    """Signal running API processes that stored results changed."""
+    path = s.cache_stamp_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(datetime.now(timezone.utc).isoformat(), encoding="utf-8")
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """Thread-safe LRU of encoded responses, cleared whenever the stamp file changes."""
+
+    def __init__(self, max_entries: int, stamp_path: os.PathLike[str] | str) -> None:
+        self.max_entries = max_entries
+        self.stamp_path = stamp_path
+        self._entries: OrderedDict[tuple[Any, ...], CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stamp = self._read_stamp()
+        self.generation = 0
+        self.hits = self.misses = self.invalidations = 0
+
+    def _read_stamp(self) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self.stamp_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def check_stamp(self) -> int:
+        """Clear the cache if the stamp moved; return the current generation."""
+        stamp = self._read_stamp()
+        with self._lock:
+            if stamp != self._stamp:
+                self._stamp = stamp
+                self._entries.clear()
+                self.generation += 1
+                self.invalidations += 1
+            return self.generation
+
+    def get(self, key: tuple[Any, ...]) -> CachedResponse | None:
+        with self._lock:
+            resp = self._entries.get(key)
+            if resp is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return resp
+
+    def put(self, key: tuple[Any, ...], resp: CachedResponse, generation: int) -> None:
+        """Store `resp` unless the cache was invalidated while it was being built."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = resp
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "generation": self.generation,
+            }
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _parse_range(params: dict[str, list[str]]) -> tuple[date, date]:
+    try:
+        start = date.fromisoformat(params["start"][0]) if "start" in params else datetime.now(timezone.utc).date()
+        end = date.fromisoformat(params["end"][0]) if "end" in params else start
+    except ValueError as e:
+        raise BadRequest(f"invalid date: {e}") from None
+    if end < start:
+        raise BadRequest("end is before start")
+    if end - start > timedelta(days=MAX_RANGE_DAYS):
+        raise BadRequest(f"range is longer than {MAX_RANGE_DAYS} days")
+    return start, end
+
+
+def _json_default(o: Any) -> Any:
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    if isinstance(o, bytes):
+        return o.hex()
+    raise TypeError(f"not JSON serializable: {type(o).__name__}")
+
+
+def _themes(db: ModuleType, conn: Any, start: date, end: date, params: dict[str, list[str]]) -> list[dict[str, Any]]:
+    rows = db.fetch_daily_themes_range(conn, start, end, with_examples=True)
+    rows.sort(key=lambda r: (r["run_date"], -r["score"]))
+    return rows
+
+
+def _trends(db: ModuleType, conn: Any, start: date, end: date, params: dict[str, list[str]]) -> list[dict[str, Any]]:
+    return db.fetch_daily_theme_trends_range(conn, start, end)
+
+
+def _prompts(db: ModuleType, conn: Any, start: date, end: date, params: dict[str, list[str]]) -> list[dict[str, Any]]:
+    return db.fetch_daily_prompts_range(conn, start, end, tool=(params.get("tool") or [None])[0])
+
+
+ENDPOINTS: dict[str, Callable[[ModuleType, Any, date, date, dict[str, list[str]]], list[dict[str, Any]]]] = {
+    "/themes": _themes,
+    "/trends": _trends,
+    "/prompts": _prompts,
+}
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, s: Settings, db: ModuleType | None = None) -> None:
+        self.settings = s
+        self.db = db or load_backend(s)
+        self.cache = ResponseCache(s.api_cache_entries, s.cache_stamp_path)
+        self.pool = ConnectionPool(self.db, s)
+        super().__init__((s.api_host, s.api_port), ApiHandler)
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: ApiServer
+
+    def do_GET(self) -> None:  # noqa: N802
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+
+        if url.path == "/health":
+            self._send_json(200, {"ok": True, "cache": self.server.cache.stats(), "db_pool": self.server.pool.stats()})
+            return
+
+        handler = ENDPOINTS.get(url.path)
+        if handler is None:
+            self._send_json(404, {"error": f"unknown endpoint {url.path}"})
+            return
+        try:
+            start, end = _parse_range(params)
+        except BadRequest as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        cache = self.server.cache
+        generation = cache.check_stamp()
+        key = (url.path, start, end, tuple(sorted((k, tuple(v)) for k, v in params.items() if k not in ("start", "end"))))
+        no_cache = "no-cache" in (self.headers.get("Cache-Control") or "")
+        resp = None if no_cache else cache.get(key)
+        if resp is None:
+            db = self.server.db
+            try:
+                rows = self.server.pool.run(lambda conn: handler(db, conn, start, end, params))
+            except Exception:  # noqa: BLE001
+                log.exception("Query failed: %s", self.path)
+                self._send_json(500, {"error": "query failed"})
+                return
+            body = json.dumps(
+                {"start": start, "end": end, "count": len(rows), "rows": rows}, default=_json_default, ensure_ascii=False
+            ).encode("utf-8")
+            resp = CachedResponse(body=body, etag='"' + hashlib.sha1(body).hexdigest()[:20] + '"')
+            cache.put(key, resp, generation)
+
+        if resp.etag in (self.headers.get("If-None-Match") or ""):
+            self.send_response(304)
+            self.send_header("ETag", resp.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(resp.body)))
+        self.send_header("ETag", resp.etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(resp.body)
+
+    def _send_json(self, status: int, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        log.debug("%s - %s", self.address_string(), format % args)
+
+
+def serve(s: Settings) -> None:
+    server = ApiServer(s)
+    log.info("Serving read API on http://%s:%s (backend=%s)", s.api_host, s.api_port, s.storage_backend)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,144 @@
+"""Recompute DailyThemes and DailyThemeTrends over a date range.
+
+Instead of one DAG run per date (each with its own fetch/score/history round
+trips), a backfill:
+
+1. streams every video in the range with one ordered scan (iter_videos_for_range,
+   or the memory-mapped Arrow cache with ``source="arrow"``) and splits it into
+   days as it goes;
+2. collapses near-duplicates and loads clustering signatures per day in the main
+   process (cached per video, so reruns do no hashing), then scores each day in a
+   process pool;
+3. computes trends in date order from in-memory history, seeded once with the
+   seven days before the range;
+4. replaces both tables for every scored day in two bulk writes.
+
+Days without any stored videos are left untouched. Per-region and per-profile
+rankings (DailyRegionThemes, DailyProfileThemes) are not recomputed.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from itertools import groupby
+from typing import Any, Iterable, Iterator
+
+from ytmusicrec.api import bump_cache_stamp
+from ytmusicrec.columnar import ARROW_CACHE, iter_videos_from_arrow
+from ytmusicrec.dedup import FINGERPRINT_ALGO, collapse_near_duplicates, index_for_config
+from ytmusicrec.memprofile import start_stage
+from ytmusicrec.scoring import compute_theme_trends
+from ytmusicrec.settings import Settings
+from ytmusicrec.storage import load_backend
+from ytmusicrec.themes import load_signatures, score_themes, theme_method
+
+log = logging.getLogger(__name__)
+
+TREND_THEMES = 25
+
+
+def iter_days(rows: Iterable[dict[str, Any]]) -> Iterator[tuple[date, list[dict[str, Any]]]]:
+    """Group a fetched_at-ordered video stream into (run_date, videos) per day."""
+    for day, group in groupby(rows, key=lambda r: r["fetched_at"].date()):
+        yield day, list(group)
+
+
+def _as_date(d: date | str) -> date:
+    return date.fromisoformat(d) if isinstance(d, str) else d
+
+
+def _score_day(run_date: date, videos: list[dict[str, Any]], theme_cfg: dict[str, Any], signatures: dict[str, dict[str, Any]]) -> tuple[date, list[dict[str, Any]]]:
+    return run_date, score_themes(videos, theme_cfg, signatures)
+
+
+def run_backfill(
+    s: Settings,
+    cfg: dict[str, Any],
+    start_date: date,
+    end_date: date,
+    *,
+    workers: int | None = None,
+    dry_run: bool = False,
+    source: str = "db",
+) -> dict[str, Any]:
+    """Recompute themes and trends for `start_date`..`end_date` (inclusive).
+
+    `source` is where videos are read from: ``"db"`` or ``"arrow"`` (the columnar
+    export's cache, which must cover the range).
+    """
+    if end_date < start_date:
+        raise ValueError("end_date is before start_date")
+    if source not in ("db", "arrow"):
+        raise ValueError(f"unknown source {source!r}")
+
+    theme_cfg = cfg.get("themes") or {}
+    dedup_cfg = cfg.get("dedup") or {}
+    clustering = theme_method(theme_cfg) == "cluster"
+
+    db = load_backend(s)
+    read_conn = db.connect(s)
+    conn = db.connect(s)
+    t0 = time.perf_counter()
+    # Scoring runs in the pool's processes; this profiles the reads, dedup and writes.
+    prof = start_stage(s, "backfill", start_date, scope=end_date.isoformat())
+    try:
+        db.ensure_schema(conn)
+        # Near-duplicate matching walks the range oldest-first through one long-lived index,
+        # seeded with fingerprints published in the history window before the range.
+        since = datetime.combine(start_date - timedelta(days=int(dedup_cfg.get("history_days", 30))), datetime.min.time(), tzinfo=timezone.utc)
+        before = datetime.combine(start_date, datetime.min.time())
+        seed = db.fetch_recent_fingerprints(conn, since, FINGERPRINT_ALGO) if dedup_cfg.get("enabled", False) else []
+        index = index_for_config(dedup_cfg, (r for r in seed if r["published_at"] and r["published_at"] < before))
+
+        futures: list[Future] = []
+        video_count = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            if source == "arrow":
+                rows = iter_videos_from_arrow(s.export_dir / ARROW_CACHE, start_date, end_date)
+            else:
+                rows = db.iter_videos_for_range(read_conn, start_date, end_date)
+            for day, videos in iter_days(rows):
+                video_count += len(videos)
+                videos = collapse_near_duplicates(db, conn, day, videos, dedup_cfg, {}, index=index)
+                signatures: dict[str, dict[str, Any]] = {}
+                if clustering:
+                    load_signatures(db, conn, videos, signatures)
+                futures.append(pool.submit(_score_day, day, videos, theme_cfg, signatures))
+            themes_by_date = dict(f.result() for f in futures)
+        scored = time.perf_counter()
+        prof.rows = video_count
+
+        history: dict[date, list[dict[str, Any]]] = defaultdict(list)
+        for r in db.fetch_daily_themes_range(conn, start_date - timedelta(days=7), start_date - timedelta(days=1)):
+            history[_as_date(r["run_date"])].append(r)
+
+        trends_by_date: dict[date, list[dict[str, Any]]] = {}
+        for day in sorted(themes_by_date):
+            themes = themes_by_date[day]
+            window = [r for back in range(1, 8) for r in history.get(day - timedelta(days=back), ())]
+            trends_by_date[day] = compute_theme_trends(run_date=day, today_themes=themes[:TREND_THEMES], history_rows=window)
+            history[day] = [{"run_date": day, "theme": t["theme"], "score": t["score"]} for t in themes]
+        prof.checkpoint()
+
+        summary: dict[str, Any] = {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "source": source,
+            "days": len(themes_by_date),
+            "videos": video_count,
+            "score_seconds": round(scored - t0, 2),
+        }
+        if not dry_run:
+            summary["theme_rows"] = db.replace_daily_themes_bulk(conn, themes_by_date)
+            summary["trend_rows"] = db.replace_daily_theme_trends_bulk(conn, trends_by_date)
+            bump_cache_stamp(s)
+        summary["total_seconds"] = round(time.perf_counter() - t0, 2)
+        log.info("Backfill done: %s", summary)
+        return summary
+    finally:
+        read_conn.close()
+        conn.close()
+        prof.finish()
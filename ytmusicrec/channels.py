@@ -0,0 +1,49 @@
+"""Channel enrichment: subscriber counts for the channels behind a run's videos.
+
+Collection stores each video's `channel_id`; `enrich_channels` then refreshes
+the Channels cache for those ids. Only channels missing from the cache or
+fetched more than `ttl_days` ago are requested, 50 ids per channels.list call
+(1 quota unit each), so once the cache is warm most runs make few or no calls.
+
+Readers join Channels onto video rows (VideoRecord.channel_subscribers), and
+scoring can add a subscriber-normalized term with ``themes.subscriber_weight``
+(see scoring.compute_video_score).
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+
+from ytmusicrec.youtube import YOUTUBE_BASE_URL, KeyPool, fetch_channel_details, parse_channel_row
+
+log = logging.getLogger(__name__)
+
+
+def stale_channel_ids(cached: dict[str, dict[str, Any]], channel_ids: Iterable[str], *, now: datetime, ttl_days: float) -> list[str]:
+    """Ids not in `cached` or cached before `now - ttl_days` (cache timestamps are naive UTC)."""
+    cutoff = now.astimezone(timezone.utc).replace(tzinfo=None) - timedelta(days=ttl_days)
+    return sorted(cid for cid in set(channel_ids) if cid not in cached or cached[cid]["fetched_at"] < cutoff)
+
+
+def enrich_channels(
+    db: Any,
+    conn: Any,
+    pool: KeyPool,
+    videos: Iterable[Any],
+    channels_cfg: dict[str, Any],
+    fetched_at: datetime,
+    *,
+    base_url: str = YOUTUBE_BASE_URL,
+) -> dict[str, int]:
+    """Refresh cached statistics for the channels of `videos`. Returns channel/call counts."""
+    if not channels_cfg.get("enabled", False):
+        return {"channels": 0, "fetched": 0}
+
+    channel_ids = {v.channel_id for v in videos if v.channel_id}
+    cached = db.fetch_channels(conn, channel_ids)
+    stale = stale_channel_ids(cached, channel_ids, now=fetched_at, ttl_days=float(channels_cfg.get("ttl_days", 7)))
+    rows = [parse_channel_row(channel_item=item, fetched_at=fetched_at) for item in fetch_channel_details(api_key=pool, channel_ids=stale, base_url=base_url)]
+    db.upsert_channels(conn, [r for r in rows if r["channel_id"]])
+    log.info("Channels: %s in run, %s cached, %s refreshed", len(channel_ids), len(channel_ids) - len(stale), len(rows))
+    return {"channels": len(channel_ids), "fetched": len(rows)}
@@ -0,0 +1,294 @@
+"""Columnar exports: date-partitioned Parquet datasets plus a memory-mapped Arrow cache.
+
+Layout under `Settings.export_dir`:
+
+    videos/run_date=YYYY-MM-DD/part-0.parquet          video metadata last fetched that day
+    video_stats/run_date=YYYY-MM-DD/part-0.parquet     view/like/comment counts at fetch time
+    themes/run_date=YYYY-MM-DD/part-0.parquet          DailyThemes, with rank
+    theme_examples/run_date=YYYY-MM-DD/part-0.parquet  DailyThemeExamples
+    trends/run_date=YYYY-MM-DD/part-0.parquet          DailyThemeTrends
+    videos.arrow                                       last `export_cache_days` of videos + stats
+    videos_archive/archived_on=YYYY-MM-DD/part-*.parquet  videos moved out of storage by retention
+
+The Parquet directories use hive partitioning, so pyarrow.dataset, pandas, DuckDB
+or Spark read them as one table with a `run_date` column. A day's partition is
+rewritten whole, so re-running a date replaces it instead of appending twice.
+
+videos.arrow is an uncompressed Arrow IPC file sorted by fetched_at; opening it
+with `open_arrow_cache` memory-maps it, so reads are zero-copy and only touched
+pages come off disk. Backfills can stream from it instead of the database
+(`iter_videos_from_arrow`). Timestamps are naive UTC, like the storage backends.
+
+pyarrow is only needed here and is imported lazily.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+from ytmusicrec.dbpool import connection_pool
+from ytmusicrec.records import FIELDS, VideoRecord
+from ytmusicrec.settings import Settings
+from ytmusicrec.storage import load_backend
+
+log = logging.getLogger(__name__)
+
+ARROW_CACHE = "videos.arrow"
+DATASETS = ("videos", "video_stats", "themes", "theme_examples", "trends")
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.compute  # noqa: F401
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Columnar exports need pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def _schemas(pa: Any) -> dict[str, Any]:
+    ts = pa.timestamp("us")
+    return {
+        "videos": pa.schema(
+            [
+                ("video_id", pa.string()),
+                ("query", pa.string()),
+                ("title", pa.string()),
+                ("description", pa.string()),
+                ("channel_title", pa.string()),
+                ("published_at", ts),
+                ("duration_seconds", pa.int32()),
+                ("fetched_at", ts),
+                ("channel_id", pa.string()),
+            ]
+        ),
+        "video_stats": pa.schema(
+            [
+                ("video_id", pa.string()),
+                ("view_count", pa.int64()),
+                ("like_count", pa.int64()),
+                ("comment_count", pa.int64()),
+                ("fetched_at", ts),
+                ("channel_subscribers", pa.int64()),
+            ]
+        ),
+        "themes": pa.schema([("theme", pa.string()), ("rank", pa.int32()), ("score", pa.float64())]),
+        "theme_examples": pa.schema(
+            [("theme", pa.string()), ("rank", pa.int32()), ("video_id", pa.string()), ("score", pa.float64())]
+        ),
+        "trends": pa.schema(
+            [
+                ("theme", pa.string()),
+                ("score", pa.float64()),
+                ("prev_score", pa.float64()),
+                ("delta_1d", pa.float64()),
+                ("avg_7d", pa.float64()),
+                ("momentum", pa.float64()),
+            ]
+        ),
+    }
+
+
+def partition_path(export_dir: Path, dataset: str, run_date: date) -> Path:
+    return Path(export_dir) / dataset / f"run_date={run_date.isoformat()}" / "part-0.parquet"
+
+
+def _naive(dt: datetime | None) -> datetime | None:
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _table(pa: Any, schema: Any, rows: list[dict[str, Any]]) -> Any:
+    columns = {}
+    for field in schema:
+        values = [r.get(field.name) for r in rows]
+        if pa.types.is_timestamp(field.type):
+            values = [_naive(v) for v in values]
+        columns[field.name] = pa.array(values, type=field.type)
+    return pa.table(columns, schema=schema)
+
+
+def _conform(pa: Any, table: Any, schema: Any) -> Any:
+    # Partitions written before a column existed read back with nulls for it.
+    for field in schema:
+        if field.name not in table.column_names:
+            table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+    return table.select(schema.names).cast(schema)
+
+
+def _write_atomic(path: Path, write: Any) -> None:
+    # Readers (and memory maps) of the old file keep working until they reopen it.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    write(str(tmp))
+    os.replace(tmp, path)
+
+
+def export_day(
+    export_dir: Path,
+    run_date: date,
+    *,
+    videos: list[dict[str, Any]],
+    themes: list[dict[str, Any]],
+    examples: list[dict[str, Any]],
+    trends: list[dict[str, Any]],
+) -> dict[str, int]:
+    """Write one day's partitions of every dataset. Returns rows written per dataset."""
+    pa = _pyarrow()
+    schemas = _schemas(pa)
+    ranked = [{**t, "rank": i} for i, t in enumerate(sorted(themes, key=lambda t: -t["score"]), start=1)]
+    rows_by_dataset = {
+        "videos": videos,
+        "video_stats": videos,
+        "themes": ranked,
+        "theme_examples": examples,
+        "trends": trends,
+    }
+    counts: dict[str, int] = {}
+    for name in DATASETS:
+        table = _table(pa, schemas[name], rows_by_dataset[name])
+        _write_atomic(
+            partition_path(export_dir, name, run_date),
+            lambda p, t=table: pa.parquet.write_table(t, p, compression="zstd"),
+        )
+        counts[name] = table.num_rows
+    return counts
+
+
+def export_day_from_db(db: Any, conn: Any, export_dir: Path, run_date: date) -> dict[str, int]:
+    """Export `run_date` from storage (after the score task has committed it)."""
+    return export_day(
+        export_dir,
+        run_date,
+        videos=db.fetch_videos_for_date(conn, run_date),
+        themes=db.fetch_daily_themes_range(conn, run_date, run_date),
+        examples=db.fetch_daily_theme_examples_range(conn, run_date, run_date),
+        trends=db.fetch_daily_theme_trends_range(conn, run_date, run_date),
+    )
+
+
+def _read_partition(pa: Any, export_dir: Path, dataset: str, run_date: date) -> Any | None:
+    path = partition_path(export_dir, dataset, run_date)
+    if not path.exists():
+        return None
+    return pa.parquet.read_table(str(path))
+
+
+def rebuild_arrow_cache(export_dir: Path, end_date: date, days: int) -> int:
+    """Rewrite videos.arrow from the last `days` video/stat partitions ending at `end_date`.
+
+    Returns rows cached. The covered range is stored in the file's schema metadata.
+    """
+    pa = _pyarrow()
+    schemas = _schemas(pa)
+    start_date = end_date - timedelta(days=days - 1)
+    tables = []
+    d = start_date
+    while d <= end_date:
+        videos = _read_partition(pa, export_dir, "videos", d)
+        stats = _read_partition(pa, export_dir, "video_stats", d)
+        if videos is not None and stats is not None and videos.num_rows:
+            tables.append(videos.join(stats.drop_columns(["fetched_at"]), keys="video_id"))
+        d += timedelta(days=1)
+
+    schema = pa.schema(
+        list(schemas["videos"]) + [f for f in schemas["video_stats"] if f.name not in ("video_id", "fetched_at")],
+        metadata={"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
+    )
+    if tables:
+        table = pa.concat_tables([_conform(pa, t, schema) for t in tables])
+        table = table.sort_by([("fetched_at", "ascending"), ("video_id", "ascending")])
+    else:
+        table = schema.empty_table()
+
+    def write(p: str) -> None:
+        with pa.ipc.new_file(p, schema) as writer:
+            writer.write_table(table, max_chunksize=64_000)
+
+    _write_atomic(Path(export_dir) / ARROW_CACHE, write)
+    log.info("Rebuilt Arrow cache %s..%s rows=%s", start_date, end_date, table.num_rows)
+    return table.num_rows
+
+
+def write_video_archive(export_dir: Path, archived_on: date, videos: list[VideoRecord]) -> Path:
+    """Write one retention batch (videos + stats, as in videos.arrow) as a new archive part file."""
+    pa = _pyarrow()
+    schemas = _schemas(pa)
+    schema = pa.schema(list(schemas["videos"]) + [f for f in schemas["video_stats"] if f.name not in ("video_id", "fetched_at")])
+    table = _table(pa, schema, videos)
+    path = Path(export_dir) / "videos_archive" / f"archived_on={archived_on.isoformat()}" / f"part-{uuid.uuid4().hex}.parquet"
+    _write_atomic(path, lambda p: pa.parquet.write_table(table, p, compression="zstd"))
+    return path
+
+
+def open_arrow_cache(path: Path) -> Any:
+    """Memory-map videos.arrow and return it as a pyarrow Table (no copy)."""
+    pa = _pyarrow()
+    return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def cache_range(table: Any) -> tuple[date, date] | None:
+    meta = table.schema.metadata or {}
+    if b"start_date" not in meta:
+        return None
+    return date.fromisoformat(meta[b"start_date"].decode()), date.fromisoformat(meta[b"end_date"].decode())
+
+
+def _column_values(column: Any) -> list[Any]:
+    pa = _pyarrow()
+    if pa.types.is_timestamp(column.type):
+        # VideoRecord keeps epoch seconds; the cast is zero-copy and skips datetime objects.
+        return pa.compute.divide(column.cast(pa.int64()), 1_000_000).to_pylist()
+    if pa.types.is_string(column.type):
+        # numpy's tolist() builds str objects several times faster than to_pylist().
+        return column.to_numpy(zero_copy_only=False).tolist()
+    return column.to_pylist()
+
+
+def iter_videos_from_arrow(path: Path, start_date: date, end_date: date, batch_size: int = 5000) -> Iterator[VideoRecord]:
+    """Videos fetched `start_date`..`end_date`, ordered by fetched_at, from the Arrow cache.
+
+    Yields the same records as the storage backends' iter_videos_for_range. Raises
+    ValueError if the cache does not cover the whole range.
+    """
+    table = open_arrow_cache(path)
+    covered = cache_range(table)
+    if covered is None or start_date < covered[0] or end_date > covered[1]:
+        raise ValueError(f"{path} covers {covered}, not {start_date}..{end_date}")
+
+    # Sorted by fetched_at, so the range is one contiguous zero-copy slice.
+    fetched = table.column("fetched_at").to_numpy()
+    lo, hi = np.searchsorted(
+        fetched,
+        np.array([datetime.combine(start_date, datetime.min.time()), datetime.combine(end_date + timedelta(days=1), datetime.min.time())], dtype=fetched.dtype),
+    )
+    table = table.slice(int(lo), int(hi - lo))
+    names = set(table.column_names)
+    for batch in table.select([f for f in FIELDS if f in names]).to_batches(max_chunksize=batch_size):
+        # Caches built before a field existed lack its column.
+        values = {name: _column_values(column) for name, column in zip(batch.schema.names, batch.columns)}
+        missing = [None] * batch.num_rows
+        yield from (VideoRecord(*row) for row in zip(*(values.get(f, missing) for f in FIELDS)))
+
+
+def export_and_cache(s: Settings, run_date: date) -> dict[str, Any]:
+    """Export `run_date` from the configured backend and refresh the Arrow cache."""
+    db = load_backend(s)
+    db_pool = connection_pool(s)
+    conn = db_pool.acquire()
+    try:
+        counts = export_day_from_db(db, conn, s.export_dir, run_date)
+    finally:
+        db_pool.release(conn)
+    cached = rebuild_arrow_cache(s.export_dir, run_date, s.export_cache_days)
+    log.info("Exported %s to %s: %s", run_date, s.export_dir, counts)
+    return {"run_date": run_date.isoformat(), "rows": counts, "cached_rows": cached}
@@ -0,0 +1,209 @@
+"""Process-wide pool of storage backend connections.
+
+Opening an MSSQL connection costs a TCP + TLS handshake and a login (ODBC
+Driver 18 encrypts by default), so pipeline tasks, region workers and the read
+API borrow connections from `connection_pool(s)` instead of calling
+``db.connect`` for every unit of work:
+
+- at most `db_pool_size` connections are open at once; acquiring beyond that
+  waits for one to come back;
+- an idle connection is pinged (``SELECT 1``) before it is handed out, and one
+  idle for longer than `db_pool_idle_seconds` is closed instead;
+- a returned connection is rolled back, so no transaction outlives its borrower,
+  and one returned after an error (or that fails the rollback) is closed;
+- `stats()` / `log_stats()` report handshakes, reuse, failed pings and acquire /
+  connect times, which is where handshake overhead shows up.
+
+Pools are per process and per database: a forked region worker builds its own
+and never touches (or closes) the parent's connections.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Callable, Iterator
+
+from ytmusicrec.settings import Settings
+from ytmusicrec.storage import load_backend
+
+log = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Reuse backend connections across calls and threads; one connection per concurrent borrower."""
+
+    def __init__(
+        self,
+        db: ModuleType,
+        s: Settings,
+        *,
+        size: int | None = None,
+        idle_seconds: float | None = None,
+        acquire_timeout: float = 60.0,
+    ) -> None:
+        self._db = db
+        self._s = s
+        self.size = max(1, size if size is not None else s.db_pool_size)
+        self.idle_seconds = idle_seconds if idle_seconds is not None else s.db_pool_idle_seconds
+        self.acquire_timeout = acquire_timeout
+        self._idle: list[tuple[Any, float]] = []  # (connection, returned at), most recent last
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._stats = {
+            "acquired": 0,
+            "opened": 0,
+            "reused": 0,
+            "ping_failures": 0,
+            "expired": 0,
+            "discarded": 0,
+            "acquire_ms_total": 0.0,
+            "acquire_ms_max": 0.0,
+            "connect_ms_total": 0.0,
+        }
+
+    def _count(self, key: str, n: float = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def _ping(self, conn: Any) -> bool:
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            finally:
+                cur.close()
+            return True
+        except Exception:  # noqa: BLE001
+            return False
+
+    def _connect(self) -> Any:
+        t0 = time.perf_counter()
+        conn = self._db.connect(self._s)
+        ms = (time.perf_counter() - t0) * 1000
+        self._count("opened")
+        self._count("connect_ms_total", ms)
+        log.debug("Opened %s connection in %.1fms", self._s.storage_backend, ms)
+        return conn
+
+    def _close(self, conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:  # noqa: BLE001
+            pass
+
+    def acquire(self) -> Any:
+        t0 = time.perf_counter()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"No database connection free after {self.acquire_timeout:g}s (db_pool_size={self.size})")
+        try:
+            conn = None
+            while conn is None:
+                with self._lock:
+                    conn, returned_at = self._idle.pop() if self._idle else (None, 0.0)
+                if conn is None:
+                    conn = self._connect()
+                    break
+                if time.monotonic() - returned_at > self.idle_seconds:
+                    self._count("expired")
+                    self._close(conn)
+                    conn = None
+                elif not self._ping(conn):
+                    self._count("ping_failures")
+                    self._close(conn)
+                    conn = None
+                else:
+                    self._count("reused")
+        except BaseException:
+            self._slots.release()
+            raise
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self._stats["acquired"] += 1
+            self._stats["acquire_ms_total"] += ms
+            self._stats["acquire_ms_max"] = max(self._stats["acquire_ms_max"], ms)
+        return conn
+
+    def release(self, conn: Any, *, discard: bool = False) -> None:
+        """Return `conn` (rolled back) to the pool, or close it when `discard` is set or the rollback fails."""
+        try:
+            if not discard:
+                try:
+                    conn.rollback()
+                except Exception:  # noqa: BLE001
+                    discard = True
+            if discard:
+                self._count("discarded")
+                self._close(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection for the block; it is closed instead of pooled if the block raises."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        self.release(conn)
+
+    def run(self, fn: Callable[[Any], Any]) -> Any:
+        with self.connection() as conn:
+            return fn(conn)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            out["idle"] = len(self._idle)
+        acquired = out["acquired"]
+        out["acquire_ms_mean"] = round(out["acquire_ms_total"] / acquired, 2) if acquired else None
+        out["connect_ms_mean"] = round(out["connect_ms_total"] / out["opened"], 2) if out["opened"] else None
+        for key in ("acquire_ms_total", "acquire_ms_max", "connect_ms_total"):
+            out[key] = round(out[key], 2)
+        return out
+
+    def log_stats(self) -> None:
+        st = self.stats()
+        log.info(
+            "DB pool (%s): acquired=%s opened=%s reused=%s ping_failures=%s expired=%s discarded=%s "
+            "acquire mean=%sms max=%sms connect mean=%sms",
+            self._s.storage_backend, st["acquired"], st["opened"], st["reused"], st["ping_failures"], st["expired"],
+            st["discarded"], st["acquire_ms_mean"], st["acquire_ms_max"], st["connect_ms_mean"],
+        )
+
+    def close(self) -> None:
+        """Close the idle connections (borrowed ones are closed when they come back discarded or at exit)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+
+_pools: dict[tuple[Any, ...], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(s: Settings) -> tuple[Any, ...]:
+    if (s.storage_backend or "mssql").lower() == "sqlite":
+        return ("sqlite", str(s.sqlite_path))
+    return ("mssql", s.mssql_host, s.mssql_port, s.mssql_db, s.mssql_user)
+
+
+def connection_pool(s: Settings) -> ConnectionPool:
+    """This process's pool for the database `s` points at, created on first use."""
+    # The pid is part of the key: a forked child keeps (but never uses) its parent's pools.
+    key = (os.getpid(), *_pool_key(s))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(load_backend(s), s)
+        return pool
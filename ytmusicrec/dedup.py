@@ -0,0 +1,255 @@
+"""Near-duplicate detection for re-uploads and loop/extended variants.
+
+Titles are normalized (features.normalize_title: bracketed tags, "1 hour", "loop",
+"official video", ... stripped; stored per video in VideoFeatures) and
+fingerprinted with a 64-bit SimHash over the set of remaining words.
+Two videos are duplicates when their fingerprints differ in at most
+`max_distance` bits and, if `duration_tolerance` is set, their durations agree.
+
+`SimHashIndex` splits each fingerprint into ``max_distance + 1`` bit bands: by
+pigeonhole, any fingerprint within `max_distance` bits matches at least one band
+exactly, so a lookup only compares against the entries sharing a band value
+instead of the whole history.
+
+Each video's fingerprint and canonical video (the earliest-published member of
+its duplicate group) are stored in dbo.VideoFingerprints, so a day's run only
+fingerprints new videos and indexes a bounded window of recent history.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterable
+
+import numpy as np
+
+from ytmusicrec.features import ensure_features, normalize_title
+from ytmusicrec.scoring import compute_video_score
+
+log = logging.getLogger(__name__)
+
+FINGERPRINT_ALGO = "simhash64-v1"
+MAX_DISTANCE = 3
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhashes(titles: Iterable[str | None]) -> list[int | None]:
+    """64-bit SimHash of each normalized title; None when nothing is left to hash."""
+    return simhash_tokens(normalize_title(title) for title in titles)
+
+
+def simhash_tokens(token_lists: Iterable[list[str]]) -> list[int | None]:
+    """simhashes for already-normalized titles (VideoFeatures.title_tokens)."""
+    features: list[list[int]] = []
+    for tokens in token_lists:
+        # Word set only: re-uploads often swap "Artist - Track" for "Track - Artist".
+        features.append([_feature_hash(t) for t in set(tokens)])
+
+    lengths = np.fromiter((len(f) for f in features), dtype=np.int64, count=len(features))
+    nonempty = np.flatnonzero(lengths)
+    out: list[int | None] = [None] * len(features)
+    if not nonempty.size:
+        return out
+
+    flat = np.array([h for f in features for h in f], dtype="<u8")
+    # (features, 64) matrix of +1/-1 votes, summed per title.
+    votes = np.unpackbits(flat.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little").astype(np.int16) * 2 - 1
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+    bits = np.add.reduceat(votes, offsets, axis=0) > 0
+    packed = np.packbits(bits, axis=1, bitorder="little").view("<u8").ravel()
+    for i, fp in zip(nonempty.tolist(), packed.tolist()):
+        out[i] = fp
+    return out
+
+
+def to_signed(fp: int) -> int:
+    """uint64 -> int64, for BIGINT columns."""
+    return fp - (1 << 64) if fp >= 1 << 63 else fp
+
+
+def to_unsigned(fp: int) -> int:
+    return fp & 0xFFFFFFFFFFFFFFFF
+
+
+def _naive_utc(dt: datetime | None) -> datetime | None:
+    # Rows from the database are naive UTC; rows fresh from the API are aware.
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def durations_match(a: int | None, b: int | None, tolerance: float | None) -> bool:
+    if tolerance is None or not a or not b:
+        return True
+    return abs(a - b) <= max(tolerance * max(a, b), 2.0)
+
+
+@dataclass
+class _Entry:
+    video_id: str
+    fingerprint: int
+    duration_seconds: int | None
+    canonical_video_id: str
+
+
+class SimHashIndex:
+    """In-memory banded index over 64-bit fingerprints."""
+
+    def __init__(self, *, max_distance: int = MAX_DISTANCE, duration_tolerance: float | None = None) -> None:
+        self.max_distance = max_distance
+        self.duration_tolerance = duration_tolerance
+        bands = max_distance + 1
+        edges = [round(i * 64 / bands) for i in range(bands + 1)]
+        self._bands = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self._tables: list[dict[int, list[_Entry]]] = [defaultdict(list) for _ in self._bands]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, video_id: str, fingerprint: int, duration_seconds: int | None, canonical_video_id: str) -> None:
+        entry = _Entry(video_id, fingerprint, duration_seconds, canonical_video_id)
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            table[(fingerprint >> shift) & mask].append(entry)
+        self._size += 1
+
+    def add_rows(self, rows: Iterable[dict[str, Any]]) -> None:
+        """Index stored fingerprint rows (fetch_recent_fingerprints / fetch_video_fingerprints)."""
+        for r in rows:
+            if r["simhash"] is not None:
+                self.add(r["video_id"], to_unsigned(int(r["simhash"])), r.get("duration_seconds"), r["canonical_video_id"])
+
+    def nearest(self, fingerprint: int, duration_seconds: int | None = None) -> _Entry | None:
+        """Closest indexed entry within max_distance bits (and duration tolerance), if any."""
+        best: _Entry | None = None
+        best_dist = self.max_distance + 1
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            for e in table.get((fingerprint >> shift) & mask, ()):
+                dist = (e.fingerprint ^ fingerprint).bit_count()
+                if dist < best_dist and durations_match(e.duration_seconds, duration_seconds, self.duration_tolerance):
+                    best, best_dist = e, dist
+        return best
+
+
+def index_from_rows(rows: Iterable[dict[str, Any]], **kwargs: Any) -> SimHashIndex:
+    """Build an index from stored fingerprint rows (fetch_recent_fingerprints)."""
+    index = SimHashIndex(**kwargs)
+    index.add_rows(rows)
+    return index
+
+
+def assign_fingerprints(
+    videos: list[dict[str, Any]], index: SimHashIndex, tokens: dict[str, list[str]] | None = None
+) -> list[dict[str, Any]]:
+    """Fingerprint `videos` and resolve each one's canonical video against `index`.
+
+    Videos are visited oldest-first and added to the index as they go, so the
+    earliest upload in a duplicate group becomes its canonical video. Titles with
+    an entry in `tokens` (stored features) are not normalized again. Returns rows
+    for write_video_fingerprints.
+    """
+    ordered = sorted(videos, key=lambda v: (_naive_utc(v.get("published_at")) or datetime.min, v["video_id"]))
+    tokens = tokens or {}
+    token_lists = (tokens[v["video_id"]] if v["video_id"] in tokens else normalize_title(v.get("title")) for v in ordered)
+    out: list[dict[str, Any]] = []
+    for v, fp in zip(ordered, simhash_tokens(token_lists)):
+        canonical = v["video_id"]
+        if fp is not None:
+            match = index.nearest(fp, v.get("duration_seconds"))
+            if match is not None:
+                canonical = match.canonical_video_id
+            index.add(v["video_id"], fp, v.get("duration_seconds"), canonical)
+        out.append(
+            {
+                "video_id": v["video_id"],
+                # Titles that normalize to nothing can't be compared; they stay their own group.
+                "simhash": to_signed(fp) if fp is not None else None,
+                "duration_seconds": v.get("duration_seconds"),
+                "canonical_video_id": canonical,
+                "published_at": _naive_utc(v.get("published_at")),
+            }
+        )
+    return out
+
+
+def collapse_duplicates(videos: list[dict[str, Any]], fingerprints: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+    """Keep one video per canonical group: the best-scoring upload.
+
+    Videos without a fingerprint row are kept as-is.
+    """
+    best: dict[str, tuple[float, dict[str, Any]]] = {}
+    for v in videos:
+        fp = fingerprints.get(v["video_id"])
+        key = fp["canonical_video_id"] if fp else v["video_id"]
+        score = compute_video_score(v)
+        if key not in best or score > best[key][0]:
+            best[key] = (score, v)
+    return [v for _, v in best.values()]
+
+
+def index_for_config(dedup_cfg: dict[str, Any], rows: Iterable[dict[str, Any]] = ()) -> SimHashIndex:
+    return index_from_rows(
+        rows,
+        max_distance=int(dedup_cfg.get("max_distance", MAX_DISTANCE)),
+        duration_tolerance=dedup_cfg.get("duration_tolerance"),
+    )
+
+
+def fingerprint_new_videos(
+    db: Any,
+    conn: Any,
+    run_date: date,
+    videos: list[dict[str, Any]],
+    dedup_cfg: dict[str, Any],
+    index: SimHashIndex | None = None,
+) -> list[dict[str, Any]]:
+    """Fingerprint `videos` (none stored yet) against `index` or recent history, and store the rows."""
+    if not videos:
+        return []
+    if index is None:
+        since = datetime.combine(run_date - timedelta(days=int(dedup_cfg.get("history_days", 30))), datetime.min.time(), tzinfo=timezone.utc)
+        index = index_for_config(dedup_cfg, db.fetch_recent_fingerprints(conn, since, FINGERPRINT_ALGO))
+    # Videos collected while dedup was off have no stored tokens yet.
+    stored = ensure_features(db, conn, videos)
+    rows = assign_fingerprints(videos, index, {vid: (f["title_tokens"] or "").split() for vid, f in stored.items()})
+    db.write_video_fingerprints(conn, rows, FINGERPRINT_ALGO)
+    log.info("Fingerprinted %s new videos against %s indexed", len(rows), len(index) - len(rows))
+    return rows
+
+
+def collapse_near_duplicates(
+    db: Any,
+    conn: Any,
+    run_date: date,
+    videos: list[dict[str, Any]],
+    dedup_cfg: dict[str, Any],
+    known: dict[str, dict[str, Any]],
+    index: SimHashIndex | None = None,
+) -> list[dict[str, Any]]:
+    """Fingerprint unseen `videos` via storage and keep one per duplicate group.
+
+    Without `index`, one is built from the last `history_days` of stored
+    fingerprints. Callers walking many days in order (backfills) pass a single
+    long-lived index instead; the day's cached rows are added to it as well.
+    """
+    if not dedup_cfg.get("enabled", False):
+        return videos
+
+    want = {v["video_id"] for v in videos} - known.keys()
+    if want:
+        cached = db.fetch_video_fingerprints(conn, want, FINGERPRINT_ALGO)
+        known.update((r["video_id"], r) for r in cached)
+        if index is not None:
+            index.add_rows(cached)
+    missing = [v for v in videos if v["video_id"] not in known]
+    known.update((r["video_id"], r) for r in fingerprint_new_videos(db, conn, run_date, missing, dedup_cfg, index))
+
+    out = collapse_duplicates(videos, known)
+    if len(out) < len(videos):
+        log.info("Collapsed %s near-duplicate videos", len(videos) - len(out))
+    return out
@@ -3,7 +3,7 @@ from __future__ import annotations
 import logging
 from pathlib import Path
 
-import requests
+from ytmusicrec.httpclient import http_client
 
 log = logging.getLogger(__name__)
 
@@ -31,13 +31,14 @@ def post_message(*, webhook_url: str, content: str, file_path: Path | None = Non
     if not webhook_url:
         raise RuntimeError("DISCORD_WEBHOOK_URL is not set")
 
+    # The webhook URL carries its token, so latency is recorded under a fixed label.
+    kwargs = {"service": "discord", "endpoint": "discord webhook", "timeout": timeout}
     if file_path and file_path.exists():
-        with file_path.open("rb") as f:
-            files = {"file": (file_path.name, f, "text/markdown")}
-            data = {"content": content}
-            r = requests.post(webhook_url, data=data, files=files, timeout=timeout)
+        # Read up front so a retried post sends the whole file again.
+        files = {"file": (file_path.name, file_path.read_bytes(), "text/markdown")}
+        r = http_client().post(webhook_url, data={"content": content}, files=files, **kwargs)
     else:
-        r = requests.post(webhook_url, json={"content": content}, timeout=timeout)
+        r = http_client().post(webhook_url, json={"content": content}, **kwargs)
 
     if r.status_code >= 300:
         log.error("Discord webhook failed: %s %s", r.status_code, r.text)
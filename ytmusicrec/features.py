@@ -0,0 +1,64 @@
+"""Per-video feature store (dbo.VideoFeatures).
+
+Values derived from a video's own metadata are computed once, when the video is
+first collected, and stored with the video id: ``title_tokens`` is the
+normalized title (`normalize_title`, space-joined) that dedup fingerprints, so
+fingerprinting joins it instead of re-parsing titles. Dedup is the only reader,
+so rows are only written while ``dedup.enabled`` is set.
+
+Rows carry FEATURE_VERSION; bump it when a definition changes and stale rows are
+recomputed as their videos come back.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any, Iterable
+
+log = logging.getLogger(__name__)
+
+FEATURE_VERSION = 1
+
+_MAX_TOKENS_CHARS = 400
+
+_BRACKETS_RE = re.compile(r"[\(\[\{【].*?[\)\]\}】]")
+_DURATION_WORDS_RE = re.compile(r"\b\d+\s*(?:h|hr|hrs|hour|hours|m|min|mins|minute|minutes)\b")
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Packaging words that distinguish uploads of the same track, not the track itself.
+NOISE_WORDS = frozenset(
+    """
+    official video audio lyric lyrics visualizer visualiser mv hd hq 4k 8k 1080p 720p
+    loop looped extended version edit full hour hours hr min mins minutes remastered
+    slowed reverb sped up nightcore 8d bass boosted
+    """.split()
+)
+
+
+def normalize_title(title: str | None) -> list[str]:
+    """Title words minus bracketed tags, durations and packaging words (dedup fingerprints these)."""
+    text = (title or "").lower()
+    text = _BRACKETS_RE.sub(" ", text)
+    text = _DURATION_WORDS_RE.sub(" ", text)
+    return [t for t in _TOKEN_RE.findall(text) if t not in NOISE_WORDS]
+
+
+def compute_features(videos: Iterable[Any]) -> list[dict[str, Any]]:
+    """Rows for write_video_features."""
+    return [
+        {"video_id": v["video_id"], "title_tokens": " ".join(normalize_title(v.get("title")))[:_MAX_TOKENS_CHARS] or None}
+        for v in videos
+    ]
+
+
+def ensure_features(db: Any, conn: Any, videos: Iterable[Any]) -> dict[str, dict[str, Any]]:
+    """Stored features for `videos`, computing and storing them only for videos without a current row."""
+    videos = list(videos)
+    known = db.fetch_video_features(conn, {v["video_id"] for v in videos}, FEATURE_VERSION)
+    missing = list({v["video_id"]: v for v in videos if v["video_id"] not in known}.values())
+    if missing:
+        rows = compute_features(missing)
+        db.write_video_features(conn, rows, FEATURE_VERSION)
+        known.update((r["video_id"], r) for r in rows)
+        log.info("Computed features for %s new videos (%s stored)", len(rows), len(videos) - len(missing))
+    return known
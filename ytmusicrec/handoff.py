@@ -0,0 +1,60 @@
+"""What DAG tasks hand each other through XCom (Settings.xcom_handoff).
+
+``payload`` (default): the score task pushes the top themes (with examples) and
+the prompts task the generated prompts, so downstream tasks get them as
+arguments. Every copy lands in the Airflow metadata database.
+
+``reference``: tasks push only a run reference, the run date and the Airflow
+run id (`run_ref`), and downstream tasks load the slices they need:
+
+- top themes (theme and score) from DailyThemes / DailyProfileThemes
+  (`fetch_top_themes`, ``ORDER BY score DESC`` with a row limit in the database);
+- the generated prompts from a JSON artifact the prompts task writes under
+  ``artifact_dir/<run_date>/`` (DailyPrompts does not keep each prompt's theme);
+- the markdown paths, which follow from the run date (`prompts_md_name`).
+
+XCom rows then stay the same size however many themes, examples and prompts a
+run has. The DAG files read the mode when they are parsed (`xcom_handoff_mode`).
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from ytmusicrec.settings import Settings
+
+# Themes the prompts and publish tasks work from (and the payload mode pushes).
+TOP_THEMES = 10
+
+
+def run_ref(ctx: Any, run_date: str) -> dict[str, Any]:
+    """The reference pushed instead of payloads: run date plus the Airflow run id, for tracing."""
+    return {"run_date": run_date, "run_id": ctx.get("run_id")}
+
+
+def prompts_md_name(run_date: date, profile: str | None = None) -> str:
+    return f"{run_date.isoformat()}_{profile}_prompts.md" if profile else f"{run_date.isoformat()}_prompts.md"
+
+
+def artifact_path(s: Settings, run_date: date, name: str) -> Path:
+    return Path(s.artifact_dir) / run_date.isoformat() / f"{name}.json"
+
+
+def write_artifact(s: Settings, run_date: date, name: str, data: Any) -> Path:
+    """Write `data` as JSON, replacing the file atomically (a retried task never leaves half a file)."""
+    path = artifact_path(s, run_date, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, default=str), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def read_artifact(s: Settings, run_date: date, name: str) -> Any:
+    path = artifact_path(s, run_date, name)
+    if not path.exists():
+        raise FileNotFoundError(f"Missing run artifact {path}; did the upstream task run for {run_date}?")
+    return json.loads(path.read_text(encoding="utf-8"))
@@ -0,0 +1,292 @@
+"""Shared HTTP client for the outbound integrations (YouTube, Ollama, Discord).
+
+One process-wide `HttpClient` (see `http_client`) replaces ad-hoc ``requests``
+calls with fixed timeouts:
+
+- a pooled ``requests.Session`` per host, and a cap on in-flight requests per
+  host, shared by every thread in the process;
+- retries on connection errors, timeouts and retryable statuses, with full-jitter
+  exponential backoff (a ``Retry-After`` header wins when the server sends one);
+- a circuit breaker per host: after `breaker_failures` consecutive failures the
+  host is skipped for `breaker_reset_seconds` and calls fail fast with
+  `CircuitOpen`, then one trial call decides whether it closes again;
+- a latency histogram per endpoint label (``metrics()`` / ``log_metrics()``).
+
+Per-service timeouts, retry counts and limits live in SERVICE_POLICIES. Calls
+stay synchronous: DAG tasks are plain callables, and the thread-safe client
+gives concurrent callers (region workers, thread pools) the same limits.
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+
+class CircuitOpen(requests.ConnectionError):
+    """The host failed repeatedly and is being skipped until its breaker resets."""
+
+
+@dataclass(frozen=True)
+class ServicePolicy:
+    timeout: float = 30.0
+    retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+    # Connections kept per host, and requests allowed in flight per host.
+    pool_size: int = 10
+    max_in_flight: int = 8
+    breaker_failures: int = 5
+    breaker_reset_seconds: float = 60.0
+
+
+SERVICE_POLICIES = {
+    "youtube": ServicePolicy(),
+    # One generation can take minutes on CPU; a second attempt is the most worth waiting for.
+    "ollama": ServicePolicy(timeout=120.0, retries=1, max_in_flight=2, breaker_failures=3),
+    # Webhook posts are not idempotent, so only statuses that mean "not delivered" are retried.
+    "discord": ServicePolicy(retries=3, retry_statuses=frozenset({429, 502, 503, 504}), max_in_flight=2),
+}
+DEFAULT_POLICY = ServicePolicy()
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is everything slower).
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10_000, 30_000, 60_000, 120_000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; quantiles are reported as their bucket's upper bound."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.errors = 0
+
+    def observe(self, ms: float, *, error: bool = False) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.errors += error
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 1)
+        return round(self.max_ms, 1)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": {f"le_{b}": n for b, n in zip((*LATENCY_BUCKETS_MS, "inf"), self.counts)},
+        }
+
+
+class CircuitBreaker:
+    """closed -> open after `failures` consecutive failures -> half-open after `reset_seconds`."""
+
+    def __init__(self, failures: int, reset_seconds: float) -> None:
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.consecutive = 0
+        self.opened_at: float | None = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """End a call that says nothing about the host's health (e.g. an invalid request)."""
+        with self._lock:
+            self._trial = False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._trial = False
+            if ok:
+                self.consecutive = 0
+                self.opened_at = None
+                return
+            self.consecutive += 1
+            if self.opened_at is not None or self.consecutive >= self.failures:
+                self.opened_at = time.monotonic()
+
+
+@dataclass
+class _Host:
+    session: requests.Session
+    slots: threading.BoundedSemaphore
+    breaker: CircuitBreaker
+
+
+@dataclass
+class HttpClient:
+    policies: dict[str, ServicePolicy] = field(default_factory=lambda: dict(SERVICE_POLICIES))
+    seed: int | None = None
+
+    def __post_init__(self) -> None:
+        self._hosts: dict[str, _Host] = {}
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.seed)
+
+    def _host(self, netloc: str, policy: ServicePolicy) -> _Host:
+        with self._lock:
+            host = self._hosts.get(netloc)
+            if host is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=policy.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                host = self._hosts[netloc] = _Host(
+                    session,
+                    threading.BoundedSemaphore(policy.max_in_flight),
+                    CircuitBreaker(policy.breaker_failures, policy.breaker_reset_seconds),
+                )
+            return host
+
+    def _observe(self, endpoint: str, ms: float, error: bool) -> None:
+        with self._lock:
+            hist = self._histograms.get(endpoint)
+            if hist is None:
+                hist = self._histograms[endpoint] = LatencyHistogram()
+            hist.observe(ms, error=error)
+
+    def _backoff(self, policy: ServicePolicy, attempt: int, resp: requests.Response | None) -> float:
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), policy.backoff_max)
+            except ValueError:
+                pass
+        with self._lock:
+            return self._rng.uniform(0, min(policy.backoff_max, policy.backoff_base * 2**attempt))
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        service: str,
+        endpoint: str | None = None,
+        on_attempt: Callable[[], None] | None = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """Send a request with `service`'s policy; returns the final response (raise_for_status is up to the caller).
+
+        `endpoint` labels the latency histogram (default ``"<service> <METHOD> <path>"``;
+        pass a template when the path carries ids or tokens). `on_attempt` runs before
+        every attempt, e.g. to charge API quota per call.
+        """
+        policy = self.policies.get(service, DEFAULT_POLICY)
+        parts = urlsplit(url)
+        host = self._host(parts.netloc, policy)
+        label = endpoint or f"{service} {method.upper()} {parts.path}"
+        kwargs.setdefault("timeout", policy.timeout)
+
+        attempt = 0
+        while True:
+            if not host.breaker.allow():
+                raise CircuitOpen(f"{service}: circuit open for {parts.netloc} after {host.breaker.consecutive} consecutive failures")
+            if on_attempt is not None:
+                on_attempt()
+            resp: requests.Response | None = None
+            error: Exception | None = None
+            t0 = time.perf_counter()
+            with host.slots:
+                try:
+                    resp = host.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                except BaseException:
+                    host.breaker.release()
+                    raise
+            ms = (time.perf_counter() - t0) * 1000
+            failed = error is not None or resp.status_code >= 500
+            self._observe(label, ms, failed or resp.status_code >= 400)
+            host.breaker.record(not failed)
+
+            retryable = error is not None or resp.status_code in policy.retry_statuses
+            if not retryable or attempt >= policy.retries:
+                if error is not None:
+                    raise error
+                return resp
+            wait = self._backoff(policy, attempt, resp)
+            log.warning(
+                "%s: %s (attempt %s/%s), retrying in %.1fs",
+                label, error or f"HTTP {resp.status_code}", attempt + 1, policy.retries + 1, wait,
+            )
+            attempt += 1
+            time.sleep(wait)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def metrics(self) -> dict[str, Any]:
+        """Latency histograms by endpoint and breaker states by host."""
+        with self._lock:
+            return {
+                "endpoints": {label: h.snapshot() for label, h in sorted(self._histograms.items())},
+                "breakers": {netloc: h.breaker.state for netloc, h in sorted(self._hosts.items())},
+            }
+
+    def log_metrics(self) -> None:
+        for label, snap in self.metrics()["endpoints"].items():
+            log.info(
+                "HTTP %s: n=%s errors=%s p50=%sms p95=%sms p99=%sms max=%sms",
+                label, snap["count"], snap["errors"], snap["p50_ms"], snap["p95_ms"], snap["p99_ms"], snap["max_ms"],
+            )
+
+
+_client: HttpClient | None = None
+_client_pid: int | None = None
+_client_lock = threading.Lock()
+
+
+def http_client() -> HttpClient:
+    """The process-wide client, created on first use (a forked region worker builds its own)."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client, _client_pid = HttpClient(), os.getpid()
+        return _client
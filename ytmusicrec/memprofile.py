@@ -0,0 +1,219 @@
+"""Opt-in memory profiling of pipeline stages (Settings.memory_profile).
+
+With YTMUSICREC_MEMORY_PROFILE=true (or a script's ``--memory-profile``) the
+collect (per region), score, export, retention and backfill stages trace Python
+allocations with tracemalloc, and each run adds a StageMemory row next to the
+day's Runs rows:
+
+- peak_bytes: the traced high-water mark above what was allocated when the stage
+  started;
+- retained_bytes: what the stage still holds when it ends (steady growth over
+  runs is a leak);
+- row_count / bytes_per_row: the rows the stage handled (videos collected,
+  scored, exported...) and peak_bytes per row, the figure to compare between
+  days of different volume;
+- max_rss_bytes: the process's resident high-water mark so far, which includes
+  what tracemalloc cannot see (numpy, pyarrow, the ODBC driver);
+- top_sites_json: the `memory_profile_top` source lines holding the most new
+  memory at the stage's checkpoint (`StageProfile.checkpoint`, placed where the
+  stage's working set is largest) or, without one, at its end.
+
+Tracing slows allocation-heavy code down by a good factor, so it is off by
+default. `memory_report` compares each stage's latest run with the ones before it
+(scripts/memory_report.py).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import statistics
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Iterable, Iterator
+
+from ytmusicrec.dbpool import connection_pool
+from ytmusicrec.settings import Settings
+from ytmusicrec.storage import load_backend
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+log = logging.getLogger(__name__)
+
+# Allocations made by tracing or importing are not the stage's.
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+# tracemalloc's peak is process-wide, so stages do not nest: an inner stage is not profiled.
+_active_lock = threading.Lock()
+_active: StageProfile | None = None
+
+
+def _max_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux.
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
+
+
+class StageProfile:
+    """One stage execution; a no-op unless memory profiling is on. Set `rows` before `finish`."""
+
+    def __init__(self, s: Settings, stage: str, run_date: date, scope: str = "") -> None:
+        self._s = s
+        self.stage = stage
+        self.run_date = run_date
+        self.scope = scope
+        self.rows: int | None = None
+        self.enabled = False
+        self._started_tracing = False
+        self._base = 0
+        self._before: tracemalloc.Snapshot | None = None
+        self._sites: list[dict[str, Any]] | None = None
+        self._sites_at = -1
+        self._peak = 0
+        self._t0 = 0.0
+
+    def start(self) -> StageProfile:
+        global _active
+        if not self._s.memory_profile:
+            return self
+        with _active_lock:
+            if _active is not None:
+                log.debug("Not profiling %s inside %s", self.stage, _active.stage)
+                return self
+            _active = self
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._before = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+        self._t0 = time.perf_counter()
+        return self
+
+    def checkpoint(self) -> None:
+        """Record the top allocation sites now, if more is allocated than at the last checkpoint."""
+        if not self.enabled:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        self._peak = max(self._peak, peak)
+        if current <= self._sites_at:
+            return
+        after = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        top = [d for d in after.compare_to(self._before, "lineno") if d.size_diff > 0]
+        top.sort(key=lambda d: d.size_diff, reverse=True)
+        self._sites = [
+            {"site": f"{d.traceback[0].filename}:{d.traceback[0].lineno}", "bytes": d.size_diff, "count": d.count_diff}
+            for d in top[: self._s.memory_profile_top]
+        ]
+        self._sites_at = current
+        # Comparing snapshots allocates too; keep that out of the stage's peak.
+        tracemalloc.reset_peak()
+
+    def finish(self) -> dict[str, Any] | None:
+        """Stop tracing, log the profile and add it to StageMemory; returns the row (None when disabled)."""
+        global _active
+        if not self.enabled:
+            return None
+        seconds = time.perf_counter() - self._t0
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(self._peak, peak)
+        if self._sites is None:
+            self.checkpoint()
+        if self._started_tracing:
+            tracemalloc.stop()
+        self.enabled = False
+        self._before = None
+        with _active_lock:
+            _active = None
+
+        peak_bytes = max(0, peak - self._base)
+        row = {
+            "run_date": self.run_date,
+            "stage": self.stage,
+            "scope": self.scope,
+            "row_count": self.rows,
+            "peak_bytes": peak_bytes,
+            "retained_bytes": current - self._base,
+            "bytes_per_row": round(peak_bytes / self.rows, 1) if self.rows else None,
+            "max_rss_bytes": _max_rss_bytes(),
+            "seconds": round(seconds, 3),
+            "top_sites_json": json.dumps(self._sites or []),
+        }
+        log.info(
+            "Memory %s%s %s: peak=%.1fMiB retained=%.1fMiB rows=%s bytes/row=%s max_rss=%s",
+            self.stage, f"[{self.scope}]" if self.scope else "", self.run_date, peak_bytes / 2**20,
+            row["retained_bytes"] / 2**20, self.rows, row["bytes_per_row"], row["max_rss_bytes"],
+        )
+        for site in self._sites or []:
+            log.info("  %10d B %7d blocks  %s", site["bytes"], site["count"], site["site"])
+        try:
+            with connection_pool(self._s).connection() as conn:
+                load_backend(self._s).write_stage_memory(conn, row)
+        except Exception:  # noqa: BLE001
+            # A profiling row is never worth failing the stage over.
+            log.exception("Failed to record the %s memory profile", self.stage)
+        return row
+
+
+def start_stage(s: Settings, stage: str, run_date: date, *, scope: str = "") -> StageProfile:
+    """Start profiling `stage` (if Settings.memory_profile is on); call `finish()` when it ends, also on errors."""
+    return StageProfile(s, stage, run_date, scope).start()
+
+
+@contextmanager
+def profile_stage(s: Settings, stage: str, run_date: date, *, scope: str = "") -> Iterator[StageProfile]:
+    """`start_stage` for a block; the profile is recorded even when the block raises."""
+    prof = start_stage(s, stage, run_date, scope=scope)
+    try:
+        yield prof
+    finally:
+        prof.finish()
+
+
+def memory_report(rows: Iterable[dict[str, Any]], *, threshold: float = 1.25, baseline_runs: int = 7) -> list[dict[str, Any]]:
+    """Each (stage, scope)'s latest profile against the median of up to `baseline_runs` before it.
+
+    `rows` come from `fetch_stage_memory_range` (oldest first per stage and scope).
+    A stage regressed when its peak bytes per row (peak bytes when it has no row
+    count) is more than `threshold` times the baseline median.
+    """
+    by_stage: dict[tuple[str, str], list[dict[str, Any]]] = {}
+    for r in rows:
+        by_stage.setdefault((r["stage"], r["scope"]), []).append(r)
+
+    def metric(r: dict[str, Any]) -> float:
+        return float(r["bytes_per_row"] if r["bytes_per_row"] is not None else r["peak_bytes"])
+
+    out = []
+    for (stage, scope), runs in sorted(by_stage.items()):
+        latest, earlier = runs[-1], runs[-1 - baseline_runs : -1]
+        baseline = statistics.median(metric(r) for r in earlier) if earlier else None
+        ratio = round(metric(latest) / baseline, 3) if baseline else None
+        out.append(
+            {
+                "stage": stage,
+                "scope": scope,
+                "run_date": str(latest["run_date"]),
+                "row_count": latest["row_count"],
+                "peak_bytes": latest["peak_bytes"],
+                "bytes_per_row": latest["bytes_per_row"],
+                "baseline": baseline,
+                "baseline_runs": len(earlier),
+                "ratio": ratio,
+                "regressed": ratio is not None and ratio > threshold,
+                "top_sites": json.loads(latest["top_sites_json"] or "[]")[:3],
+            }
+        )
+    return out
@@ -0,0 +1,51 @@
+"""Numbered schema migrations.
+
+Files live in ``db/migrations/<backend>/NNNN_<name>.sql`` and are applied in
+version order. Each backend's ``ensure_schema`` reads the highest version in its
+``SchemaVersion`` table (one cheap query) and only runs files newer than that.
+Add new tables/indexes as a new file; never edit one that has shipped.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+_NAME_RE = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    def read(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+
+def migrations_dir(backend: str) -> Path:
+    d = Path(__file__).resolve().parents[1] / "db" / "migrations" / backend
+    if not d.exists():
+        d = Path("/opt/ytmusicrec/db/migrations") / backend
+    return d
+
+
+def load_migrations(backend: str) -> list[Migration]:
+    """Return all migrations for `backend`, ordered by version."""
+    out: list[Migration] = []
+    for p in migrations_dir(backend).glob("*.sql"):
+        m = _NAME_RE.match(p.name)
+        if not m:
+            continue
+        out.append(Migration(version=int(m.group(1)), name=m.group(2), path=p))
+    out.sort(key=lambda m: m.version)
+
+    versions = [m.version for m in out]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {migrations_dir(backend)}")
+    return out
+
+
+def pending_migrations(backend: str, current_version: int) -> list[Migration]:
+    return [m for m in load_migrations(backend) if m.version > current_version]
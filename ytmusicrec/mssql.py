@@ -1,18 +1,28 @@
 from __future__ import annotations
 
 import logging
-import hashlib
 import json
 import pyodbc
 import re
-from dataclasses import dataclass
-from datetime import datetime, date
-from pathlib import Path
-from typing import Iterable, Any
+from datetime import datetime, date, timezone
+from typing import Any, Iterable, Iterator, Mapping
 
 
 
+from ytmusicrec.migrations import pending_migrations
+from ytmusicrec.records import VideoRecord
 from ytmusicrec.settings import Settings
+from ytmusicrec.storage import (
+    STAGE_MEMORY_COLUMNS,
+    VIDEO_SIDE_TABLES,
+    RunInfo,
+    attach_examples,
+    examples_json,
+    profile_prompt_params,
+    prompt_hash,
+    scored_themes,
+    theme_example_params,
+)
 
 log = logging.getLogger(__name__)
 _GO_SPLIT_RE = re.compile(r"^\s*GO\s*$", re.IGNORECASE | re.MULTILINE)
@@ -31,40 +41,74 @@ def _conn_str(s: Settings) -> str:
         f"PWD={s.mssql_password};"
         f"Encrypt={s.mssql_encrypt};"
         f"TrustServerCertificate={s.mssql_trust_server_cert};"
-        "Connection Timeout=30;"
+        f"Connection Timeout={s.mssql_login_timeout};"
     )
 
 
 def connect(s: Settings) -> pyodbc.Connection:
-    return pyodbc.connect(_conn_str(s), autocommit=False)
+    conn = pyodbc.connect(_conn_str(s), autocommit=False)
+    # Per-statement timeout (SQL_ATTR_QUERY_TIMEOUT) for every cursor on this connection.
+    conn.timeout = s.mssql_statement_timeout
+    return conn
 
 
-def ensure_schema(conn: pyodbc.Connection) -> None:
-    """Create required tables if they do not exist (idempotent).
+def schema_version(conn: pyodbc.Connection) -> int:
+    """Highest applied migration version (0 if SchemaVersion does not exist yet)."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        IF OBJECT_ID('dbo.SchemaVersion', 'U') IS NULL
+            SELECT 0;
+        ELSE
+            SELECT ISNULL(MAX(version), 0) FROM dbo.SchemaVersion;
+        """
+    )
+    return int(cur.fetchone()[0])
 
-    schema.sql may contain SSMS batch separators (GO). pyodbc cannot execute those directly,
-    so we split into batches and execute sequentially.
-    """
-    sql = Path(__file__).resolve().parents[1] / "db" / "schema.sql"
-    if not sql.exists():
-        sql = Path("/opt/ytmusicrec/db/schema.sql")
 
-    ddl = sql.read_text(encoding="utf-8")
+def ensure_schema(conn: pyodbc.Connection) -> None:
+    """Bring the database up to the latest migration in db/migrations/mssql.
 
-    # Split on lines that are exactly "GO" (ignoring whitespace/case)
-    batches = [b.strip() for b in _GO_SPLIT_RE.split(ddl) if b.strip()]
+    The common case is a single version query. When behind, an app lock serialises
+    concurrent tasks, and each pending file is split on GO and applied in its own
+    transaction together with its SchemaVersion row.
+    """
+    current = schema_version(conn)
+    pending = pending_migrations("mssql", current)
+    if not pending:
+        return
 
     cur = conn.cursor()
-    for batch in batches:
-        cur.execute(batch)
-    conn.commit()
-
+    cur.execute("EXEC sp_getapplock @Resource = 'ytmusicrec_schema', @LockMode = 'Exclusive', @LockOwner = 'Session', @LockTimeout = 120000;")
+    try:
+        cur.execute(
+            """
+            IF OBJECT_ID('dbo.SchemaVersion', 'U') IS NULL
+            BEGIN
+              CREATE TABLE dbo.SchemaVersion (
+                version INT NOT NULL CONSTRAINT PK_SchemaVersion PRIMARY KEY,
+                name NVARCHAR(200) NOT NULL,
+                applied_at DATETIME2 NOT NULL CONSTRAINT DF_SchemaVersion_applied_at DEFAULT SYSUTCDATETIME()
+              );
+            END
+            """
+        )
+        conn.commit()
 
-@dataclass
-class RunInfo:
-    run_id: int
-    run_date: date
-    region_code: str
+        # Another task may have migrated while we waited for the lock.
+        for m in pending_migrations("mssql", schema_version(conn)):
+            log.info("Applying schema migration %04d_%s", m.version, m.name)
+            for batch in (b.strip() for b in _GO_SPLIT_RE.split(m.read())):
+                if batch:
+                    cur.execute(batch)
+            cur.execute("INSERT INTO dbo.SchemaVersion (version, name) VALUES (?, ?)", m.version, m.name)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.execute("EXEC sp_releaseapplock @Resource = 'ytmusicrec_schema', @LockOwner = 'Session';")
+        conn.commit()
 
 
 def update_run_video_count(conn: pyodbc.Connection, run_id: int, video_count: int) -> None:
@@ -73,57 +117,56 @@ def update_run_video_count(conn: pyodbc.Connection, run_id: int, video_count: in
     conn.commit()
 
 
-def upsert_videos(conn: pyodbc.Connection, rows: Iterable[dict[str, Any]]) -> int:
-    """Upsert video rows into dbo.Videos. Returns number of processed rows."""
-    rows_list = list(rows)
-    if not rows_list:
+def upsert_videos(conn: pyodbc.Connection, rows: Iterable[Mapping[str, Any]]) -> int:
+    """Upsert video rows (VideoRecords or dicts) into dbo.Videos. Returns number of processed rows."""
+    # Last row per id wins; sorted so concurrent region workers lock keys in the same order.
+    params = [VideoRecord.from_mapping(r).params() for r in {r["video_id"]: r for r in rows}.values()]
+    params.sort(key=lambda p: p[0])
+    if not params:
         return 0
 
     cur = conn.cursor()
 
-    # Use a temp table + MERGE for performance and idempotency.
+    # Use a temp table + MERGE for performance and idempotency. Timestamps arrive as epoch
+    # seconds and are converted in the MERGE.
     cur.execute(
         """
         IF OBJECT_ID('tempdb..#VideosStage') IS NOT NULL DROP TABLE #VideosStage;
         CREATE TABLE #VideosStage (
-            video_id NVARCHAR(32) NOT NULL,
+            video_id NVARCHAR(32) NOT NULL PRIMARY KEY,
             query NVARCHAR(200) NULL,
             title NVARCHAR(400) NULL,
             description NVARCHAR(MAX) NULL,
             channel_title NVARCHAR(200) NULL,
-            published_at DATETIME2 NULL,
+            published_ts BIGINT NULL,
             view_count BIGINT NULL,
             like_count BIGINT NULL,
             comment_count BIGINT NULL,
-            fetched_at DATETIME2 NOT NULL
+            duration_seconds INT NULL,
+            fetched_ts BIGINT NOT NULL,
+            channel_id NVARCHAR(32) NULL
         );
         """
     )
 
-    insert_sql = (
-        "INSERT INTO #VideosStage (video_id, query, title, description, channel_title, published_at, view_count, like_count, comment_count, fetched_at) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    cur.fast_executemany = True
+    cur.executemany(
+        "INSERT INTO #VideosStage (video_id, query, title, description, channel_title, published_ts, view_count, like_count, comment_count, duration_seconds, fetched_ts, channel_id) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        params,
     )
 
-    for r in rows_list:
-        cur.execute(
-            insert_sql,
-            r["video_id"],
-            r.get("query"),
-            r.get("title"),
-            r.get("description"),
-            r.get("channel_title"),
-            r.get("published_at"),
-            r.get("view_count"),
-            r.get("like_count"),
-            r.get("comment_count"),
-            r.get("fetched_at"),
-        )
-
     cur.execute(
         """
-        MERGE dbo.Videos AS tgt
-        USING #VideosStage AS src
+        MERGE dbo.Videos WITH (HOLDLOCK) AS tgt
+        USING (
+            SELECT video_id, query, title, description, channel_title,
+                   DATEADD(second, published_ts % 86400, DATEADD(day, published_ts / 86400, CAST('1970-01-01' AS DATETIME2))) AS published_at,
+                   view_count, like_count, comment_count, duration_seconds,
+                   DATEADD(second, fetched_ts % 86400, DATEADD(day, fetched_ts / 86400, CAST('1970-01-01' AS DATETIME2))) AS fetched_at,
+                   channel_id
+            FROM #VideosStage
+        ) AS src
             ON tgt.video_id = src.video_id
         WHEN MATCHED THEN
             UPDATE SET
@@ -135,15 +178,17 @@ def upsert_videos(conn: pyodbc.Connection, rows: Iterable[dict[str, Any]]) -> in
                 tgt.view_count = src.view_count,
                 tgt.like_count = src.like_count,
                 tgt.comment_count = src.comment_count,
-                tgt.fetched_at = src.fetched_at
+                tgt.duration_seconds = COALESCE(src.duration_seconds, tgt.duration_seconds),
+                tgt.fetched_at = src.fetched_at,
+                tgt.channel_id = COALESCE(src.channel_id, tgt.channel_id)
         WHEN NOT MATCHED THEN
-            INSERT (video_id, query, title, description, channel_title, published_at, view_count, like_count, comment_count, fetched_at)
-            VALUES (src.video_id, src.query, src.title, src.description, src.channel_title, src.published_at, src.view_count, src.like_count, src.comment_count, src.fetched_at);
+            INSERT (video_id, query, title, description, channel_title, published_at, view_count, like_count, comment_count, duration_seconds, fetched_at, channel_id)
+            VALUES (src.video_id, src.query, src.title, src.description, src.channel_title, src.published_at, src.view_count, src.like_count, src.comment_count, src.duration_seconds, src.fetched_at, src.channel_id);
         """
     )
 
     conn.commit()
-    return len(rows_list)
+    return len(params)
 
 
 def write_daily_themes(conn: pyodbc.Connection, run_date_: date, themes: list[dict[str, Any]]) -> None:
@@ -155,48 +200,70 @@ def write_daily_themes(conn: pyodbc.Connection, run_date_: date, themes: list[di
         CREATE TABLE #ThemesStage (
             run_date DATE NOT NULL,
             theme NVARCHAR(200) NOT NULL,
-            score FLOAT NOT NULL,
-            examples_json NVARCHAR(MAX) NULL
+            score FLOAT NOT NULL
         );
         """
     )
 
-    ins = "INSERT INTO #ThemesStage (run_date, theme, score, examples_json) VALUES (?, ?, ?, ?)"
+    ins = "INSERT INTO #ThemesStage (run_date, theme, score) VALUES (?, ?, ?)"
     for t in themes:
-        cur.execute(ins, run_date_, t["theme"], float(t["score"]), t.get("examples_json"))
+        cur.execute(ins, run_date_, t["theme"], float(t["score"]))
 
+    # Examples go to DailyThemeExamples; clearing examples_json drops any pre-0008 blob on rerun.
     cur.execute(
         """
         MERGE dbo.DailyThemes AS tgt
         USING #ThemesStage AS src
           ON tgt.run_date = src.run_date AND tgt.theme = src.theme
         WHEN MATCHED THEN
-          UPDATE SET tgt.score = src.score, tgt.examples_json = src.examples_json
+          UPDATE SET tgt.score = src.score, tgt.examples_json = NULL
         WHEN NOT MATCHED THEN
-          INSERT (run_date, theme, score, examples_json)
-          VALUES (src.run_date, src.theme, src.score, src.examples_json);
+          INSERT (run_date, theme, score)
+          VALUES (src.run_date, src.theme, src.score);
         """
     )
 
+    cur.execute("DELETE FROM dbo.DailyThemeExamples WHERE run_date = ?", run_date_)
+    example_params = theme_example_params(run_date_, themes)
+    if example_params:
+        cur.fast_executemany = True
+        cur.executemany(
+            "INSERT INTO dbo.DailyThemeExamples (run_date, theme, rank, video_id, score) VALUES (?, ?, ?, ?, ?)",
+            example_params,
+        )
+
     conn.commit()
 
 
-def fetch_videos_for_date(conn: pyodbc.Connection, run_date_: date) -> list[dict[str, Any]]:
+# VideoRecord columns (alias v = dbo.Videos) with timestamps as epoch seconds.
+_VIDEO_RECORD_COLUMNS = """
+    v.video_id, v.query, v.title,
+    COALESCE(v.description, CAST(DECOMPRESS(d.description_gz) AS NVARCHAR(MAX))), v.channel_title,
+    DATEDIFF_BIG(second, '1970-01-01', v.published_at),
+    v.view_count, v.like_count, v.comment_count, v.duration_seconds,
+    DATEDIFF_BIG(second, '1970-01-01', v.fetched_at),
+    v.channel_id, c.subscriber_count
+"""
+# Descriptions moved out of Videos by retention live gzip-compressed in VideoDescriptions;
+# subscriber counts come from the Channels cache.
+_VIDEO_RECORD_JOINS = """
+    LEFT JOIN dbo.VideoDescriptions d ON d.video_id = v.video_id
+    LEFT JOIN dbo.Channels c ON c.channel_id = v.channel_id
+"""
+
+
+def fetch_videos_for_date(conn: pyodbc.Connection, run_date_: date) -> list[VideoRecord]:
     cur = conn.cursor()
     cur.execute(
-        """
-        SELECT video_id, query, title, description, channel_title, published_at, view_count, like_count, comment_count, fetched_at
-        FROM dbo.Videos
-        WHERE CAST(fetched_at AS date) = ?
+        f"""
+        SELECT {_VIDEO_RECORD_COLUMNS}
+        FROM dbo.Videos v
+        {_VIDEO_RECORD_JOINS}
+        WHERE CAST(v.fetched_at AS date) = ?
         """,
         run_date_,
     )
-
-    cols = [c[0] for c in cur.description]
-    out: list[dict[str, Any]] = []
-    for row in cur.fetchall():
-        out.append({cols[i]: row[i] for i in range(len(cols))})
-    return out
+    return [VideoRecord(*row) for row in cur.fetchall()]
 
 def create_run(conn: pyodbc.Connection, run_date_: date, region_code: str, query_count: int) -> RunInfo:
     """
@@ -324,11 +391,12 @@ def write_daily_theme_trends(conn: pyodbc.Connection, run_date_: date, trends: l
         )
     conn.commit()
 
-def fetch_daily_themes_range(conn: pyodbc.Connection, start_date: date, end_date: date) -> list[dict[str, Any]]:
+def fetch_daily_themes_range(conn: pyodbc.Connection, start_date: date, end_date: date, with_examples: bool = False) -> list[dict[str, Any]]:
+    """Theme scores for the range; `with_examples` adds each row's `examples` list."""
     cur = conn.cursor()
     cur.execute(
-        """
-        SELECT run_date, theme, score
+        f"""
+        SELECT run_date, theme, score{", examples_json" if with_examples else ""}
         FROM dbo.DailyThemes
         WHERE run_date >= ? AND run_date <= ?
         """,
@@ -336,10 +404,44 @@ def fetch_daily_themes_range(conn: pyodbc.Connection, start_date: date, end_date
         end_date,
     )
     cols = [c[0] for c in cur.description]
-    return [{cols[i]: row[i] for i in range(len(cols))} for row in cur.fetchall()]
+    rows = [{cols[i]: row[i] for i in range(len(cols))} for row in cur.fetchall()]
+    if with_examples:
+        attach_examples(rows, fetch_daily_theme_examples_range(conn, start_date, end_date))
+    return rows
 
-def _prompt_hash(prompt: str) -> bytes:
-    return hashlib.sha256(prompt.strip().encode("utf-8")).digest()
+
+def fetch_top_themes(conn: pyodbc.Connection, run_date_: date, limit: int, profile: str | None = None) -> list[dict[str, Any]]:
+    """The date's `limit` best themes (theme, score) from DailyThemes, or DailyProfileThemes for `profile`."""
+    cur = conn.cursor()
+    if profile is None:
+        cur.execute("SELECT TOP (?) theme, score FROM dbo.DailyThemes WHERE run_date = ? ORDER BY score DESC, theme", limit, run_date_)
+    else:
+        cur.execute(
+            "SELECT TOP (?) theme, score FROM dbo.DailyProfileThemes WHERE run_date = ? AND profile = ? ORDER BY score DESC, theme",
+            limit,
+            run_date_,
+            profile,
+        )
+    return [{"theme": theme, "score": float(score)} for theme, score in cur.fetchall()]
+
+
+def fetch_daily_theme_examples_range(conn: pyodbc.Connection, start_date: date, end_date: date) -> list[dict[str, Any]]:
+    """DailyThemeExamples rows for the range, with the video's current (or archived) title."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT e.run_date, e.theme, e.rank, e.video_id, e.score, COALESCE(v.title, a.title) AS title
+        FROM dbo.DailyThemeExamples e
+        LEFT JOIN dbo.Videos v ON v.video_id = e.video_id
+        LEFT JOIN dbo.VideosArchive a ON a.video_id = e.video_id
+        WHERE e.run_date >= ? AND e.run_date <= ?
+        ORDER BY e.run_date, e.theme, e.rank
+        """,
+        start_date,
+        end_date,
+    )
+    cols = [c[0] for c in cur.description]
+    return [{cols[i]: row[i] for i in range(len(cols))} for row in cur.fetchall()]
 
 def fetch_recent_prompt_hashes(conn: pyodbc.Connection, tool: str, since_date: date) -> set[bytes]:
     cur = conn.cursor()
@@ -364,7 +466,7 @@ def write_prompt_history(conn: pyodbc.Connection, run_date_: date, tool: str, pr
         prompt = (p.get("prompt") or "").strip()
         if not prompt:
             continue
-        cur.execute(ins, run_date_, tool, prompt, _prompt_hash(prompt), p.get("theme_tags"))
+        cur.execute(ins, run_date_, tool, prompt, prompt_hash(prompt), p.get("theme_tags"))
     conn.commit()
 
 def write_daily_query_stats(conn: pyodbc.Connection, run_date_: date, region_code: str, rows: list[dict[str, Any]]) -> None:
@@ -373,8 +475,9 @@ def write_daily_query_stats(conn: pyodbc.Connection, run_date_: date, region_cod
 
     ins = """
     INSERT INTO dbo.DailyQueryStats
-      (run_date, region_code, query_name, q, video_count, total_views, total_likes, total_comments)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+      (run_date, region_code, query_name, q, video_count, total_views, total_likes, total_comments,
+       new_video_count, score_sum, quota_units)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     """
     for r in rows:
         cur.execute(
@@ -387,6 +490,9 @@ def write_daily_query_stats(conn: pyodbc.Connection, run_date_: date, region_cod
             r.get("total_views"),
             r.get("total_likes"),
             r.get("total_comments"),
+            r.get("new_video_count"),
+            r.get("score_sum"),
+            r.get("quota_units"),
         )
     conn.commit()
 
@@ -404,3 +510,839 @@ def fetch_top_queries(conn: pyodbc.Connection, region_code: str, since_date: dat
         since_date,
     )
     return [row[0] for row in cur.fetchall()]
+
+
+def fetch_query_watermarks(conn: pyodbc.Connection, region_code: str) -> dict[str, datetime]:
+    """Return {q: last successful fetched_at} for incremental collection."""
+    cur = conn.cursor()
+    cur.execute("SELECT q, last_fetched_at FROM dbo.QueryWatermarks WHERE region_code = ?", region_code)
+    return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def set_query_watermarks(conn: pyodbc.Connection, region_code: str, qs: list[str], fetched_at: datetime) -> None:
+    cur = conn.cursor()
+    for q in qs:
+        cur.execute(
+            """
+            MERGE dbo.QueryWatermarks AS tgt
+            USING (SELECT ? AS region_code, ? AS q) AS src
+              ON tgt.region_code = src.region_code AND tgt.q = src.q
+            WHEN MATCHED THEN UPDATE SET tgt.last_fetched_at = ?, tgt.updated_at = SYSUTCDATETIME()
+            WHEN NOT MATCHED THEN INSERT (region_code, q, last_fetched_at) VALUES (?, ?, ?);
+            """,
+            region_code, q, fetched_at,
+            region_code, q, fetched_at,
+        )
+    conn.commit()
+
+
+def fetch_known_video_ids(conn: pyodbc.Connection, published_after: datetime) -> dict[str, str | None]:
+    """Return {video_id: query} for stored videos published after `published_after`."""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT video_id, query FROM dbo.Videos WHERE published_at >= ?",
+        published_after.astimezone(timezone.utc).replace(tzinfo=None),
+    )
+    return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def fetch_region_video_ids(conn: pyodbc.Connection, region_code: str, since_date: date) -> set[str]:
+    """Ids VideoRegions has recorded for the region on or after `since_date`."""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT DISTINCT video_id FROM dbo.VideoRegions WHERE run_date >= ? AND region_code = ?", since_date, region_code
+    )
+    return {row[0] for row in cur.fetchall()}
+
+
+def fetch_query_bandit_state(conn: pyodbc.Connection, region_code: str) -> list[dict[str, Any]]:
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT q, pulls, reward_sum, reward_sq_sum, last_run_date FROM dbo.QueryBanditState WHERE region_code = ?",
+        region_code,
+    )
+    cols = [c[0] for c in cur.description]
+    return [{cols[i]: row[i] for i in range(len(cols))} for row in cur.fetchall()]
+
+
+def update_query_bandit_state(conn: pyodbc.Connection, region_code: str, run_date_: date, rewards: dict[str, float]) -> None:
+    """Add one pull with the given reward to each query's arm."""
+    cur = conn.cursor()
+    for q, reward in rewards.items():
+        cur.execute(
+            """
+            MERGE dbo.QueryBanditState AS tgt
+            USING (SELECT ? AS region_code, ? AS q, CAST(? AS FLOAT) AS reward) AS src
+              ON tgt.region_code = src.region_code AND tgt.q = src.q
+            WHEN MATCHED THEN UPDATE SET
+              tgt.pulls = tgt.pulls + 1,
+              tgt.reward_sum = tgt.reward_sum + src.reward,
+              tgt.reward_sq_sum = tgt.reward_sq_sum + src.reward * src.reward,
+              tgt.last_run_date = ?,
+              tgt.updated_at = SYSUTCDATETIME()
+            WHEN NOT MATCHED THEN INSERT (region_code, q, pulls, reward_sum, reward_sq_sum, last_run_date)
+              VALUES (src.region_code, src.q, 1, src.reward, src.reward * src.reward, ?);
+            """,
+            region_code, q, float(reward),
+            run_date_,
+            run_date_,
+        )
+    conn.commit()
+
+
+def fetch_api_key_usage(conn: pyodbc.Connection, usage_date: date) -> dict[str, dict[str, Any]]:
+    cur = conn.cursor()
+    cur.execute("SELECT key_id, units_used, exhausted FROM dbo.ApiKeyUsage WHERE usage_date = ?", usage_date)
+    return {row[0]: {"units_used": int(row[1]), "exhausted": bool(row[2])} for row in cur.fetchall()}
+
+
+def add_api_key_usage(conn: pyodbc.Connection, usage_date: date, usage: list[dict[str, Any]]) -> None:
+    """Add each key's `units_delta` to the ledger (additive, so parallel workers don't clobber)."""
+    cur = conn.cursor()
+    for u in usage:
+        cur.execute(
+            """
+            MERGE dbo.ApiKeyUsage AS tgt
+            USING (SELECT ? AS usage_date, ? AS key_id, ? AS units, CAST(? AS BIT) AS exhausted) AS src
+              ON tgt.usage_date = src.usage_date AND tgt.key_id = src.key_id
+            WHEN MATCHED THEN UPDATE SET
+              tgt.units_used = tgt.units_used + src.units,
+              tgt.exhausted = CASE WHEN src.exhausted = 1 THEN 1 ELSE tgt.exhausted END,
+              tgt.updated_at = SYSUTCDATETIME()
+            WHEN NOT MATCHED THEN INSERT (usage_date, key_id, units_used, exhausted)
+              VALUES (src.usage_date, src.key_id, src.units, src.exhausted);
+            """,
+            usage_date, u["key_id"], int(u["units_delta"]), int(bool(u["exhausted"])),
+        )
+    conn.commit()
+
+
+def write_video_regions(conn: pyodbc.Connection, run_date_: date, region_code: str, rows: Iterable[dict[str, Any]]) -> None:
+    """Record which region surfaced each video. Upserts, so intra-day incremental runs only add to the day."""
+    params = [(run_date_, region_code, vid, q) for vid, q in {r["video_id"]: r.get("query") for r in rows}.items()]
+    if not params:
+        return
+    cur = conn.cursor()
+    cur.fast_executemany = True
+    cur.executemany(
+        """
+        MERGE dbo.VideoRegions AS tgt
+        USING (SELECT ? AS run_date, ? AS region_code, ? AS video_id, ? AS query) AS src
+          ON tgt.run_date = src.run_date AND tgt.region_code = src.region_code AND tgt.video_id = src.video_id
+        WHEN MATCHED THEN UPDATE SET tgt.query = src.query
+        WHEN NOT MATCHED THEN INSERT (run_date, region_code, video_id, query)
+          VALUES (src.run_date, src.region_code, src.video_id, src.query);
+        """,
+        params,
+    )
+    conn.commit()
+
+
+def fetch_region_videos_for_date(conn: pyodbc.Connection, run_date_: date, region_code: str) -> list[VideoRecord]:
+    """Like fetch_videos_for_date, limited to one region and bucketed by that region's query."""
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT {_VIDEO_RECORD_COLUMNS.replace("v.query", "vr.query")}
+        FROM dbo.VideoRegions vr
+        JOIN dbo.Videos v ON v.video_id = vr.video_id
+        {_VIDEO_RECORD_JOINS}
+        WHERE vr.run_date = ? AND vr.region_code = ?
+        """,
+        run_date_,
+        region_code,
+    )
+    return [VideoRecord(*row) for row in cur.fetchall()]
+
+
+def write_daily_region_themes(conn: pyodbc.Connection, run_date_: date, region_code: str, themes: list[dict[str, Any]]) -> None:
+    cur = conn.cursor()
+    cur.execute("DELETE FROM dbo.DailyRegionThemes WHERE run_date = ? AND region_code = ?", run_date_, region_code)
+    ins = "INSERT INTO dbo.DailyRegionThemes (run_date, region_code, theme, score, examples_json) VALUES (?, ?, ?, ?, ?)"
+    for t in themes:
+        cur.execute(ins, run_date_, region_code, t["theme"], float(t["score"]), examples_json(t))
+    conn.commit()
+
+
+def write_video_queries(conn: pyodbc.Connection, run_date_: date, hits: Mapping[str, Iterable[str]]) -> None:
+    """Record every query string that returned each video. Only adds, like write_video_regions."""
+    params = [(q, vid) for q, ids in hits.items() for vid in set(ids)]
+    if not params:
+        return
+    cur = conn.cursor()
+    cur.execute(
+        """
+        IF OBJECT_ID('tempdb..#QueriesStage') IS NOT NULL DROP TABLE #QueriesStage;
+        CREATE TABLE #QueriesStage (
+            q NVARCHAR(400) NOT NULL,
+            video_id NVARCHAR(32) NOT NULL,
+            PRIMARY KEY (q, video_id)
+        );
+        """
+    )
+    cur.fast_executemany = True
+    cur.executemany("INSERT INTO #QueriesStage (q, video_id) VALUES (?, ?)", params)
+    cur.fast_executemany = False
+    cur.execute(
+        """
+        MERGE dbo.VideoQueries WITH (HOLDLOCK) AS tgt
+        USING #QueriesStage AS src
+            ON tgt.run_date = ? AND tgt.q = src.q AND tgt.video_id = src.video_id
+        WHEN NOT MATCHED THEN
+            INSERT (run_date, q, video_id) VALUES (?, src.q, src.video_id);
+        """,
+        run_date_,
+        run_date_,
+    )
+    conn.commit()
+
+
+def fetch_query_videos_for_date(conn: pyodbc.Connection, run_date_: date, qs: Iterable[str]) -> list[VideoRecord]:
+    """Videos returned by any of the query strings `qs` on the date, one record per (q, video) with `query` = q."""
+    qs = sorted(set(qs))
+    if not qs:
+        return []
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT {_VIDEO_RECORD_COLUMNS.replace("v.query", "vq.q")}
+        FROM dbo.VideoQueries vq
+        JOIN dbo.Videos v ON v.video_id = vq.video_id
+        {_VIDEO_RECORD_JOINS}
+        WHERE vq.run_date = ? AND vq.q IN ({','.join('?' * len(qs))})
+        """,
+        run_date_,
+        *qs,
+    )
+    return [VideoRecord(*row) for row in cur.fetchall()]
+
+
+def write_daily_profile_themes(conn: pyodbc.Connection, run_date_: date, profile: str, themes: list[dict[str, Any]]) -> None:
+    cur = conn.cursor()
+    cur.execute("DELETE FROM dbo.DailyProfileThemes WHERE run_date = ? AND profile = ?", run_date_, profile)
+    ins = "INSERT INTO dbo.DailyProfileThemes (run_date, profile, theme, score, examples_json) VALUES (?, ?, ?, ?, ?)"
+    for t in themes:
+        cur.execute(ins, run_date_, profile, t["theme"], float(t["score"]), examples_json(t))
+    conn.commit()
+
+
+def write_daily_profile_prompts(conn: pyodbc.Connection, run_date_: date, profile: str, prompts: list[dict[str, Any]]) -> None:
+    """Replace the profile's prompts for the date."""
+    cur = conn.cursor()
+    cur.execute("DELETE FROM dbo.DailyProfilePrompts WHERE run_date = ? AND profile = ?", run_date_, profile)
+    ins = "INSERT INTO dbo.DailyProfilePrompts (run_date, profile, rank, tool, prompt, theme_tags) VALUES (?, ?, ?, ?, ?, ?)"
+    for params in profile_prompt_params(run_date_, profile, prompts):
+        cur.execute(ins, *params)
+    conn.commit()
+
+
+def write_stage_memory(conn: pyodbc.Connection, row: dict[str, Any]) -> None:
+    """Add one stage's memory profile (keys as in STAGE_MEMORY_COLUMNS)."""
+    cur = conn.cursor()
+    cur.execute(
+        f"INSERT INTO dbo.StageMemory ({', '.join(STAGE_MEMORY_COLUMNS)}) VALUES ({', '.join('?' * len(STAGE_MEMORY_COLUMNS))})",
+        *(row.get(c) for c in STAGE_MEMORY_COLUMNS),
+    )
+    conn.commit()
+
+
+def fetch_stage_memory_range(conn: pyodbc.Connection, start_date: date, end_date: date, stage: str | None = None) -> list[dict[str, Any]]:
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT {', '.join(STAGE_MEMORY_COLUMNS)}, recorded_at
+        FROM dbo.StageMemory
+        WHERE run_date >= ? AND run_date <= ? AND (? IS NULL OR stage = ?)
+        ORDER BY stage, scope, run_date, stage_memory_id
+        """,
+        start_date,
+        end_date,
+        stage,
+        stage,
+    )
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def fetch_video_signatures(conn: pyodbc.Connection, video_ids: Iterable[str], algo: str) -> list[dict[str, Any]]:
+    """Cached clustering signatures of `algo` for `video_ids` (missing ids are simply absent)."""
+    ids = sorted(set(video_ids))
+    cur = conn.cursor()
+    out: list[dict[str, Any]] = []
+    # Stay well under SQL Server's 2100-parameter limit.
+    for i in range(0, len(ids), 1000):
+        chunk = ids[i : i + 1000]
+        cur.execute(
+            f"SELECT video_id, signature, terms FROM dbo.VideoSignatures WHERE algo = ? AND video_id IN ({','.join('?' * len(chunk))})",
+            algo,
+            *chunk,
+        )
+        out.extend({"video_id": r[0], "signature": bytes(r[1]), "terms": r[2]} for r in cur.fetchall())
+    return out
+
+
+def write_video_signatures(conn: pyodbc.Connection, rows: list[dict[str, Any]], algo: str) -> None:
+    if not rows:
+        return
+    cur = conn.cursor()
+    cur.fast_executemany = True
+    cur.executemany(
+        """
+        MERGE dbo.VideoSignatures AS tgt
+        USING (SELECT ? AS video_id, ? AS algo, ? AS signature, ? AS terms) AS src
+          ON tgt.video_id = src.video_id
+        WHEN MATCHED THEN UPDATE SET
+          tgt.algo = src.algo, tgt.signature = src.signature, tgt.terms = src.terms, tgt.computed_at = SYSUTCDATETIME()
+        WHEN NOT MATCHED THEN INSERT (video_id, algo, signature, terms)
+          VALUES (src.video_id, src.algo, src.signature, src.terms);
+        """,
+        [(r["video_id"], algo, r["signature"], r["terms"]) for r in rows],
+    )
+    conn.commit()
+
+
+_FINGERPRINT_COLS = "video_id, simhash, duration_seconds, canonical_video_id, published_at"
+
+
+def fetch_video_fingerprints(conn: pyodbc.Connection, video_ids: Iterable[str], algo: str) -> list[dict[str, Any]]:
+    ids = sorted(set(video_ids))
+    cur = conn.cursor()
+    out: list[dict[str, Any]] = []
+    for i in range(0, len(ids), 1000):
+        chunk = ids[i : i + 1000]
+        cur.execute(
+            f"SELECT {_FINGERPRINT_COLS} FROM dbo.VideoFingerprints WHERE algo = ? AND video_id IN ({','.join('?' * len(chunk))})",
+            algo,
+            *chunk,
+        )
+        cols = [c[0] for c in cur.description]
+        out.extend({cols[j]: row[j] for j in range(len(cols))} for row in cur.fetchall())
+    return out
+
+
+def fetch_recent_fingerprints(conn: pyodbc.Connection, published_after: datetime, algo: str) -> list[dict[str, Any]]:
+    """Fingerprints of videos published after `published_after`, to seed the duplicate index."""
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT {_FINGERPRINT_COLS} FROM dbo.VideoFingerprints WHERE published_at >= ? AND algo = ?",
+        published_after.astimezone(timezone.utc).replace(tzinfo=None),
+        algo,
+    )
+    cols = [c[0] for c in cur.description]
+    return [{cols[j]: row[j] for j in range(len(cols))} for row in cur.fetchall()]
+
+
+def write_video_fingerprints(conn: pyodbc.Connection, rows: list[dict[str, Any]], algo: str) -> None:
+    if not rows:
+        return
+    cur = conn.cursor()
+    cur.fast_executemany = True
+    cur.executemany(
+        """
+        MERGE dbo.VideoFingerprints AS tgt
+        USING (SELECT ? AS video_id, ? AS algo, ? AS simhash, ? AS duration_seconds, ? AS canonical_video_id, ? AS published_at) AS src
+          ON tgt.video_id = src.video_id
+        WHEN MATCHED THEN UPDATE SET
+          tgt.algo = src.algo, tgt.simhash = src.simhash, tgt.duration_seconds = src.duration_seconds,
+          tgt.canonical_video_id = src.canonical_video_id, tgt.published_at = src.published_at, tgt.computed_at = SYSUTCDATETIME()
+        WHEN NOT MATCHED THEN INSERT (video_id, algo, simhash, duration_seconds, canonical_video_id, published_at)
+          VALUES (src.video_id, src.algo, src.simhash, src.duration_seconds, src.canonical_video_id, src.published_at);
+        """,
+        [
+            (
+                r["video_id"],
+                algo,
+                r["simhash"],
+                r.get("duration_seconds"),
+                r["canonical_video_id"],
+                r.get("published_at"),
+            )
+            for r in rows
+        ],
+    )
+    conn.commit()
+
+
+def fetch_video_features(conn: pyodbc.Connection, video_ids: Iterable[str], version: int) -> dict[str, dict[str, Any]]:
+    """Stored VideoFeatures rows of `version` for `video_ids`, by id (missing ids are simply absent)."""
+    ids = sorted(set(video_ids))
+    out: dict[str, dict[str, Any]] = {}
+    cur = conn.cursor()
+    for i in range(0, len(ids), 1000):
+        chunk = ids[i : i + 1000]
+        cur.execute(
+            f"SELECT video_id, title_tokens FROM dbo.VideoFeatures WHERE version = ? AND video_id IN ({','.join('?' * len(chunk))})",
+            version,
+            *chunk,
+        )
+        out.update((r[0], {"video_id": r[0], "title_tokens": r[1]}) for r in cur.fetchall())
+    return out
+
+
+def write_video_features(conn: pyodbc.Connection, rows: list[dict[str, Any]], version: int) -> None:
+    if not rows:
+        return
+    cur = conn.cursor()
+    cur.execute(
+        """
+        IF OBJECT_ID('tempdb..#FeaturesStage') IS NOT NULL DROP TABLE #FeaturesStage;
+        CREATE TABLE #FeaturesStage (
+            video_id NVARCHAR(32) NOT NULL PRIMARY KEY,
+            title_tokens NVARCHAR(400) NULL
+        );
+        """
+    )
+    cur.fast_executemany = True
+    cur.executemany(
+        "INSERT INTO #FeaturesStage (video_id, title_tokens) VALUES (?, ?)",
+        [(r["video_id"], r["title_tokens"]) for r in rows],
+    )
+    cur.fast_executemany = False
+    cur.execute(
+        """
+        MERGE dbo.VideoFeatures WITH (HOLDLOCK) AS tgt
+        USING #FeaturesStage AS src
+            ON tgt.video_id = src.video_id
+        WHEN MATCHED THEN
+            UPDATE SET version = ?, title_tokens = src.title_tokens, computed_at = SYSUTCDATETIME()
+        WHEN NOT MATCHED THEN
+            INSERT (video_id, version, title_tokens)
+            VALUES (src.video_id, ?, src.title_tokens);
+        """,
+        version,
+        version,
+    )
+    conn.commit()
+
+
+def iter_videos_for_range(conn: pyodbc.Connection, start_date: date, end_date: date, batch_size: int = 5000) -> Iterator[VideoRecord]:
+    """Stream the videos fetched on `start_date`..`end_date` in one scan, ordered by fetched_at.
+
+    The same rows fetch_videos_for_date returns day by day. Keep the generator on its own
+    connection while writing elsewhere: pyodbc can't interleave statements without MARS.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT {_VIDEO_RECORD_COLUMNS}
+        FROM dbo.Videos v
+        {_VIDEO_RECORD_JOINS}
+        WHERE v.fetched_at >= ? AND v.fetched_at < DATEADD(day, 1, CAST(? AS DATETIME2))
+        ORDER BY v.fetched_at
+        """,
+        start_date,
+        end_date,
+    )
+    while True:
+        batch = cur.fetchmany(batch_size)
+        if not batch:
+            return
+        for row in batch:
+            yield VideoRecord(*row)
+
+
+def replace_daily_themes_bulk(conn: pyodbc.Connection, themes_by_date: dict[date, list[dict[str, Any]]]) -> int:
+    """Replace DailyThemes (and their examples) for every date in `themes_by_date` in one transaction. Returns rows written."""
+    params = [(d, t["theme"], float(t["score"])) for d, themes in sorted(themes_by_date.items()) for t in themes]
+    example_params = [p for d, themes in sorted(themes_by_date.items()) for p in theme_example_params(d, themes)]
+    if not themes_by_date:
+        return 0
+    dates = [(d,) for d in sorted(themes_by_date)]
+    cur = conn.cursor()
+    cur.fast_executemany = True
+    cur.executemany("DELETE FROM dbo.DailyThemes WHERE run_date = ?", dates)
+    cur.executemany("DELETE FROM dbo.DailyThemeExamples WHERE run_date = ?", dates)
+    if params:
+        cur.executemany("INSERT INTO dbo.DailyThemes (run_date, theme, score) VALUES (?, ?, ?)", params)
+    if example_params:
+        cur.executemany(
+            "INSERT INTO dbo.DailyThemeExamples (run_date, theme, rank, video_id, score) VALUES (?, ?, ?, ?, ?)",
+            example_params,
+        )
+    conn.commit()
+    return len(params)
+
+
+def replace_daily_theme_trends_bulk(conn: pyodbc.Connection, trends_by_date: dict[date, list[dict[str, Any]]]) -> int:
+    params = [
+        (d, t["theme"], float(t["score"]), t.get("prev_score"), t.get("delta_1d"), t.get("avg_7d"), t.get("momentum"))
+        for d, trends in sorted(trends_by_date.items())
+        for t in trends
+    ]
+    if not trends_by_date:
+        return 0
+    cur = conn.cursor()
+    cur.fast_executemany = True
+    cur.executemany("DELETE FROM dbo.DailyThemeTrends WHERE run_date = ?", [(d,) for d in sorted(trends_by_date)])
+    if params:
+        cur.executemany(
+            """
+            INSERT INTO dbo.DailyThemeTrends (run_date, theme, score, prev_score, delta_1d, avg_7d, momentum)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            params,
+        )
+    conn.commit()
+    return len(params)
+
+
+def fetch_daily_theme_trends_range(conn: pyodbc.Connection, start_date: date, end_date: date) -> list[dict[str, Any]]:
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT run_date, theme, score, prev_score, delta_1d, avg_7d, momentum
+        FROM dbo.DailyThemeTrends
+        WHERE run_date >= ? AND run_date <= ?
+        ORDER BY run_date, score DESC
+        """,
+        start_date,
+        end_date,
+    )
+    cols = [c[0] for c in cur.description]
+    return [{cols[i]: row[i] for i in range(len(cols))} for row in cur.fetchall()]
+
+
+def fetch_daily_prompts_range(conn: pyodbc.Connection, start_date: date, end_date: date, tool: str | None = None) -> list[dict[str, Any]]:
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT run_date, tool, prompt, theme_tags
+        FROM dbo.DailyPrompts
+        WHERE run_date >= ? AND run_date <= ? AND (? IS NULL OR tool = ?)
+        ORDER BY run_date, prompt_id
+        """,
+        start_date,
+        end_date,
+        tool,
+        tool,
+    )
+    cols = [c[0] for c in cur.description]
+    return [{cols[i]: row[i] for i in range(len(cols))} for row in cur.fetchall()]
+
+
+# Retention batches (ytmusicrec/retention.py). Each call moves at most TOP (?) rows in one
+# short transaction: READPAST skips rows the daily MERGE has locked instead of waiting on
+# them, LOW deadlock priority makes this side the victim if the two ever collide, and
+# batches stay under SQL Server's ~5000-lock escalation threshold.
+_RETENTION_BATCH = """
+SET NOCOUNT ON;
+SET DEADLOCK_PRIORITY LOW;
+DECLARE @batch TABLE (video_id NVARCHAR(32) PRIMARY KEY);
+INSERT INTO @batch (video_id)
+SELECT TOP (?) video_id
+FROM dbo.Videos WITH (READPAST)
+WHERE fetched_at < ? {where}
+ORDER BY fetched_at;
+"""
+
+
+def compress_video_descriptions(conn: pyodbc.Connection, before: datetime, limit: int) -> int:
+    """Move up to `limit` inline descriptions of videos fetched before `before` to VideoDescriptions.
+
+    One short transaction per call. Returns videos moved (0 when nothing is left).
+    """
+    cur = conn.cursor()
+    cur.execute(
+        _RETENTION_BATCH.format(where="AND description IS NOT NULL")
+        + """
+        MERGE dbo.VideoDescriptions AS tgt
+        USING (
+          SELECT v.video_id, COMPRESS(v.description) AS description_gz
+          FROM dbo.Videos v JOIN @batch b ON b.video_id = v.video_id
+        ) AS src
+        ON tgt.video_id = src.video_id
+        WHEN MATCHED THEN UPDATE SET description_gz = src.description_gz, moved_at = SYSUTCDATETIME()
+        WHEN NOT MATCHED THEN INSERT (video_id, description_gz) VALUES (src.video_id, src.description_gz);
+
+        UPDATE v SET description = NULL
+        FROM dbo.Videos v JOIN @batch b ON b.video_id = v.video_id;
+
+        SELECT COUNT(*) FROM @batch;
+        """,
+        limit,
+        before,
+    )
+    moved = int(cur.fetchone()[0])
+    conn.commit()
+    return moved
+
+
+def archive_videos(conn: pyodbc.Connection, before: datetime, limit: int) -> int:
+    """Move up to `limit` videos fetched before `before` into VideosArchive (description compressed).
+
+    Their side-table rows (VIDEO_SIDE_TABLES) go too. Returns videos moved.
+    """
+    deletes = "\n".join(
+        f"DELETE t FROM dbo.{table} t JOIN @batch b ON b.video_id = t.video_id;" for table in (*VIDEO_SIDE_TABLES, "Videos")
+    )
+    cur = conn.cursor()
+    cur.execute(
+        _RETENTION_BATCH.format(where="")
+        + f"""
+        MERGE dbo.VideosArchive AS tgt
+        USING (
+          SELECT v.video_id, v.query, v.title, COALESCE(d.description_gz, COMPRESS(v.description)) AS description_gz,
+                 v.channel_title, v.published_at, v.view_count, v.like_count, v.comment_count,
+                 v.duration_seconds, v.fetched_at, v.channel_id
+          FROM dbo.Videos v
+          JOIN @batch b ON b.video_id = v.video_id
+          LEFT JOIN dbo.VideoDescriptions d ON d.video_id = v.video_id
+        ) AS src
+        ON tgt.video_id = src.video_id
+        WHEN MATCHED THEN UPDATE SET
+          query = src.query, title = src.title, description_gz = src.description_gz,
+          channel_title = src.channel_title, published_at = src.published_at, view_count = src.view_count,
+          like_count = src.like_count, comment_count = src.comment_count,
+          duration_seconds = src.duration_seconds, fetched_at = src.fetched_at, channel_id = src.channel_id,
+          archived_at = SYSUTCDATETIME()
+        WHEN NOT MATCHED THEN INSERT
+          (video_id, query, title, description_gz, channel_title, published_at, view_count, like_count,
+           comment_count, duration_seconds, fetched_at, channel_id)
+        VALUES
+          (src.video_id, src.query, src.title, src.description_gz, src.channel_title, src.published_at,
+           src.view_count, src.like_count, src.comment_count, src.duration_seconds, src.fetched_at, src.channel_id);
+
+        {deletes}
+
+        SELECT COUNT(*) FROM @batch;
+        """,
+        limit,
+        before,
+    )
+    moved = int(cur.fetchone()[0])
+    conn.commit()
+    return moved
+
+
+def fetch_archivable_videos(conn: pyodbc.Connection, before: datetime, limit: int) -> list[VideoRecord]:
+    """Up to `limit` of the oldest videos fetched before `before`, descriptions decompressed."""
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT TOP (?) {_VIDEO_RECORD_COLUMNS}
+        FROM dbo.Videos v WITH (READPAST)
+        {_VIDEO_RECORD_JOINS}
+        WHERE v.fetched_at < ?
+        ORDER BY v.fetched_at
+        """,
+        limit,
+        before,
+    )
+    return [VideoRecord(*row) for row in cur.fetchall()]
+
+
+def delete_videos(conn: pyodbc.Connection, video_ids: Iterable[str]) -> int:
+    """Delete videos (with their VIDEO_SIDE_TABLES rows) once archived elsewhere."""
+    ids = list(video_ids)
+    if not ids:
+        return 0
+    cur = conn.cursor()
+    cur.execute("SET DEADLOCK_PRIORITY LOW")
+    cur.execute("CREATE TABLE #RetentionIds (video_id NVARCHAR(32) NOT NULL PRIMARY KEY)")
+    cur.fast_executemany = True
+    cur.executemany("INSERT INTO #RetentionIds (video_id) VALUES (?)", [(i,) for i in ids])
+    cur.fast_executemany = False
+    for table in (*VIDEO_SIDE_TABLES, "Videos"):
+        cur.execute(f"DELETE t FROM dbo.{table} t JOIN #RetentionIds r ON r.video_id = t.video_id")
+    cur.execute("DROP TABLE #RetentionIds")
+    conn.commit()
+    return len(ids)
+
+
+def fetch_channels(conn: pyodbc.Connection, channel_ids: Iterable[str]) -> dict[str, dict[str, Any]]:
+    """Cached Channels rows for `channel_ids`, by id (missing ids are simply absent)."""
+    ids = sorted(set(channel_ids))
+    out: dict[str, dict[str, Any]] = {}
+    cur = conn.cursor()
+    for i in range(0, len(ids), 1000):
+        chunk = ids[i : i + 1000]
+        cur.execute(
+            f"SELECT channel_id, subscriber_count, video_count, view_count, fetched_at FROM dbo.Channels WHERE channel_id IN ({','.join('?' * len(chunk))})",
+            *chunk,
+        )
+        cols = [c[0] for c in cur.description]
+        out.update((r[0], dict(zip(cols, r))) for r in cur.fetchall())
+    return out
+
+
+def upsert_channels(conn: pyodbc.Connection, rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        return
+    cur = conn.cursor()
+    cur.execute(
+        """
+        IF OBJECT_ID('tempdb..#ChannelsStage') IS NOT NULL DROP TABLE #ChannelsStage;
+        CREATE TABLE #ChannelsStage (
+            channel_id NVARCHAR(32) NOT NULL PRIMARY KEY,
+            subscriber_count BIGINT NULL,
+            video_count BIGINT NULL,
+            view_count BIGINT NULL,
+            fetched_at DATETIME2 NOT NULL
+        );
+        """
+    )
+    cur.fast_executemany = True
+    cur.executemany(
+        "INSERT INTO #ChannelsStage (channel_id, subscriber_count, video_count, view_count, fetched_at) VALUES (?, ?, ?, ?, ?)",
+        [
+            (r["channel_id"], r.get("subscriber_count"), r.get("video_count"), r.get("view_count"), r["fetched_at"].astimezone(timezone.utc).replace(tzinfo=None))
+            for r in {r["channel_id"]: r for r in rows}.values()
+        ],
+    )
+    cur.fast_executemany = False
+    cur.execute(
+        """
+        MERGE dbo.Channels WITH (HOLDLOCK) AS tgt
+        USING #ChannelsStage AS src
+            ON tgt.channel_id = src.channel_id
+        WHEN MATCHED THEN
+            UPDATE SET subscriber_count = src.subscriber_count, video_count = src.video_count,
+                       view_count = src.view_count, fetched_at = src.fetched_at
+        WHEN NOT MATCHED THEN
+            INSERT (channel_id, subscriber_count, video_count, view_count, fetched_at)
+            VALUES (src.channel_id, src.subscriber_count, src.video_count, src.view_count, src.fetched_at);
+        """
+    )
+    conn.commit()
+
+
+# A day's videos the way fetch_videos_for_date / fetch_region_videos_for_date select them:
+# (FROM clause, WHERE clause, bucket column), over @run_date and @region_code.
+_SCOPES = {
+    False: (
+        "FROM dbo.Videos v",
+        "v.fetched_at >= CAST(@run_date AS DATETIME2) AND v.fetched_at < DATEADD(day, 1, CAST(@run_date AS DATETIME2))",
+        "v.query",
+    ),
+    True: (
+        "FROM dbo.VideoRegions vr JOIN dbo.Videos v ON v.video_id = vr.video_id",
+        "vr.run_date = @run_date AND vr.region_code = @region_code",
+        "vr.query",
+    ),
+}
+
+
+def fetch_unfingerprinted_videos(conn: pyodbc.Connection, run_date_: date, algo: str, region_code: str | None = None) -> list[VideoRecord]:
+    """The day's videos (one region's with `region_code`) that have no `algo` fingerprint yet."""
+    frm, cond, bucket = _SCOPES[region_code is not None]
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        DECLARE @run_date DATE = ?, @region_code NVARCHAR(10) = ?, @algo NVARCHAR(32) = ?;
+        SELECT {_VIDEO_RECORD_COLUMNS.replace("v.query", bucket)}
+        {frm}
+        {_VIDEO_RECORD_JOINS}
+        WHERE {cond}
+          AND NOT EXISTS (SELECT 1 FROM dbo.VideoFingerprints f WHERE f.video_id = v.video_id AND f.algo = @algo);
+        """,
+        run_date_,
+        region_code,
+        algo,
+    )
+    return [VideoRecord(*row) for row in cur.fetchall()]
+
+
+# scoring.compute_video_score as T-SQL, operation for operation, so results match the
+# Python scorer before summing. `base` is the subscriber-free score collapse_duplicates
+# ranks duplicates by. Leaves one row per kept video in #ThemeScores.
+_SCORE_THEMES = """
+    SET NOCOUNT ON;
+    DECLARE @run_date DATE = ?, @region_code NVARCHAR(10) = ?, @algo NVARCHAR(32) = ?, @weight FLOAT = ?;
+    IF OBJECT_ID('tempdb..#ThemeScores') IS NOT NULL DROP TABLE #ThemeScores;
+
+    WITH src AS (
+        SELECT {bucket} AS query, v.video_id, v.title,
+               CAST(ISNULL(v.view_count, 0) AS FLOAT) AS views,
+               CAST(ISNULL(v.like_count, 0) AS FLOAT) AS likes,
+               CAST(ISNULL(v.comment_count, 0) AS FLOAT) AS comments,
+               CAST(DATEDIFF_BIG(second, v.published_at, v.fetched_at) AS FLOAT) AS age_seconds,
+               CAST(c.subscriber_count AS FLOAT) AS subscribers,
+               IIF(@algo IS NULL, v.video_id, COALESCE(f.canonical_video_id, v.video_id)) AS dup_group
+        {frm}
+        LEFT JOIN dbo.Channels c ON c.channel_id = v.channel_id
+        LEFT JOIN dbo.VideoFingerprints f ON f.video_id = v.video_id AND f.algo = @algo
+        WHERE {cond}
+    ),
+    scored AS (
+        SELECT *,
+               CASE WHEN age_seconds IS NULL THEN views
+                    ELSE LOG10(views / IIF(age_seconds / 3600.0 > 1.0, age_seconds / 3600.0, 1.0) + 1.0)
+                         * (1.0 + 2.0 * (likes / IIF(views > 1.0, views, 1.0)) + 3.0 * (comments / IIF(views > 1.0, views, 1.0)))
+               END AS base
+        FROM src
+    ),
+    kept AS (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY dup_group ORDER BY base DESC, video_id) AS dup_rank
+        FROM scored
+    ),
+    final AS (
+        SELECT COALESCE(NULLIF(query, N''), N'(unknown)') AS theme, video_id, title,
+               base + IIF(@weight <> 0 AND subscribers IS NOT NULL,
+                          @weight * LOG10(1.0 + views / IIF(subscribers > 1000.0, subscribers, 1000.0)), 0.0) AS score
+        FROM kept
+        WHERE dup_rank = 1
+    )
+    SELECT theme, video_id, title, score,
+           ROW_NUMBER() OVER (PARTITION BY theme ORDER BY score DESC, video_id) AS theme_rank
+    INTO #ThemeScores
+    FROM final;
+"""
+
+
+def score_query_themes(
+    conn: pyodbc.Connection,
+    run_date_: date,
+    region_code: str | None = None,
+    *,
+    subscriber_weight: float = 0.0,
+    dedup_algo: str | None = None,
+    write: bool = True,
+) -> list[dict[str, Any]]:
+    """score_themes_by_query for a day's videos, computed on the server.
+
+    Videos are scored and collapsed to one per duplicate group (stored `dedup_algo`
+    fingerprints; None skips that) into #ThemeScores, and themes and their top-5
+    examples are aggregated from it. With `write`, DailyThemes/DailyThemeExamples
+    (or DailyRegionThemes for `region_code`) are replaced like write_daily_themes /
+    write_daily_region_themes would. Returns the theme rows.
+    """
+    frm, cond, bucket = _SCOPES[region_code is not None]
+    cur = conn.cursor()
+    cur.execute(
+        _SCORE_THEMES.format(bucket=bucket, frm=frm, cond=cond),
+        run_date_,
+        region_code,
+        dedup_algo,
+        float(subscriber_weight),
+    )
+    cur.execute("SELECT theme, ROUND(SUM(score), 6) FROM #ThemeScores GROUP BY theme")
+    theme_rows = cur.fetchall()
+    cur.execute("SELECT theme, video_id, title, ROUND(score, 4) FROM #ThemeScores WHERE theme_rank <= 5 ORDER BY theme, theme_rank")
+    themes = scored_themes(theme_rows, cur.fetchall())
+
+    if write and region_code is None:
+        cur.execute(
+            """
+            SET NOCOUNT ON;
+            DECLARE @run_date DATE = ?;
+            MERGE dbo.DailyThemes AS tgt
+            USING (SELECT theme, ROUND(SUM(score), 6) AS score FROM #ThemeScores GROUP BY theme) AS src
+              ON tgt.run_date = @run_date AND tgt.theme = src.theme
+            WHEN MATCHED THEN
+              UPDATE SET tgt.score = src.score, tgt.examples_json = NULL
+            WHEN NOT MATCHED THEN
+              INSERT (run_date, theme, score)
+              VALUES (@run_date, src.theme, src.score);
+
+            DELETE FROM dbo.DailyThemeExamples WHERE run_date = @run_date;
+            INSERT INTO dbo.DailyThemeExamples (run_date, theme, rank, video_id, score)
+            SELECT @run_date, theme, theme_rank, video_id, ROUND(score, 4) FROM #ThemeScores WHERE theme_rank <= 5;
+            """,
+            run_date_,
+        )
+    cur.execute("DROP TABLE #ThemeScores")
+    conn.commit()
+    if write and region_code is not None:
+        # Regions keep examples inline as JSON; that is a handful of rows per theme.
+        write_daily_region_themes(conn, run_date_, region_code, themes)
+    return themes
@@ -4,7 +4,7 @@ import json
 import logging
 from typing import Any
 
-import requests
+from ytmusicrec.httpclient import http_client
 
 log = logging.getLogger(__name__)
 
@@ -24,7 +24,7 @@ def generate_json(*, base_url: str, model: str, prompt: str, temperature: float
         },
     }
 
-    r = requests.post(url, json=payload, timeout=120)
+    r = http_client().post(url, json=payload, service="ollama", endpoint="ollama /api/generate")
     r.raise_for_status()
     data = r.json()
     text = (data.get("response") or "").strip()
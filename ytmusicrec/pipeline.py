@@ -1,97 +1,202 @@
 from __future__ import annotations
 
 import logging
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
-import yaml
-
+from ytmusicrec.api import bump_cache_stamp
+from ytmusicrec.columnar import export_and_cache
 from ytmusicrec.logging_setup import configure_logging
-from ytmusicrec.settings import load_settings
-from ytmusicrec.youtube import QueryConfig, search_videos, fetch_video_details, parse_video_row
-from ytmusicrec.mssql import connect, ensure_schema, create_run, update_run_video_count, upsert_videos, fetch_videos_for_date, write_daily_themes, write_daily_prompts,fetch_daily_themes_range, write_daily_theme_trends, write_daily_query_stats, fetch_top_queries, fetch_recent_prompt_hashes, write_prompt_history
-from ytmusicrec.scoring import score_themes_by_query, compute_theme_trends
+from ytmusicrec.records import VideoRecord, to_epoch
+from ytmusicrec.retention import run_retention
+from ytmusicrec.settings import Settings, load_query_config, load_settings
+from ytmusicrec.youtube import KeyPool, QueryConfig, iter_search_pages, fetch_video_details, parse_video_row, quota_day
+from ytmusicrec.storage import load_backend
+from ytmusicrec.scoring import compute_video_score, compute_theme_trends
+from ytmusicrec.dbpool import connection_pool
+from ytmusicrec.dedup import collapse_near_duplicates
+from ytmusicrec.channels import enrich_channels
+from ytmusicrec.features import ensure_features
+from ytmusicrec.memprofile import profile_stage, start_stage
+from ytmusicrec.handoff import TOP_THEMES, prompts_md_name, read_artifact, run_ref, write_artifact
+from ytmusicrec.profiles import load_profiles, score_profiles, union_queries
+from ytmusicrec.themes import load_signatures, score_themes, score_themes_in_db, theme_engine, theme_method
+from ytmusicrec.scheduler import choose_queries, query_quota_cost, query_reward, states_from_rows
 from ytmusicrec.prompts import generate_prompts, render_markdown
 from ytmusicrec.io_utils import write_text
 from ytmusicrec.discord_webhook import post_long_message
+from ytmusicrec.httpclient import http_client
 from ytmusicrec.sheets import write_daily as sheets_write_daily
 from airflow.sdk import get_current_context
 
 
 log = logging.getLogger(__name__)
 
-def load_query_config(repo_root: Path) -> dict[str, Any]:
-    path = repo_root / "config" / "queries.yaml"
-    return yaml.safe_load(path.read_text(encoding="utf-8"))
+def _dedupe_queries(qs: list[str]) -> list[str]:
+    out: list[str] = []
+    for q in qs:
+        q = (q or "").strip()
+        if q and q not in out:
+            out.append(q)
+    return out
+
+
+def _search_window_start(window_start: datetime, watermark: datetime | None) -> datetime:
+    """Incremental runs only search what was published since the query's last successful run."""
+    if watermark is None:
+        return window_start
+    if watermark.tzinfo is None:
+        watermark = watermark.replace(tzinfo=timezone.utc)
+    return max(window_start, watermark)
+
+
+def _resolve_run_date(ctx: Any, run_date: str | None) -> str:
+    if run_date:
+        return run_date
+
+    # Airflow 3 task runtime context can vary (manual runs may not have data_interval_start).
+    dt = (
+        ctx.get("data_interval_start")
+        or ctx.get("logical_date")
+        or ctx.get("execution_date")
+        or (ctx.get("dag_run").logical_date if ctx.get("dag_run") else None)
+    )
+    if dt is None:
+        return date.today().isoformat()
+    return dt.date().isoformat()
+
+
+def collect_regions(cfg: dict[str, Any], s: Settings) -> list[str]:
+    """Regions to collect: `region_codes` (multi-region) or the single `region_code`."""
+    regions = cfg.get("region_codes") or list(s.region_codes) or [cfg.get("region_code", s.region_code)]
+    return list(dict.fromkeys(str(r).upper() for r in regions))
 
 
-def task_collect_youtube_to_mssql(run_date: str | None = None) -> dict[str, Any]:
+def task_collect_youtube_to_mssql(run_date: str | None = None, incremental: bool | None = None) -> dict[str, Any]:
     """Airflow task: collect YouTube video data into MSSQL.
 
+    With `incremental` (or `incremental.enabled` in queries.yaml) each query only
+    searches since its last successful run, and videos already stored inside the
+    days_back window get a cheap videos.list stats refresh instead.
+
+    With several `region_codes`, each region is collected in its own worker
+    process so wall time stays close to a single region's.
+
     Returns a dict used for XCom.
     """
     configure_logging()
     s = load_settings()
+    db = load_backend(s)
     ctx = get_current_context()
     ti = ctx["ti"]
-    total_views = 0
-    total_likes = 0
-    total_comments = 0
-    video_count = 0
-
-    if not run_date:
-        
-
-        # Airflow 3 task runtime context can vary (manual runs may not have data_interval_start).
-        dt = (
-            ctx.get("data_interval_start")
-            or ctx.get("logical_date")
-            or ctx.get("execution_date")
-            or (ctx.get("dag_run").logical_date if ctx.get("dag_run") else None)
-        )
-        if dt is None:
-            run_date = date.today().isoformat()
-        else:
-            run_date = dt.date().isoformat()
 
-    
+    run_dt = date.fromisoformat(_resolve_run_date(ctx, run_date))
+    cfg = load_query_config(s.repo_root)
+    regions = collect_regions(cfg, s)
+    if incremental is None:
+        incremental = bool((cfg.get("incremental", {}) or {}).get("enabled", False))
+    fetched_at = datetime.now(timezone.utc)
+
+    # Migrate once up front so region workers don't queue on the schema lock.
+    db_pool = connection_pool(s)
+    conn = db_pool.acquire()
+    try:
+        db.ensure_schema(conn)
+    finally:
+        db_pool.release(conn)
+
+    if len(regions) == 1:
+        summaries = [collect_region(s, cfg, run_dt, regions[0], incremental=incremental, fetched_at=fetched_at)]
+    else:
+        max_workers = min(len(regions), int(cfg.get("max_region_workers", 4)))
+        log.info("Multi-region collection: regions=%s workers=%s", regions, max_workers)
+        with ProcessPoolExecutor(max_workers=max_workers) as ex:
+            futures = [
+                ex.submit(_collect_region_worker, run_dt.isoformat(), region, incremental, fetched_at.isoformat())
+                for region in regions
+            ]
+            summaries = [f.result() for f in futures]
+
+    result = {
+        "run_date": run_dt.isoformat(),
+        "region_code": ",".join(regions),
+        "region_codes": regions,
+        "video_count": sum(r["video_count"] for r in summaries),
+        "incremental": incremental,
+        "regions": summaries,
+    }
+
+    # IMPORTANT: push individual keys so XComArg(task)["run_date"] works
+    ti.xcom_push(key="run_date", value=result["run_date"])
+    ti.xcom_push(key="region_code", value=result["region_code"])
+    ti.xcom_push(key="region_codes", value=result["region_codes"])
+    ti.xcom_push(key="video_count", value=result["video_count"])
+
+    log.info("Collected %s videos across %s region(s)", result["video_count"], len(regions))
+    return result
+
+
+def _collect_region_worker(run_date: str, region: str, incremental: bool, fetched_at: str) -> dict[str, Any]:
+    """Process-pool entry point: rebuilds settings/config in the child and collects one region."""
+    configure_logging()
+    s = load_settings()
+    cfg = load_query_config(s.repo_root)
+    return collect_region(
+        s, cfg, date.fromisoformat(run_date), region, incremental=incremental, fetched_at=datetime.fromisoformat(fetched_at)
+    )
 
-    run_dt = date.fromisoformat(run_date)
-    repo_root = s.repo_root
 
-    cfg = load_query_config(repo_root)
-    region = cfg.get("region_code", s.region_code)
+def collect_region(
+    s: Settings,
+    cfg: dict[str, Any],
+    run_dt: date,
+    region: str,
+    *,
+    incremental: bool,
+    fetched_at: datetime,
+) -> dict[str, Any]:
+    """Search, fetch and store one region's videos. Opens its own connection."""
+    db = load_backend(s)
     rel_lang = cfg.get("relevance_language", "en")
     days_back = int(cfg.get("days_back", 7))
     max_results = int(cfg.get("max_results_per_query", 25))
+    max_pages = int(cfg.get("max_pages_per_query", 1))
+    refresh_known = bool((cfg.get("incremental", {}) or {}).get("refresh_known", True))
 
-    fetched_at = datetime.now(timezone.utc)
     published_after = fetched_at - timedelta(days=days_back)
 
-    conn = connect(s)
+    db_pool = connection_pool(s)
+    conn = db_pool.acquire()
+    pool = KeyPool((s.youtube_api_key, *s.youtube_api_keys), daily_limit=s.youtube_daily_quota)
+    usage_day = quota_day(fetched_at)
+    prof = start_stage(s, "collect", run_dt, scope=region)
     try:
-        ensure_schema(conn)
+        db.ensure_schema(conn)
+        pool.load_usage(db.fetch_api_key_usage(conn, usage_day))
+        log.info("YouTube key pool: keys=%s remaining_units=%s", len(pool.keys), pool.remaining())
         feedback = cfg.get("feedback_loop", {}) or {}
         fb_enabled = bool(feedback.get("enabled", False))
         lookback_days = int(feedback.get("lookback_days", 7))
         max_queries_final = int(feedback.get("max_queries", len(cfg.get("queries", [])) or 5))
         theme_query_prefix = str(feedback.get("theme_query_prefix", "music"))
         theme_query_count = int(feedback.get("theme_query_count", 2))
-        queries_cfg = [QueryConfig(name=q["name"], q=q["q"]) for q in cfg.get("queries", [])]
+        # top_views = legacy ranking by lifetime views; ucb/thompson = bandit on marginal yield per quota unit
+        policy = str(feedback.get("policy", "top_views")).lower()
+        use_bandit = fb_enabled and policy in ("ucb", "thompson")
+        queries_cfg = [QueryConfig(name=q["name"], q=q["q"], max_pages=q.get("max_pages")) for q in cfg.get("queries", [])]
         log.info("Collecting YouTube data: date=%s region=%s queries=%s", run_dt, region, len(queries_cfg))
 
         # Start from seed queries.yaml
-        seed_queries = [QueryConfig(name=q["name"], q=q["q"]) for q in cfg.get("queries", [])]
+        seed_queries = list(queries_cfg)
 
         if fb_enabled:
             since = run_dt - timedelta(days=lookback_days)
 
-            # 1) historically best raw query strings
-            top_qs = fetch_top_queries(conn, region_code=region, since_date=since, limit=max_queries_final)
-
-            # 2) pull recent themes and create theme-based queries (light expansion)
-            hist_rows = fetch_daily_themes_range(conn, since, run_dt - timedelta(days=1))
+            # 1) pull recent themes and create theme-based queries (light expansion)
+            hist_rows = db.fetch_daily_themes_range(conn, since, run_dt - timedelta(days=1))
             # get most frequent/high scoring themes recently
             theme_scores: dict[str, float] = {}
             for r in hist_rows:
@@ -100,97 +205,230 @@ def task_collect_youtube_to_mssql(run_date: str | None = None) -> dict[str, Any]
             top_themes_recent = sorted(theme_scores.items(), key=lambda x: x[1], reverse=True)[:theme_query_count]
             theme_queries = [f"{theme_query_prefix} {t[0]}" for t in top_themes_recent]
 
-            # Merge into final query strings (dedupe)
-            merged_q = []
-            for q in [*top_qs, *theme_queries, *(sq.q for sq in seed_queries)]:
-                q = (q or "").strip()
-                if q and q not in merged_q:
-                    merged_q.append(q)
-
-            merged_q = merged_q[:max_queries_final]
+            if use_bandit:
+                # 2) every query string we have tried or could try is an arm
+                states = states_from_rows(db.fetch_query_bandit_state(conn, region))
+                candidates = _dedupe_queries([*theme_queries, *(sq.q for sq in seed_queries), *states])
+                merged_q = choose_queries(
+                    candidates,
+                    states,
+                    policy=policy,
+                    quota_budget=min(int(feedback.get("quota_budget", 2000)), pool.remaining()),
+                    max_queries=max_queries_final,
+                    expected_results=max_results,
+                    exploration=float(feedback.get("exploration", 1.0)),
+                )
+                log.info("Query scheduler (%s) picked %s of %s candidates", policy, len(merged_q), len(candidates))
+            else:
+                # 2) historically best raw query strings
+                top_qs = db.fetch_top_queries(conn, region_code=region, since_date=since, limit=max_queries_final)
+                merged_q = _dedupe_queries([*top_qs, *theme_queries, *(sq.q for sq in seed_queries)])[:max_queries_final]
 
             # Build QueryConfig with stable names
-            queries_cfg = [QueryConfig(name=f"auto_{i+1}", q=q) for i, q in enumerate(merged_q)]
+            # A seed query's page budget follows its query string into the auto set.
+            seed_pages = {sq.q: sq.max_pages for sq in seed_queries}
+            queries_cfg = [QueryConfig(name=f"auto_{i+1}", q=q, max_pages=seed_pages.get(q)) for i, q in enumerate(merged_q)]
         else:
             queries_cfg = seed_queries
 
-        run = create_run(conn, run_dt, region, query_count=len(queries_cfg))
+        # Profile queries ride along; each query string is still searched once.
+        profiles = load_profiles(cfg)
+        scheduled = {q.q for q in queries_cfg}
+        queries_cfg = union_queries(queries_cfg, profiles)
+        if profiles:
+            log.info("Profiles %s add %s queries", [p.name for p in profiles], len(queries_cfg) - len(scheduled))
+
+        run = db.create_run(conn, run_dt, region, query_count=len(queries_cfg))
 
-        all_rows: list[dict[str, Any]] = []
+        paging = max_pages > 1 or any((q.max_pages or 1) > 1 for q in queries_cfg)
+        watermarks = db.fetch_query_watermarks(conn, region) if incremental else {}
+        # Already-stored ids in the window: skipped by incremental search, "not new" for yield stats,
+        # and where paging stops.
+        known = db.fetch_known_video_ids(conn, published_after) if (incremental or use_bandit or paging) else {}
+        if incremental:
+            log.info("Incremental mode: watermarks=%s known_in_window=%s", len(watermarks), len(known))
+
+        all_rows: list[VideoRecord] = []
         seen: set[str] = set()
+        # Known ids this region's searches returned (skipped above, refreshed below).
+        returned_known: set[str] = set()
+        fetched_ts = to_epoch(fetched_at)
         query_stats: list[dict[str, Any]] = []
+        # Every query that returned each id (VideoQueries), so profiles can share fetched rows.
+        hits: dict[str, set[str]] = defaultdict(set)
 
         for q in queries_cfg:
-            ids = search_videos(
-                api_key=s.youtube_api_key,
+            pages = iter_search_pages(
+                api_key=pool,
                 query=q,
                 region_code=region,
                 relevance_language=rel_lang,
-                max_results=max_results,
-                published_after=published_after,
+                published_after=_search_window_start(published_after, watermarks.get(q.q)) if incremental else published_after,
+                page_size=max_results,
+                max_pages=q.max_pages or max_pages,
+                stop_before=watermarks.get(q.q),
+                known_ids=known,
+                base_url=s.youtube_base_url,
             )
-            ids = [i for i in ids if i not in seen]
-            seen.update(ids)
-            
+            ids: list[str] = []
+            search_pages = 0
+            for page in pages:
+                search_pages += 1
+                if profiles:
+                    hits[q.q].update(page)
+                page_ids = [i for i in page if i not in seen and not (incremental and i in known)]
+                if incremental:
+                    returned_known.update(i for i in page if i in known)
+                seen.update(page_ids)
+                ids.extend(page_ids)
+            if search_pages > 1:
+                log.info("Query %r: %s search pages, %s ids", q.q, search_pages, len(ids))
+
+            details = fetch_video_details(api_key=pool, video_ids=ids, base_url=s.youtube_base_url)
+            q_rows = []
+            for item in details:
+                row = parse_video_row(video_item=item, query_name=q.name, fetched_at=fetched_ts)
+                if row.video_id:
+                    q_rows.append(row)
+            all_rows.extend(q_rows)
 
+            new_rows = [r for r in q_rows if r.video_id not in known]
+            query_stats.append(
+                {
+                    "query_name": q.name,
+                    "q": q.q,
+                    "video_count": len(q_rows),
+                    "total_views": sum(r.view_count or 0 for r in q_rows),
+                    "total_likes": sum(r.like_count or 0 for r in q_rows),
+                    "total_comments": sum(r.comment_count or 0 for r in q_rows),
+                    "new_video_count": len(new_rows),
+                    "score_sum": round(sum(compute_video_score(r) for r in new_rows), 6),
+                    "quota_units": query_quota_cost(len(ids), search_pages),
+                }
+            )
 
-            details = fetch_video_details(api_key=s.youtube_api_key, video_ids=ids)
-            for item in details:
-                row = parse_video_row(video_item=item, query_name=q.name, fetched_at=fetched_at)
-                if row.get("video_id"):
+        if incremental and refresh_known:
+            # Stats-only refresh (1 quota unit per 50 ids) keeps known videos in today's scoring set.
+            # `known` spans every region; only this region's videos are refreshed and recorded for it.
+            region_known = db.fetch_region_video_ids(conn, region, published_after.date()) | returned_known
+            stale_ids = [vid for vid in known if vid in region_known and vid not in seen]
+            for item in fetch_video_details(api_key=pool, video_ids=stale_ids, base_url=s.youtube_base_url):
+                row = parse_video_row(video_item=item, query_name=known.get(item.get("id")), fetched_at=fetched_ts)
+                if row.video_id:
                     all_rows.append(row)
-                    video_count += 1
-                    total_views += int(row.get("view_count") or 0)
-                    total_likes += int(row.get("like_count") or 0)
-                    total_comments += int(row.get("comment_count") or 0)
-            query_stats.append(
-            {
-                "query_name": q.name,
-                "q": q.q,
-                "video_count": video_count,
-                "total_views": total_views,
-                "total_likes": total_likes,
-                "total_comments": total_comments,
+            log.info("Refreshed stats for %s known videos", len(stale_ids))
+
+        processed = db.upsert_videos(conn, all_rows)
+        prof.rows = len(all_rows)
+        prof.checkpoint()
+        db.write_video_regions(conn, run_dt, region, all_rows)
+        if hits:
+            db.write_video_queries(conn, run_dt, hits)
+        if (cfg.get("dedup") or {}).get("enabled", False):
+            # Title tokens for dedup's fingerprints, computed once per new video.
+            ensure_features(db, conn, all_rows)
+        channels = enrich_channels(db, conn, pool, all_rows, cfg.get("channels") or {}, fetched_at, base_url=s.youtube_base_url)
+        db.update_run_video_count(conn, run.run_id, processed)
+
+        if use_bandit:
+            rewards = {
+                st["q"]: query_reward(
+                    new_video_count=st["new_video_count"],
+                    score_sum=st["score_sum"],
+                    quota_units=st["quota_units"],
+                    new_video_weight=float(feedback.get("new_video_weight", 1.0)),
+                )
+                for st in query_stats
+                # Profile-only queries are always searched, so they are not scheduler arms.
+                if st["q"] in scheduled
             }
-        )
-
-        processed = upsert_videos(conn, all_rows)
-        update_run_video_count(conn, run.run_id, processed)
-
-        write_daily_query_stats(conn, run_dt, region, query_stats)
-
-
-        result = {"run_date": run_dt.isoformat(), "region_code": region, "video_count": processed}
+            db.update_query_bandit_state(conn, region, run_dt, rewards)
 
-        # IMPORTANT: push individual keys so XComArg(task)["run_date"] works
-        ti.xcom_push(key="run_date", value=result["run_date"])
-        ti.xcom_push(key="region_code", value=result["region_code"])
-        ti.xcom_push(key="video_count", value=result["video_count"])
-
-
-        log.info("Collected %s videos", processed)
-        return result
+        if incremental:
+            db.set_query_watermarks(conn, region, [q.q for q in queries_cfg], fetched_at)
+        else:
+            # Intra-day deltas would overwrite the day's per-query totals, so only full runs write them.
+            db.write_daily_query_stats(conn, run_dt, region, query_stats)
+
+        log.info("Collected %s videos for region=%s", processed, region)
+        return {
+            "region_code": region,
+            "video_count": processed,
+            "channels_fetched": channels["fetched"],
+            "api_key_usage": [{k: u[k] for k in ("key_id", "units_delta", "units_used", "exhausted")} for u in pool.usage()],
+        }
     finally:
-        conn.close()
+        # Record spent quota even when the run fails part-way; it was still charged.
+        try:
+            db.add_api_key_usage(conn, usage_day, pool.usage())
+            for u in pool.usage():
+                log.info(
+                    "YouTube key %s: +%s units (day total %s)%s",
+                    u["key_id"], u["units_delta"], u["units_used"], " EXHAUSTED" if u["exhausted"] else "",
+                )
+        except Exception:  # noqa: BLE001
+            log.exception("Failed to record YouTube API key usage")
+        http_client().log_metrics()
+        db_pool.release(conn)
+        prof.finish()
+        db_pool.log_stats()
+
+
+def _score_themes(db: Any, conn: Any, videos: list[dict[str, Any]], theme_cfg: dict[str, Any], signatures: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+    if theme_method(theme_cfg) == "cluster":
+        load_signatures(db, conn, videos, signatures)
+    return score_themes(videos, theme_cfg, signatures)
 
 
 def task_score_themes_to_mssql_and_csv(run_date: str) -> dict[str, Any]:
     configure_logging()
     s = load_settings()
+    db = load_backend(s)
     repo_root = s.repo_root
 
     d = date.fromisoformat(run_date)
-    conn = connect(s)
+    db_pool = connection_pool(s)
+    conn = db_pool.acquire()
+    prof = start_stage(s, "score", d)
     try:
-        ensure_schema(conn)
-        videos = fetch_videos_for_date(conn, d)
-        themes = score_themes_by_query(videos)
+        db.ensure_schema(conn)
+        cfg = load_query_config(repo_root)
+        theme_cfg = cfg.get("themes") or {}
+        dedup_cfg = cfg.get("dedup") or {}
+        regions = collect_regions(cfg, s)
+        # Per-video caches shared by the global, region and profile passes.
+        signatures: dict[str, dict[str, Any]] = {}
+        fingerprints: dict[str, dict[str, Any]] = {}
+        if theme_engine(theme_cfg) == "sql":
+            # Scored and written in the database; only the theme rows come back.
+            themes = score_themes_in_db(db, conn, d, theme_cfg, dedup_cfg)
+            if len(regions) > 1:
+                for region in regions:
+                    region_themes = score_themes_in_db(db, conn, d, theme_cfg, dedup_cfg, region)
+                    log.info("Scored region=%s themes=%s", region, len(region_themes))
+        else:
+            # dbo.Videos holds one row per id, so this is the merged, cross-region deduped set.
+            videos = db.fetch_videos_for_date(conn, d)
+            videos = collapse_near_duplicates(db, conn, d, videos, dedup_cfg, fingerprints)
+            themes = _score_themes(db, conn, videos, theme_cfg, signatures)
+            prof.rows = len(videos)
+            prof.checkpoint()
 
-        write_daily_themes(conn, d, themes)
+            if len(regions) > 1:
+                for region in regions:
+                    region_videos = collapse_near_duplicates(db, conn, d, db.fetch_region_videos_for_date(conn, d, region), dedup_cfg, fingerprints)
+                    region_themes = _score_themes(db, conn, region_videos, theme_cfg, signatures)
+                    db.write_daily_region_themes(conn, d, region, region_themes)
+                    log.info("Scored region=%s themes=%s", region, len(region_themes))
 
-        history = fetch_daily_themes_range(conn, d - timedelta(days=7), d - timedelta(days=1))
+            db.write_daily_themes(conn, d, themes)
+
+        profile_themes = score_profiles(db, conn, d, load_profiles(cfg), dedup_cfg, fingerprints=fingerprints, signatures=signatures)
+
+        history = db.fetch_daily_themes_range(conn, d - timedelta(days=7), d - timedelta(days=1))
         trends = compute_theme_trends(run_date=d, today_themes=themes[:25], history_rows=history)
-        write_daily_theme_trends(conn, d, trends)
+        db.write_daily_theme_trends(conn, d, trends)
+        bump_cache_stamp(s)
 
         # also write a CSV snapshot
         out_csv = repo_root / "output" / "themes_latest.csv"
@@ -206,30 +444,51 @@ def task_score_themes_to_mssql_and_csv(run_date: str) -> dict[str, Any]:
         ctx = get_current_context()
         ti = ctx["ti"]
         ti.xcom_push(key="run_date", value=run_date)
-        ti.xcom_push(key="top_themes", value=themes[:10])
-
-        return {"run_date": run_date, "top_themes": themes[:10]}
+        if s.xcom_handoff == "reference":
+            # Downstream tasks read the themes back from DailyThemes / DailyProfileThemes.
+            return run_ref(ctx, run_date)
+        ti.xcom_push(key="top_themes", value=themes[:TOP_THEMES])
+        profile_top = {name: t[:TOP_THEMES] for name, t in profile_themes.items()}
+        ti.xcom_push(key="profile_themes", value=profile_top)
+
+        return {"run_date": run_date, "top_themes": themes[:TOP_THEMES], "profile_themes": profile_top}
     finally:
-        conn.close()
+        db_pool.release(conn)
+        prof.finish()
+        db_pool.log_stats()
 
 
-def task_generate_prompts_to_mssql_and_md(run_date: str, top_themes: list[dict[str, Any]]) -> dict[str, Any]:
+def task_export_columnar(run_date: str) -> dict[str, Any]:
+    """Append the day's videos, stats, themes and trends to the Parquet datasets and refresh the Arrow cache."""
     configure_logging()
     s = load_settings()
-    repo_root = s.repo_root
-
     d = date.fromisoformat(run_date)
+    with profile_stage(s, "export", d) as prof:
+        result = export_and_cache(s, d)
+        prof.rows = sum(result["rows"].values())
+    return result
+
+
+def task_apply_retention() -> dict[str, Any]:
+    """Compress old descriptions and archive stale videos per queries.yaml `retention`."""
+    configure_logging()
+    s = load_settings()
+    return run_retention(s, load_query_config(s.repo_root))
+
+
+def _generate_prompt_set(s: Settings, d: date, themes: list[dict[str, Any]], profile: str | None = None) -> tuple[Any, Path, Path, list[dict[str, Any]]]:
+    """Prompts for `themes`, written to the markdown outputs; returns (prompts, repo md, desktop md, DB rows)."""
     gp = generate_prompts(
         base_url=s.ollama_base_url,
         model=s.ollama_model,
-        repo_root=repo_root,
-        themes=top_themes,
+        repo_root=s.repo_root,
+        themes=themes,
     )
+    md = render_markdown(d, themes, gp, profile=profile)
 
-    md = render_markdown(d, top_themes, gp)
-
-    repo_md = repo_root / "output" / f"{d.isoformat()}_prompts.md"
-    desktop_md = Path(s.host_desktop_mount) / "ytmusicrec" / f"{d.isoformat()}_prompts.md"
+    name = prompts_md_name(d, profile)
+    repo_md = s.repo_root / "output" / name
+    desktop_md = Path(s.host_desktop_mount) / "ytmusicrec" / name
 
     write_text(repo_md, md)
     write_text(desktop_md, md)
@@ -237,31 +496,89 @@ def task_generate_prompts_to_mssql_and_md(run_date: str, top_themes: list[dict[s
     prompts_for_db: list[dict[str, Any]] = []
     for p in gp.suno[:12]:
         prompts_for_db.append({"tool": "suno", "prompt": p.get("prompt"), "theme_tags": ",".join(p.get("tags") or [])})
+    return gp, repo_md, desktop_md, prompts_for_db
 
-    conn = connect(s)
-    try:
-        ensure_schema(conn)
-        write_daily_prompts(conn, d, prompts_for_db)
-        write_prompt_history(conn, d, "suno", prompts_for_db)
-    finally:
-        conn.close()
 
+def _load_top_themes(s: Settings, d: date) -> tuple[list[dict[str, Any]], dict[str, list[dict[str, Any]]]]:
+    """Reference handoff: the day's top themes and each configured profile's, from the database."""
+    db = load_backend(s)
+    with connection_pool(s).connection() as conn:
+        top_themes = db.fetch_top_themes(conn, d, TOP_THEMES)
+        profile_themes = {p.name: db.fetch_top_themes(conn, d, TOP_THEMES, p.name) for p in load_profiles(load_query_config(s.repo_root))}
+    return top_themes, profile_themes
+
+
+def task_generate_prompts_to_mssql_and_md(
+    run_date: str,
+    top_themes: list[dict[str, Any]] | None = None,
+    profile_themes: dict[str, list[dict[str, Any]]] | None = None,
+) -> dict[str, Any]:
+    """Prompts for the day's top themes, plus one set per profile in `profile_themes`.
+
+    Without `top_themes` (reference handoff) both are loaded from the database.
+    """
+    configure_logging()
+    s = load_settings()
+
+    d = date.fromisoformat(run_date)
+    if top_themes is None:
+        top_themes, profile_themes = _load_top_themes(s, d)
+    gp, repo_md, desktop_md, prompts_for_db = _generate_prompt_set(s, d, top_themes)
+    profile_prompts = {
+        name: _generate_prompt_set(s, d, themes, profile=name) for name, themes in (profile_themes or {}).items() if themes
+    }
+    http_client().log_metrics()
+
+    db = load_backend(s)
+    db_pool = connection_pool(s)
+    with db_pool.connection() as conn:
+        db.ensure_schema(conn)
+        db.write_daily_prompts(conn, d, prompts_for_db)
+        db.write_prompt_history(conn, d, "suno", prompts_for_db)
+        for name, (_, _, _, rows) in profile_prompts.items():
+            db.write_daily_profile_prompts(conn, d, name, rows)
+        bump_cache_stamp(s)
+    db_pool.log_stats()
+
+    profile_md_paths = {name: str(md) for name, (_, md, _, _) in profile_prompts.items()}
     ctx = get_current_context()
     ti = ctx["ti"]
     ti.xcom_push(key="run_date", value=run_date)
+    if s.xcom_handoff == "reference":
+        # The publish task reads the prompts back from here (and the themes from the database).
+        write_artifact(s, d, "suno", gp.suno[:12])
+        return run_ref(ctx, run_date)
     ti.xcom_push(key="repo_md_path", value=str(repo_md))
     ti.xcom_push(key="desktop_md_path", value=str(desktop_md))
     ti.xcom_push(key="suno", value=gp.suno[:12])
-
-    return {"run_date": run_date, "repo_md_path": str(repo_md), "desktop_md_path": str(desktop_md), "suno": gp.suno[:12]}
-
-
-def task_publish_outputs(run_date: str, top_themes: list[dict[str, Any]], suno: list[dict[str, Any]], repo_md_path: str) -> None:
+    ti.xcom_push(key="profile_md_paths", value=profile_md_paths)
+
+    return {
+        "run_date": run_date,
+        "repo_md_path": str(repo_md),
+        "desktop_md_path": str(desktop_md),
+        "suno": gp.suno[:12],
+        "profile_md_paths": profile_md_paths,
+    }
+
+
+def task_publish_outputs(
+    run_date: str,
+    top_themes: list[dict[str, Any]] | None = None,
+    suno: list[dict[str, Any]] | None = None,
+    repo_md_path: str | None = None,
+) -> None:
+    """Post to Discord and Google Sheets; arguments left out (reference handoff) are loaded for `run_date`."""
     configure_logging()
     s = load_settings()
     d = date.fromisoformat(run_date)
 
-    repo_md = Path(repo_md_path)
+    if top_themes is None:
+        with connection_pool(s).connection() as conn:
+            top_themes = load_backend(s).fetch_top_themes(conn, d, TOP_THEMES)
+    if suno is None:
+        suno = read_artifact(s, d, "suno")
+    repo_md = Path(repo_md_path) if repo_md_path else s.repo_root / "output" / prompts_md_name(d)
 
     # Discord
     if s.discord_webhook_url:
@@ -285,6 +602,7 @@ def task_publish_outputs(run_date: str, top_themes: list[dict[str, Any]], suno:
 
         if not s.dry_run:
             post_long_message(webhook_url=s.discord_webhook_url, content=content, file_path=repo_md)
+            http_client().log_metrics()
         else:
             log.info("DRY_RUN: would post Discord message")
 
@@ -294,6 +612,7 @@ def task_publish_outputs(run_date: str, top_themes: list[dict[str, Any]], suno:
             sheets_write_daily(
                 spreadsheet_id=s.google_sheets_spreadsheet_id,
                 token_json_path=s.google_oauth_token_json,
+                base_url=s.google_sheets_base_url,
                 run_date=d,
                 themes=top_themes,
                 suno=suno,
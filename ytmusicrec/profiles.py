@@ -0,0 +1,125 @@
+"""Query profiles: several query sets (genre packs, client profiles) on one collection pass.
+
+queries.yaml `profiles` maps a profile name to its own `queries` (the same
+``name``/``q`` entries as the top-level list) and optional `themes` overrides:
+
+    profiles:
+      study:
+        queries:
+          - {name: "Lo-fi Study", q: "lofi study beats"}
+        themes: {method: query}
+
+The daily collection searches the union of the top-level queries and every
+profile's queries, each query string once per region, and fetches each video id
+once (`union_queries`). Every query string that returned a video is recorded in
+VideoQueries, so a profile's videos for the day are the ones its own queries
+returned, whichever query happened to fetch them (`profile_videos`). Each
+profile is then scored into DailyProfileThemes and gets its own prompts
+(DailyProfilePrompts and ``output/<date>_<profile>_prompts.md``), while
+DailyThemes stays the ranking over everything collected. Search and fetch cost
+grows with the number of unique query strings, not the number of profiles.
+
+Profiles always score in Python (`themes.engine: sql` scores whole days only).
+"""
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Iterable
+
+from ytmusicrec.dedup import collapse_near_duplicates
+from ytmusicrec.themes import load_signatures, score_themes, theme_method
+from ytmusicrec.youtube import QueryConfig
+
+log = logging.getLogger(__name__)
+
+# Profile names end up in file names and table keys.
+_NAME_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    queries: tuple[QueryConfig, ...]
+    # The top-level `themes` settings with the profile's overrides applied.
+    themes: dict[str, Any] = field(default_factory=dict)
+
+
+def load_profiles(cfg: dict[str, Any]) -> list[Profile]:
+    """Profiles from queries.yaml `profiles` (empty when there are none)."""
+    base_themes = cfg.get("themes") or {}
+    profiles = []
+    for name, pcfg in (cfg.get("profiles") or {}).items():
+        name = str(name)
+        if not _NAME_RE.fullmatch(name):
+            raise ValueError(f"Invalid profile name {name!r}: use letters, digits, '_' and '-'")
+        pcfg = pcfg or {}
+        queries = tuple(QueryConfig(name=q["name"], q=q["q"], max_pages=q.get("max_pages")) for q in pcfg.get("queries") or ())
+        if not queries:
+            raise ValueError(f"Profile {name!r} has no queries")
+        themes = {**base_themes, **(pcfg.get("themes") or {}), "engine": "python"}
+        theme_method(themes)
+        profiles.append(Profile(name=name, queries=queries, themes=themes))
+    return profiles
+
+
+def union_queries(queries: Iterable[QueryConfig], profiles: Iterable[Profile]) -> list[QueryConfig]:
+    """`queries` plus every profile query whose query string is not already searched.
+
+    The first entry for a query string wins, so a string shared by two profiles
+    (or with the top-level set) is searched once under the first one's name.
+    """
+    out: dict[str, QueryConfig] = {}
+    for q in queries:
+        out.setdefault(q.q, q)
+    for p in profiles:
+        for q in p.queries:
+            out.setdefault(q.q, q)
+    return list(out.values())
+
+
+def profile_videos(db: Any, conn: Any, run_date: date, profile: Profile) -> list[Any]:
+    """The day's videos returned by the profile's queries, bucketed under its own query names.
+
+    A video returned by several of the profile's queries goes to the first one listed.
+    """
+    buckets: dict[str, tuple[int, str]] = {}
+    for i, q in enumerate(profile.queries):
+        buckets.setdefault(q.q, (i, q.name))
+    out: dict[str, Any] = {}
+    for v in sorted(db.fetch_query_videos_for_date(conn, run_date, buckets), key=lambda v: buckets[v.query][0]):
+        if v.video_id not in out:
+            v.query = buckets[v.query][1]
+            out[v.video_id] = v
+    return list(out.values())
+
+
+def score_profiles(
+    db: Any,
+    conn: Any,
+    run_date: date,
+    profiles: Iterable[Profile],
+    dedup_cfg: dict[str, Any],
+    *,
+    fingerprints: dict[str, dict[str, Any]] | None = None,
+    signatures: dict[str, dict[str, Any]] | None = None,
+) -> dict[str, list[dict[str, Any]]]:
+    """Score and write each profile's themes; returns them by profile name.
+
+    Pass the global scoring pass's `fingerprints`/`signatures` caches so videos
+    shared with it are not looked up again.
+    """
+    fingerprints = {} if fingerprints is None else fingerprints
+    signatures = {} if signatures is None else signatures
+    out: dict[str, list[dict[str, Any]]] = {}
+    for p in profiles:
+        videos = collapse_near_duplicates(db, conn, run_date, profile_videos(db, conn, run_date, p), dedup_cfg, fingerprints)
+        if theme_method(p.themes) == "cluster":
+            load_signatures(db, conn, videos, signatures)
+        themes = score_themes(videos, p.themes, signatures)
+        db.write_daily_profile_themes(conn, run_date, p.name, themes)
+        log.info("Scored profile=%s videos=%s themes=%s", p.name, len(videos), len(themes))
+        out[p.name] = themes
+    return out
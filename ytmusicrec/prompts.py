@@ -69,9 +69,9 @@ def generate_prompts(*, base_url: str, model: str, repo_root: Path, themes: list
     return GeneratedPrompts(suno=suno_norm)
 
 
-def render_markdown(run_date: date, themes: list[dict[str, Any]], gp: GeneratedPrompts) -> str:
+def render_markdown(run_date: date, themes: list[dict[str, Any]], gp: GeneratedPrompts, *, profile: str | None = None) -> str:
     lines: list[str] = []
-    lines.append(f"# ytmusicrec prompts — {run_date.isoformat()}")
+    lines.append(f"# ytmusicrec prompts — {profile + ' — ' if profile else ''}{run_date.isoformat()}")
     lines.append("")
     lines.append("## Top themes")
     for i, t in enumerate(themes[:10], start=1):
@@ -0,0 +1,170 @@
+"""Compact video rows for the collect -> store -> score path.
+
+A `VideoRecord` carries the same fields `parse_video_row` used to put in a dict,
+in ``__slots__`` (no per-row dict or key strings), with timestamps held as UTC
+epoch seconds (`published_ts`, `fetched_ts`) and counts as ints. Storage
+backends write and select the epoch values directly, so the hot path never
+builds datetime objects.
+
+Records are read-only Mappings over the old keys, so code written against the
+dicts (``r["title"]``, ``r.get("published_at")``, ``dict(r)``) keeps working;
+``published_at``/``fetched_at`` are computed on access as naive UTC datetimes,
+the same shape the storage backends return.
+
+`channel_subscribers` is not a Videos column: readers join it in from Channels
+(see channels.py) for the subscriber-normalized score term.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Mapping keys, in the column order the storage backends use.
+FIELDS = (
+    "video_id",
+    "query",
+    "title",
+    "description",
+    "channel_title",
+    "published_at",
+    "view_count",
+    "like_count",
+    "comment_count",
+    "duration_seconds",
+    "fetched_at",
+    "channel_id",
+    "channel_subscribers",
+)
+_KEYS = frozenset(FIELDS)
+
+
+def to_epoch(dt: datetime | None) -> int | None:
+    """Whole UTC epoch seconds; naive datetimes are taken as UTC."""
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // timedelta(seconds=1)
+
+
+def from_epoch(ts: int | None) -> datetime | None:
+    """Naive UTC datetime for epoch seconds."""
+    return None if ts is None else _EPOCH + timedelta(seconds=ts)
+
+
+class VideoRecord(Mapping):
+    __slots__ = (
+        "video_id",
+        "query",
+        "title",
+        "description",
+        "channel_title",
+        "published_ts",
+        "view_count",
+        "like_count",
+        "comment_count",
+        "duration_seconds",
+        "fetched_ts",
+        "channel_id",
+        "channel_subscribers",
+    )
+
+    # Positional order matches FIELDS, so backends can build records straight from a row tuple.
+    def __init__(
+        self,
+        video_id: str,
+        query: str | None = None,
+        title: str | None = None,
+        description: str | None = None,
+        channel_title: str | None = None,
+        published_ts: int | None = None,
+        view_count: int | None = None,
+        like_count: int | None = None,
+        comment_count: int | None = None,
+        duration_seconds: int | None = None,
+        fetched_ts: int | None = None,
+        channel_id: str | None = None,
+        channel_subscribers: int | None = None,
+    ) -> None:
+        self.video_id = video_id
+        self.query = query
+        self.title = title
+        self.description = description
+        self.channel_title = channel_title
+        self.published_ts = published_ts
+        self.view_count = view_count
+        self.like_count = like_count
+        self.comment_count = comment_count
+        self.duration_seconds = duration_seconds
+        self.fetched_ts = fetched_ts
+        self.channel_id = channel_id
+        self.channel_subscribers = channel_subscribers
+
+    @classmethod
+    def from_mapping(cls, row: Mapping[str, Any]) -> VideoRecord:
+        """Build from a dict shaped like the old parse_video_row output."""
+        if isinstance(row, VideoRecord):
+            return row
+        return cls(
+            row["video_id"],
+            row.get("query"),
+            row.get("title"),
+            row.get("description"),
+            row.get("channel_title"),
+            to_epoch(row.get("published_at")),
+            row.get("view_count"),
+            row.get("like_count"),
+            row.get("comment_count"),
+            row.get("duration_seconds"),
+            to_epoch(row.get("fetched_at")),
+            row.get("channel_id"),
+            row.get("channel_subscribers"),
+        )
+
+    @property
+    def published_at(self) -> datetime | None:
+        return from_epoch(self.published_ts)
+
+    @property
+    def fetched_at(self) -> datetime | None:
+        return from_epoch(self.fetched_ts)
+
+    def params(self) -> tuple[Any, ...]:
+        """Videos column values (FIELDS order, without channel_subscribers), timestamps as epoch seconds."""
+        return (
+            self.video_id,
+            self.query,
+            self.title,
+            self.description,
+            self.channel_title,
+            self.published_ts,
+            self.view_count,
+            self.like_count,
+            self.comment_count,
+            self.duration_seconds,
+            self.fetched_ts,
+            self.channel_id,
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in _KEYS else default
+
+    def __contains__(self, key: object) -> bool:
+        return key in _KEYS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __repr__(self) -> str:
+        return f"VideoRecord({self.video_id!r}, query={self.query!r}, title={self.title!r})"
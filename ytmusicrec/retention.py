@@ -0,0 +1,130 @@
+"""Retention for Videos: compress old descriptions, archive stale videos.
+
+Configured by the ``retention`` block of queries.yaml:
+
+1. descriptions of videos fetched more than `compress_descriptions_after_days`
+   ago move to VideoDescriptions, compressed (COMPRESS/gzip on SQL Server, zlib
+   on SQLite); readers decompress them transparently, so scoring and backfills
+   see the same rows;
+2. videos fetched more than `archive_after_days` ago leave Videos for either the
+   page-compressed VideosArchive table (``archive_to: table``) or Parquet part
+   files under ``export_dir/videos_archive`` (``archive_to: parquet``), taking
+   their per-video side rows (storage.VIDEO_SIDE_TABLES: descriptions,
+   signatures, features, fingerprints, region and query rows) with them.
+
+Every step runs in batches of `batch_size` rows, each one short transaction
+followed by `pause_seconds` of sleep, and stops after `max_batches`; whatever is
+left is picked up by the next run. Batches skip rows another writer has locked,
+so the job can overlap the daily MERGE without blocking it.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from ytmusicrec.columnar import write_video_archive
+from ytmusicrec.dbpool import connection_pool
+from ytmusicrec.memprofile import start_stage
+from ytmusicrec.settings import Settings
+from ytmusicrec.storage import load_backend
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_TARGETS = ("table", "parquet")
+
+
+def _cutoff(now: datetime, days: int) -> datetime:
+    # Videos.fetched_at is naive UTC.
+    return (now - timedelta(days=days)).replace(tzinfo=None)
+
+
+def _run_batches(step: str, batch: Callable[[], int], max_batches: int, pause_seconds: float) -> dict[str, int]:
+    moved = batches = 0
+    while batches < max_batches:
+        t0 = time.perf_counter()
+        n = batch()
+        if not n:
+            break
+        batches += 1
+        moved += n
+        log.info("Retention %s batch=%s rows=%s total=%s ms=%.0f", step, batches, n, moved, (time.perf_counter() - t0) * 1000)
+        if pause_seconds:
+            time.sleep(pause_seconds)
+    return {"rows": moved, "batches": batches}
+
+
+def run_retention(s: Settings, cfg: dict[str, Any], *, dry_run: bool = False, now: datetime | None = None) -> dict[str, Any]:
+    """Apply the queries.yaml retention policy. Returns rows moved per step.
+
+    With `dry_run`, only reports the cutoffs (also while the policy is disabled,
+    to check them before turning it on).
+    """
+    rcfg = cfg.get("retention") or {}
+    enabled = bool(rcfg.get("enabled", False))
+    if not enabled and not dry_run:
+        return {"enabled": False}
+
+    compress_days = int(rcfg.get("compress_descriptions_after_days", 14))
+    archive_days = int(rcfg.get("archive_after_days", 180))
+    archive_to = str(rcfg.get("archive_to", "table"))
+    batch_size = int(rcfg.get("batch_size", 2000))
+    max_batches = int(rcfg.get("max_batches", 200))
+    pause_seconds = float(rcfg.get("pause_seconds", 0.2))
+    if archive_to not in ARCHIVE_TARGETS:
+        raise ValueError(f"retention.archive_to must be one of {ARCHIVE_TARGETS}, not {archive_to!r}")
+    # Collection looks up stored videos inside days_back; archiving those would refetch them.
+    if archive_days <= int(cfg.get("days_back", 7)):
+        raise ValueError("retention.archive_after_days must exceed days_back")
+    # Archived videos lose their fingerprints, which dedup matches new uploads against.
+    dedup_cfg = cfg.get("dedup") or {}
+    if dedup_cfg.get("enabled", False) and archive_days <= int(dedup_cfg.get("history_days", 30)):
+        raise ValueError("retention.archive_after_days must exceed dedup.history_days")
+
+    now = now or datetime.now(timezone.utc)
+    compress_before = _cutoff(now, compress_days)
+    archive_before = _cutoff(now, archive_days)
+    summary: dict[str, Any] = {
+        "enabled": enabled,
+        "compress_before": compress_before.isoformat(),
+        "archive_before": archive_before.isoformat(),
+        "archive_to": archive_to,
+    }
+    if dry_run:
+        return summary
+
+    db = load_backend(s)
+    db_pool = connection_pool(s)
+    conn = db_pool.acquire()
+    prof = start_stage(s, "retention", now.date())
+    try:
+        db.ensure_schema(conn)
+        # Archive first: those videos no longer need their descriptions compressed in place.
+        if archive_to == "table":
+            archive = lambda: db.archive_videos(conn, archive_before, batch_size)  # noqa: E731
+        else:
+            archived_on = now.date()
+
+            def archive() -> int:
+                videos = db.fetch_archivable_videos(conn, archive_before, batch_size)
+                if not videos:
+                    return 0
+                # The part file is durable before the rows are deleted; a crash in between
+                # leaves a duplicate in the archive, never a lost video.
+                write_video_archive(s.export_dir, archived_on, videos)
+                return db.delete_videos(conn, [v.video_id for v in videos])
+
+        summary["archived"] = _run_batches("archive", archive, max_batches, pause_seconds)
+        summary["compressed"] = _run_batches(
+            "compress",
+            lambda: db.compress_video_descriptions(conn, compress_before, batch_size),
+            max_batches,
+            pause_seconds,
+        )
+        prof.rows = summary["archived"]["rows"] + summary["compressed"]["rows"]
+        log.info("Retention done: %s", summary)
+        return summary
+    finally:
+        db_pool.release(conn)
+        prof.finish()
@@ -0,0 +1,106 @@
+"""Bandit-based query scheduler for the feedback loop.
+
+Each distinct query string is an arm. After every run its reward is the marginal
+yield per quota spent: newly discovered videos plus their score contribution,
+per 100 quota units (one search.list call). Arms are ranked by UCB1 or Thompson
+sampling and picked greedily until the run's quota budget is used up.
+"""
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass
+from typing import Any
+
+from ytmusicrec.youtube import SEARCH_QUOTA_COST, VIDEOS_LIST_QUOTA_COST
+
+POLICIES = ("ucb", "thompson", "top_views")
+
+
+@dataclass
+class ArmState:
+    q: str
+    pulls: int = 0
+    reward_sum: float = 0.0
+    reward_sq_sum: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.reward_sum / self.pulls if self.pulls else 0.0
+
+    @property
+    def variance(self) -> float:
+        if self.pulls < 2:
+            return 1.0
+        return max(self.reward_sq_sum / self.pulls - self.mean**2, 1e-6)
+
+
+def query_quota_cost(video_ids: int, search_pages: int = 1) -> int:
+    """Quota units spent by `search_pages` search calls + the details fetch for `video_ids` ids."""
+    return SEARCH_QUOTA_COST * search_pages + VIDEOS_LIST_QUOTA_COST * math.ceil(video_ids / 50)
+
+
+def query_reward(*, new_video_count: int, score_sum: float, quota_units: int, new_video_weight: float = 1.0) -> float:
+    """Marginal yield per 100 quota units."""
+    if quota_units <= 0:
+        return 0.0
+    return (new_video_weight * new_video_count + score_sum) * 100.0 / quota_units
+
+
+def _index(arm: ArmState, total_pulls: int, policy: str, exploration: float, rng: random.Random) -> float:
+    if policy == "thompson":
+        # Gaussian posterior on the mean reward; unpulled arms get a wide prior.
+        if not arm.pulls:
+            return rng.gauss(0.0, 1e3)
+        return rng.gauss(arm.mean, math.sqrt(arm.variance / arm.pulls))
+
+    # UCB1: try every arm once, then mean + exploration bonus.
+    if not arm.pulls:
+        return math.inf
+    return arm.mean + exploration * math.sqrt(2.0 * math.log(max(total_pulls, 1)) / arm.pulls)
+
+
+def choose_queries(
+    candidates: list[str],
+    states: dict[str, ArmState],
+    *,
+    policy: str = "ucb",
+    quota_budget: int,
+    max_queries: int,
+    expected_results: int = 25,
+    exploration: float = 1.0,
+    seed: int | None = None,
+) -> list[str]:
+    """Pick the day's query strings from `candidates` under `quota_budget`.
+
+    `candidates` order breaks ties, so callers should list seeds first.
+    """
+    if policy not in ("ucb", "thompson"):
+        raise ValueError(f"Unknown scheduler policy {policy!r}")
+
+    rng = random.Random(seed)
+    arms = [states.get(q) or ArmState(q=q) for q in candidates]
+    total_pulls = sum(a.pulls for a in arms)
+
+    ranked = sorted(
+        enumerate(arms),
+        key=lambda ia: (_index(ia[1], total_pulls, policy, exploration, rng), -ia[0]),
+        reverse=True,
+    )
+
+    cost = query_quota_cost(expected_results)
+    chosen: list[str] = []
+    spent = 0
+    for _, arm in ranked:
+        if len(chosen) >= max_queries or spent + cost > quota_budget:
+            break
+        chosen.append(arm.q)
+        spent += cost
+    return chosen
+
+
+def states_from_rows(rows: list[dict[str, Any]]) -> dict[str, ArmState]:
+    return {
+        r["q"]: ArmState(q=r["q"], pulls=int(r["pulls"]), reward_sum=float(r["reward_sum"]), reward_sq_sum=float(r["reward_sq_sum"]))
+        for r in rows
+    }
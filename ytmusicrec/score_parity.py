@@ -0,0 +1,151 @@
+"""Check ``themes.engine: sql`` against the Python scorer.
+
+For each day, the same videos are scored twice: fetched and scored by
+score_themes_by_query (after collapse_near_duplicates), and by the backend's
+score_query_themes without writing. Theme sets must match, theme scores must
+agree within `tolerance` (relative, floored at 1.0; the sums only differ in
+addition order) and every theme must have the same top examples and example
+scores. Examples tied on their rounded score may come in either order, and a
+tie at the last place may pick a different video, so ties are compared as sets.
+
+Both sides use stored fingerprints; the Python pass fingerprints any new videos
+first, exactly as the daily task would. Nothing else is written.
+
+`run_order_parity` checks the Python scorer against itself instead: each day is
+scored with the configured `themes:` settings as fetched and again after a
+shuffle, since storage returns a day's videos in no particular order and reruns,
+backfills and both backends must still agree.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any
+
+from ytmusicrec.dedup import collapse_near_duplicates
+from ytmusicrec.scoring import score_themes_by_query
+from ytmusicrec.settings import Settings
+from ytmusicrec.storage import load_backend
+from ytmusicrec.themes import load_signatures, score_themes, score_themes_in_db, theme_method
+
+log = logging.getLogger(__name__)
+
+
+def _example_groups(examples: list[dict[str, Any]]) -> list[tuple[float, frozenset[str]]]:
+    groups: dict[float, set[str]] = defaultdict(set)
+    for ex in examples:
+        groups[round(float(ex["score"]), 4)].add(ex["video_id"])
+    return sorted(((score, frozenset(ids)) for score, ids in groups.items()), reverse=True)
+
+
+def compare_themes(expected: list[dict[str, Any]], actual: list[dict[str, Any]], *, tolerance: float = 1e-6) -> list[str]:
+    """Differences between two lists of theme rows, as readable strings (empty when they match)."""
+    want = {t["theme"]: t for t in expected}
+    got = {t["theme"]: t for t in actual}
+    problems = [f"theme {name!r} missing" for name in sorted(want.keys() - got.keys())]
+    problems += [f"theme {name!r} unexpected" for name in sorted(got.keys() - want.keys())]
+    for name in sorted(want.keys() & got.keys()):
+        a, b = float(want[name]["score"]), float(got[name]["score"])
+        if abs(a - b) > tolerance * max(1.0, abs(a)):
+            problems.append(f"theme {name!r} score {a} != {b}")
+        ga, gb = _example_groups(want[name]["examples"]), _example_groups(got[name]["examples"])
+        # The lowest group can be cut off by the top-5 limit differently on each side.
+        if [s for s, _ in ga] != [s for s, _ in gb] or ga[:-1] != gb[:-1]:
+            problems.append(f"theme {name!r} examples {ga} != {gb}")
+    return problems
+
+
+def run_score_parity(
+    s: Settings,
+    cfg: dict[str, Any],
+    start: date,
+    end: date,
+    *,
+    region_code: str | None = None,
+    tolerance: float = 1e-6,
+) -> dict[str, Any]:
+    """Score `start`..`end` both ways and report the days that differ."""
+    theme_cfg = cfg.get("themes") or {}
+    dedup_cfg = cfg.get("dedup") or {}
+    subscriber_weight = float(theme_cfg.get("subscriber_weight", 0.0))
+    db = load_backend(s)
+    conn = db.connect(s)
+    summary: dict[str, Any] = {"days": 0, "themes": 0, "python_seconds": 0.0, "sql_seconds": 0.0, "mismatches": {}}
+    try:
+        db.ensure_schema(conn)
+        d = start
+        while d <= end:
+            t0 = time.perf_counter()
+            if region_code is None:
+                videos = db.fetch_videos_for_date(conn, d)
+            else:
+                videos = db.fetch_region_videos_for_date(conn, d, region_code)
+            videos = collapse_near_duplicates(db, conn, d, videos, dedup_cfg, {})
+            expected = score_themes_by_query(videos, subscriber_weight=subscriber_weight)
+            t1 = time.perf_counter()
+            actual = score_themes_in_db(db, conn, d, theme_cfg, dedup_cfg, region_code, write=False)
+            t2 = time.perf_counter()
+
+            summary["days"] += 1
+            summary["themes"] += len(expected)
+            summary["python_seconds"] += t1 - t0
+            summary["sql_seconds"] += t2 - t1
+            problems = compare_themes(expected, actual, tolerance=tolerance)
+            if problems:
+                log.warning("%s: %s differences, e.g. %s", d, len(problems), problems[0])
+                summary["mismatches"][d.isoformat()] = problems
+            d += timedelta(days=1)
+    finally:
+        conn.close()
+    summary["python_seconds"] = round(summary["python_seconds"], 3)
+    summary["sql_seconds"] = round(summary["sql_seconds"], 3)
+    return summary
+
+
+def run_order_parity(
+    s: Settings,
+    cfg: dict[str, Any],
+    start: date,
+    end: date,
+    *,
+    region_code: str | None = None,
+    tolerance: float = 1e-6,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Score `start`..`end` as fetched and shuffled, and report the days that differ."""
+    theme_cfg = cfg.get("themes") or {}
+    dedup_cfg = cfg.get("dedup") or {}
+    rng = random.Random(seed)
+    db = load_backend(s)
+    conn = db.connect(s)
+    summary: dict[str, Any] = {"days": 0, "themes": 0, "mismatches": {}}
+    try:
+        db.ensure_schema(conn)
+        d = start
+        while d <= end:
+            if region_code is None:
+                videos = db.fetch_videos_for_date(conn, d)
+            else:
+                videos = db.fetch_region_videos_for_date(conn, d, region_code)
+            videos = collapse_near_duplicates(db, conn, d, videos, dedup_cfg, {})
+            signatures: dict[str, dict[str, Any]] = {}
+            if theme_method(theme_cfg) == "cluster":
+                load_signatures(db, conn, videos, signatures)
+            expected = score_themes(videos, theme_cfg, signatures)
+            shuffled = list(videos)
+            rng.shuffle(shuffled)
+            actual = score_themes(shuffled, theme_cfg, signatures)
+
+            summary["days"] += 1
+            summary["themes"] += len(expected)
+            problems = compare_themes(expected, actual, tolerance=tolerance)
+            if problems:
+                log.warning("%s: %s differences after shuffling, e.g. %s", d, len(problems), problems[0])
+                summary["mismatches"][d.isoformat()] = problems
+            d += timedelta(days=1)
+    finally:
+        conn.close()
+    return summary
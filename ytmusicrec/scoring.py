@@ -1,34 +1,61 @@
 from __future__ import annotations
 
-import json
 import math
 from collections import defaultdict
 from datetime import datetime, timezone, timedelta
-from typing import Any
+from typing import Any, Iterable, Mapping
+
+from ytmusicrec.records import VideoRecord
+
+
+# Subscriber counts below this are treated as this, so a brand-new channel's first views don't explode the term.
+SUBSCRIBER_FLOOR = 1000
 
 
-def compute_video_score(row: dict[str, Any]) -> float:
+def compute_video_score(row: Mapping[str, Any], *, subscriber_weight: float = 0.0) -> float:
     """Compute a lightweight trend score.
 
     Formula (heuristic):
     - views_per_hour since publish (log-scaled)
     - + small weights for engagement ratios
+    - + optionally, `subscriber_weight` * log10(1 + views per channel subscriber), so the same
+      views count for more on a small channel (skipped when the subscriber count is unknown)
     """
-    views = (row.get("view_count") or 0) or 0
-    likes = (row.get("like_count") or 0) or 0
-    comments = (row.get("comment_count") or 0) or 0
+    if isinstance(row, VideoRecord):
+        # Hot path: counts and epoch timestamps straight from the slots.
+        published_ts = row.published_ts
+        fetched_ts = row.fetched_ts
+        age_seconds = fetched_ts - published_ts if published_ts is not None and fetched_ts is not None else None
+        score = _trend_score(row.view_count or 0, row.like_count or 0, row.comment_count or 0, age_seconds)
+        if subscriber_weight and row.channel_subscribers is not None:
+            score += subscriber_weight * _subscriber_term(row.view_count or 0, row.channel_subscribers)
+        return score
 
     published_at: datetime | None = row.get("published_at")
     fetched_at: datetime | None = row.get("fetched_at")
-    if not published_at or not fetched_at:
+    age_seconds = None
+    if published_at and fetched_at:
+        if published_at.tzinfo is None:
+            published_at = published_at.replace(tzinfo=timezone.utc)
+        if fetched_at.tzinfo is None:
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+        age_seconds = (fetched_at - published_at).total_seconds()
+    score = _trend_score(row.get("view_count") or 0, row.get("like_count") or 0, row.get("comment_count") or 0, age_seconds)
+    subscribers = row.get("channel_subscribers")
+    if subscriber_weight and subscribers is not None:
+        score += subscriber_weight * _subscriber_term(row.get("view_count") or 0, subscribers)
+    return score
+
+
+def _subscriber_term(views: int, subscribers: int) -> float:
+    return math.log10(1.0 + views / max(subscribers, SUBSCRIBER_FLOOR))
+
+
+def _trend_score(views: int, likes: int, comments: int, age_seconds: float | None) -> float:
+    if age_seconds is None:
         return float(views)
 
-    if published_at.tzinfo is None:
-        published_at = published_at.replace(tzinfo=timezone.utc)
-    if fetched_at.tzinfo is None:
-        fetched_at = fetched_at.replace(tzinfo=timezone.utc)
-
-    age_hours = max((fetched_at - published_at).total_seconds() / 3600.0, 1.0)
+    age_hours = max(age_seconds / 3600.0, 1.0)
     vph = views / age_hours
 
     like_ratio = likes / max(views, 1)
@@ -40,28 +67,31 @@ def compute_video_score(row: dict[str, Any]) -> float:
     return base * boost
 
 
-def score_themes_by_query(videos: list[dict[str, Any]]) -> list[dict[str, Any]]:
+def score_themes_by_query(videos: list[dict[str, Any]], *, subscriber_weight: float = 0.0) -> list[dict[str, Any]]:
     """Group videos by query name and score each theme bucket."""
+    return score_theme_buckets(((v.get("query") or "(unknown)", v) for v in videos), subscriber_weight=subscriber_weight)
+
+
+def score_theme_buckets(pairs: Iterable[tuple[str, dict[str, Any]]], *, subscriber_weight: float = 0.0) -> list[dict[str, Any]]:
+    """Score (theme, video) pairs into ranked theme rows with top examples."""
     buckets: dict[str, list[tuple[dict[str, Any], float]]] = defaultdict(list)
 
-    for v in videos:
-        theme = v.get("query") or "(unknown)"
-        score = compute_video_score(v)
-        buckets[theme].append((v, score))
+    for theme, v in pairs:
+        buckets[theme].append((v, compute_video_score(v, subscriber_weight=subscriber_weight)))
 
     themes: list[dict[str, Any]] = []
     for theme, items in buckets.items():
         items_sorted = sorted(items, key=lambda x: x[1], reverse=True)
         total = float(sum(s for _, s in items_sorted))
         examples = [
-            {"title": (it[0].get("title") or ""), "score": round(it[1], 4)}
+            {"video_id": it[0].get("video_id"), "title": (it[0].get("title") or ""), "score": round(it[1], 4)}
             for it in items_sorted[:5]
         ]
         themes.append(
             {
                 "theme": theme,
                 "score": round(total, 6),
-                "examples_json": json.dumps(examples, ensure_ascii=False),
+                "examples": examples,
             }
         )
 
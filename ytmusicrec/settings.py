@@ -3,6 +3,9 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
+
+import yaml
 
 
 @dataclass(frozen=True)
@@ -10,6 +13,14 @@ class Settings:
     # YouTube
     youtube_api_key: str
     region_code: str = "US"
+    # Multi-region mode: collect these in parallel (queries.yaml region_codes wins if set)
+    region_codes: tuple[str, ...] = ()
+    # Extra keys (other Cloud projects) pooled with youtube_api_key, each with its own quota
+    youtube_api_keys: tuple[str, ...] = ()
+    youtube_daily_quota: int = 10_000
+    # API roots; point these (and OLLAMA_BASE_URL / DISCORD_WEBHOOK_URL) at scripts/standin.py to run offline
+    youtube_base_url: str = "https://www.googleapis.com/youtube/v3"
+    google_sheets_base_url: str | None = None  # None = Google's endpoint
 
     # Ollama
     ollama_base_url: str = "http://host.docker.internal:11434"
@@ -23,6 +34,37 @@ class Settings:
     mssql_password: str = ""
     mssql_encrypt: str = "yes"
     mssql_trust_server_cert: str = "yes"
+    # Seconds to wait for a login, and for any single statement (0 = no limit)
+    mssql_login_timeout: int = 30
+    mssql_statement_timeout: int = 600
+
+    # Storage backend: "mssql" (host SQL Server) or "sqlite" (embedded file)
+    storage_backend: str = "mssql"
+    sqlite_path: Path = Path("/opt/ytmusicrec/data/ytmusicrec.sqlite3")
+
+    # Connection pool per worker process (ytmusicrec/dbpool.py)
+    db_pool_size: int = 4
+    db_pool_idle_seconds: float = 300.0
+
+    # Read API (scripts/serve_api.py). Pipeline stages touch cache_stamp_path after
+    # committing so the API drops its cached responses.
+    api_host: str = "127.0.0.1"
+    api_port: int = 8765
+    api_cache_entries: int = 512
+    cache_stamp_path: Path = Path("/opt/ytmusicrec/data/cache.stamp")
+
+    # Columnar exports (ytmusicrec/columnar.py): Parquet datasets + Arrow cache of the last N days
+    export_dir: Path = Path("/opt/ytmusicrec/data/columnar")
+    export_cache_days: int = 120
+
+    # XCom handoff between DAG tasks (see xcom_handoff_mode); reference mode keeps
+    # run artifacts (e.g. the generated prompts) as JSON files under artifact_dir.
+    xcom_handoff: str = "payload"
+    artifact_dir: Path = Path("/opt/ytmusicrec/data/artifacts")
+
+    # Memory profiling of pipeline stages (ytmusicrec/memprofile.py); results go to StageMemory
+    memory_profile: bool = False
+    memory_profile_top: int = 10
 
     # Outputs
     discord_webhook_url: str | None = None
@@ -46,17 +88,44 @@ def _env(name: str, default: str | None = None) -> str | None:
     return v
 
 
+XCOM_HANDOFF_MODES = ("payload", "reference")
+
+
+def xcom_handoff_mode() -> str:
+    """``payload``: tasks pass themes/prompts through XCom; ``reference``: only the run date and id.
+
+    Read from YTMUSICREC_XCOM_HANDOFF without the rest of the settings, so DAG files
+    can wire their op_kwargs at parse time.
+    """
+    mode = (_env("YTMUSICREC_XCOM_HANDOFF", "payload") or "payload").lower()
+    if mode not in XCOM_HANDOFF_MODES:
+        raise ValueError(f"Unknown YTMUSICREC_XCOM_HANDOFF {mode!r}; expected one of {XCOM_HANDOFF_MODES}")
+    return mode
+
+
 def load_settings() -> Settings:
+    youtube_api_keys = tuple(
+        k.strip() for k in (_env("YOUTUBE_API_KEYS", "") or "").split(",") if k.strip() and k.strip() != "placeholder"
+    )
     youtube_api_key = _env("YOUTUBE_API_KEY")
+    if (not youtube_api_key or youtube_api_key == "placeholder") and youtube_api_keys:
+        youtube_api_key = youtube_api_keys[0]
     if not youtube_api_key or youtube_api_key == "placeholder":
         # allow local smoke tests to fail fast with clear message
         raise RuntimeError(
             "YOUTUBE_API_KEY is not set. Add it to airflow/.env (or your environment) before running."
         )
 
+    repo_root = Path(_env("YTMUSICREC_REPO_ROOT", "/opt/ytmusicrec") or "/opt/ytmusicrec")
+
     return Settings(
         youtube_api_key=youtube_api_key,
+        youtube_api_keys=youtube_api_keys,
+        youtube_daily_quota=int(_env("YOUTUBE_DAILY_QUOTA", "10000") or "10000"),
+        youtube_base_url=_env("YOUTUBE_BASE_URL", "https://www.googleapis.com/youtube/v3") or "https://www.googleapis.com/youtube/v3",
+        google_sheets_base_url=_env("GOOGLE_SHEETS_BASE_URL"),
         region_code=_env("REGION_CODE", "US") or "US",
+        region_codes=tuple(r.strip().upper() for r in (_env("REGION_CODES", "") or "").split(",") if r.strip()),
         ollama_base_url=_env("OLLAMA_BASE_URL", "http://host.docker.internal:11434") or "http://host.docker.internal:11434",
         ollama_model=_env("OLLAMA_MODEL", "llama3.1:8b") or "llama3.1:8b",
         mssql_host=_env("MSSQL_HOST", "host.docker.internal") or "host.docker.internal",
@@ -66,6 +135,22 @@ def load_settings() -> Settings:
         mssql_password=_env("MSSQL_PASSWORD", "") or "",
         mssql_encrypt=_env("MSSQL_ENCRYPT", "yes") or "yes",
         mssql_trust_server_cert=_env("MSSQL_TRUST_SERVER_CERT", "yes") or "yes",
+        mssql_login_timeout=int(_env("MSSQL_LOGIN_TIMEOUT", "30") or "30"),
+        mssql_statement_timeout=int(_env("MSSQL_STATEMENT_TIMEOUT", "600") or "600"),
+        storage_backend=(_env("YTMUSICREC_STORAGE_BACKEND", "mssql") or "mssql").lower(),
+        sqlite_path=Path(_env("YTMUSICREC_SQLITE_PATH") or repo_root / "data" / "ytmusicrec.sqlite3"),
+        db_pool_size=int(_env("YTMUSICREC_DB_POOL_SIZE", "4") or "4"),
+        db_pool_idle_seconds=float(_env("YTMUSICREC_DB_POOL_IDLE_SECONDS", "300") or "300"),
+        api_host=_env("YTMUSICREC_API_HOST", "127.0.0.1") or "127.0.0.1",
+        api_port=int(_env("YTMUSICREC_API_PORT", "8765") or "8765"),
+        api_cache_entries=int(_env("YTMUSICREC_API_CACHE_ENTRIES", "512") or "512"),
+        cache_stamp_path=Path(_env("YTMUSICREC_CACHE_STAMP") or repo_root / "data" / "cache.stamp"),
+        export_dir=Path(_env("YTMUSICREC_EXPORT_DIR") or repo_root / "data" / "columnar"),
+        export_cache_days=int(_env("YTMUSICREC_EXPORT_CACHE_DAYS", "120") or "120"),
+        xcom_handoff=xcom_handoff_mode(),
+        artifact_dir=Path(_env("YTMUSICREC_ARTIFACT_DIR") or repo_root / "data" / "artifacts"),
+        memory_profile=(_env("YTMUSICREC_MEMORY_PROFILE", "false") or "false").lower() in {"1", "true", "yes"},
+        memory_profile_top=int(_env("YTMUSICREC_MEMORY_PROFILE_TOP", "10") or "10"),
         discord_webhook_url=_env("DISCORD_WEBHOOK_URL"),
         google_sheets_spreadsheet_id=_env("GOOGLE_SHEETS_SPREADSHEET_ID"),
         google_oauth_client_json=_env("GOOGLE_OAUTH_CLIENT_JSON", "/run/secrets/google_oauth_client.json")
@@ -73,6 +158,11 @@ def load_settings() -> Settings:
         google_oauth_token_json=_env("GOOGLE_OAUTH_TOKEN_JSON", "/run/secrets/google_token.json")
         or "/run/secrets/google_token.json",
         host_desktop_mount=_env("HOST_DESKTOP_MOUNT", "/host_desktop") or "/host_desktop",
-        repo_root=Path(_env("YTMUSICREC_REPO_ROOT", "/opt/ytmusicrec") or "/opt/ytmusicrec"),
+        repo_root=repo_root,
         dry_run=(_env("YTMUSICREC_DRY_RUN", "false") or "false").lower() in {"1", "true", "yes"},
     )
+
+
+def load_query_config(repo_root: Path) -> dict[str, Any]:
+    path = repo_root / "config" / "queries.yaml"
+    return yaml.safe_load(path.read_text(encoding="utf-8"))
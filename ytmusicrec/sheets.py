@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import logging
 from datetime import date, datetime
+from pathlib import Path
 from typing import Any
 
 from google.oauth2.credentials import Credentials
+from google.auth.credentials import AnonymousCredentials
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 
@@ -31,9 +33,24 @@ def _ensure_sheets(service, spreadsheet_id: str, names: list[str]) -> None:
         service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body={"requests": requests_}).execute()
 
 
-def write_daily(*, spreadsheet_id: str, token_json_path: str, run_date: date, themes: list[dict[str, Any]], suno: list[dict[str, Any]]) -> None:
-    creds = load_creds(token_json_path)
-    service = build("sheets", "v4", credentials=creds, cache_discovery=False)
+def build_service(token_json_path: str, base_url: str | None = None):
+    if not base_url:
+        return build("sheets", "v4", credentials=load_creds(token_json_path), cache_discovery=False)
+    # Stand-in server (standin.py): replays need no OAuth token; recording forwards the real one.
+    creds = load_creds(token_json_path) if Path(token_json_path).exists() else AnonymousCredentials()
+    return build("sheets", "v4", credentials=creds, cache_discovery=False, client_options={"api_endpoint": base_url})
+
+
+def write_daily(
+    *,
+    spreadsheet_id: str,
+    token_json_path: str,
+    run_date: date,
+    themes: list[dict[str, Any]],
+    suno: list[dict[str, Any]],
+    base_url: str | None = None,
+) -> None:
+    service = build_service(token_json_path, base_url)
 
     _ensure_sheets(service, spreadsheet_id, ["Daily", "History"])
 
@@ -0,0 +1,1001 @@
+"""Embedded SQLite implementation of the storage API in `ytmusicrec.mssql`.
+
+Same function names and signatures; T-SQL constructs map to SQLite ones:
+MERGE -> INSERT ... ON CONFLICT DO UPDATE, OUTPUT INSERTED -> lastrowid,
+#temp staging tables -> executemany straight into the target.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import sqlite3
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping
+
+from ytmusicrec.migrations import pending_migrations
+from ytmusicrec.records import VideoRecord
+from ytmusicrec.settings import Settings
+from ytmusicrec.storage import (
+    STAGE_MEMORY_COLUMNS,
+    VIDEO_SIDE_TABLES,
+    RunInfo,
+    attach_examples,
+    examples_json,
+    profile_prompt_params,
+    prompt_hash,
+    scored_themes,
+    theme_example_params,
+)
+
+log = logging.getLogger(__name__)
+
+
+def _adapt_datetime(dt: datetime) -> str:
+    # Store naive UTC, like DATETIME2 does on the MSSQL side.
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.isoformat(" ")
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_converter("DATETIME", lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()))
+
+
+def connect(s: Settings) -> sqlite3.Connection:
+    path = Path(s.sqlite_path)
+    if str(path) != ":memory:":
+        path.parent.mkdir(parents=True, exist_ok=True)
+    # check_same_thread off: the read API hands pooled connections between threads (one at a time).
+    conn = sqlite3.connect(str(path), detect_types=sqlite3.PARSE_DECLTYPES, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Compressed descriptions (VideoDescriptions / VideosArchive, see retention.py).
+    conn.create_function("ytm_zip", 1, _zip, deterministic=True)
+    conn.create_function("ytm_unzip", 1, _unzip, deterministic=True)
+    # score_query_themes needs log10; builds without the math functions get Python's.
+    try:
+        conn.execute("SELECT log10(10)")
+    except sqlite3.OperationalError:
+        conn.create_function("log10", 1, math.log10, deterministic=True)
+    return conn
+
+
+def _zip(text: str | None) -> bytes | None:
+    return None if text is None else zlib.compress(text.encode("utf-8"), 6)
+
+
+def _unzip(blob: bytes | None) -> str | None:
+    return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """Highest applied migration version (0 if SchemaVersion does not exist yet)."""
+    try:
+        row = conn.execute("SELECT IFNULL(MAX(version), 0) FROM SchemaVersion").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return int(row[0])
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """Bring the database up to the latest migration in db/migrations/sqlite."""
+    if not pending_migrations("sqlite", schema_version(conn)):
+        return
+
+    # BEGIN IMMEDIATE takes the write lock, so concurrent workers migrate one at a time.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS SchemaVersion (
+              version INTEGER NOT NULL PRIMARY KEY,
+              name TEXT NOT NULL,
+              applied_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            )
+            """
+        )
+        for m in pending_migrations("sqlite", schema_version(conn)):
+            log.info("Applying schema migration %04d_%s", m.version, m.name)
+            for stmt in _split_statements(m.read()):
+                conn.execute(stmt)
+            conn.execute("INSERT INTO SchemaVersion (version, name) VALUES (?, ?)", (m.version, m.name))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _split_statements(script: str) -> list[str]:
+    # executescript() would COMMIT our transaction, so run statements one by one.
+    out: list[str] = []
+    buf = ""
+    for line in script.splitlines(keepends=True):
+        if line.lstrip().startswith("--"):
+            continue
+        buf += line
+        if sqlite3.complete_statement(buf):
+            if buf.strip():
+                out.append(buf.strip())
+            buf = ""
+    if buf.strip():
+        out.append(buf.strip())
+    return out
+
+
+def _day_bounds(d: date) -> tuple[datetime, datetime]:
+    start = datetime(d.year, d.month, d.day)
+    return start, start + timedelta(days=1)
+
+
+# VideoRecord columns (alias v = Videos; d = VideoDescriptions and c = Channels via _VIDEO_RECORD_JOINS)
+# with timestamps as epoch seconds, so rows skip the DATETIME converter.
+_VIDEO_RECORD_COLUMNS = """
+    v.video_id, v.query, v.title, COALESCE(v.description, ytm_unzip(d.description_gz)), v.channel_title,
+    CAST(strftime('%s', v.published_at) AS INTEGER),
+    v.view_count, v.like_count, v.comment_count, v.duration_seconds,
+    CAST(strftime('%s', v.fetched_at) AS INTEGER),
+    v.channel_id, c.subscriber_count
+"""
+_VIDEO_RECORD_JOINS = """
+    LEFT JOIN VideoDescriptions d ON d.video_id = v.video_id
+    LEFT JOIN Channels c ON c.channel_id = v.channel_id
+"""
+
+
+def update_run_video_count(conn: sqlite3.Connection, run_id: int, video_count: int) -> None:
+    conn.execute("UPDATE Runs SET video_count=? WHERE run_id=?", (video_count, run_id))
+    conn.commit()
+
+
+def upsert_videos(conn: sqlite3.Connection, rows: Iterable[Mapping[str, Any]]) -> int:
+    """Upsert video rows (VideoRecords or dicts) into Videos. Returns number of processed rows."""
+    params = [VideoRecord.from_mapping(r).params() for r in {r["video_id"]: r for r in rows}.values()]
+    if not params:
+        return 0
+
+    conn.executemany(
+        """
+        INSERT INTO Videos (video_id, query, title, description, channel_title, published_at, view_count, like_count, comment_count, duration_seconds, fetched_at, channel_id)
+        VALUES (?, ?, ?, ?, ?, datetime(?, 'unixepoch'), ?, ?, ?, ?, datetime(?, 'unixepoch'), ?)
+        ON CONFLICT (video_id) DO UPDATE SET
+            query = excluded.query,
+            title = excluded.title,
+            description = excluded.description,
+            channel_title = excluded.channel_title,
+            published_at = excluded.published_at,
+            view_count = excluded.view_count,
+            like_count = excluded.like_count,
+            comment_count = excluded.comment_count,
+            duration_seconds = COALESCE(excluded.duration_seconds, Videos.duration_seconds),
+            fetched_at = excluded.fetched_at,
+            channel_id = COALESCE(excluded.channel_id, Videos.channel_id)
+        """,
+        params,
+    )
+    conn.commit()
+    return len(params)
+
+
+def write_daily_themes(conn: sqlite3.Connection, run_date_: date, themes: list[dict[str, Any]]) -> None:
+    # Examples go to DailyThemeExamples; clearing examples_json drops any pre-0008 blob on rerun.
+    conn.executemany(
+        """
+        INSERT INTO DailyThemes (run_date, theme, score, examples_json) VALUES (?, ?, ?, NULL)
+        ON CONFLICT (run_date, theme) DO UPDATE SET score = excluded.score, examples_json = NULL
+        """,
+        [(run_date_, t["theme"], float(t["score"])) for t in themes],
+    )
+    conn.execute("DELETE FROM DailyThemeExamples WHERE run_date = ?", (run_date_,))
+    conn.executemany(
+        "INSERT INTO DailyThemeExamples (run_date, theme, rank, video_id, score) VALUES (?, ?, ?, ?, ?)",
+        theme_example_params(run_date_, themes),
+    )
+    conn.commit()
+
+
+def fetch_videos_for_date(conn: sqlite3.Connection, run_date_: date) -> list[VideoRecord]:
+    start, end = _day_bounds(run_date_)
+    cur = conn.execute(
+        f"""
+        SELECT {_VIDEO_RECORD_COLUMNS}
+        FROM Videos v
+        {_VIDEO_RECORD_JOINS}
+        WHERE v.fetched_at >= ? AND v.fetched_at < ?
+        """,
+        (start, end),
+    )
+    return [VideoRecord(*row) for row in cur.fetchall()]
+
+
+def create_run(conn: sqlite3.Connection, run_date_: date, region_code: str, query_count: int) -> RunInfo:
+    """
+    Idempotent: returns existing run for (run_date, region_code) if it exists,
+    otherwise creates one.
+    """
+    row = conn.execute(
+        "SELECT run_id FROM Runs WHERE run_date = ? AND region_code = ? ORDER BY created_at DESC LIMIT 1",
+        (run_date_, region_code),
+    ).fetchone()
+    if row:
+        run_id = int(row[0])
+        conn.execute("UPDATE Runs SET query_count = ? WHERE run_id = ?", (query_count, run_id))
+        conn.commit()
+        return RunInfo(run_id=run_id, run_date=run_date_, region_code=region_code)
+
+    cur = conn.execute(
+        "INSERT INTO Runs (run_date, region_code, query_count, video_count) VALUES (?, ?, ?, 0)",
+        (run_date_, region_code, query_count),
+    )
+    run_id = int(cur.lastrowid)
+    conn.commit()
+    return RunInfo(run_id=run_id, run_date=run_date_, region_code=region_code)
+
+
+def write_daily_prompts(conn: sqlite3.Connection, run_date_: date, prompts: list[dict[str, Any]]) -> None:
+    # idempotent: remove prior run_date prompts then re-insert
+    conn.execute("DELETE FROM DailyPrompts WHERE run_date = ?", (run_date_,))
+
+    seen: set[tuple[str, str]] = set()
+    params = []
+    for p in prompts:
+        tool = (p.get("tool") or "").strip()
+        prompt = (p.get("prompt") or "").strip()
+        if not tool or not prompt or (tool, prompt) in seen:
+            continue
+        seen.add((tool, prompt))
+        params.append((run_date_, tool, prompt, p.get("theme_tags")))
+
+    conn.executemany("INSERT INTO DailyPrompts (run_date, tool, prompt, theme_tags) VALUES (?, ?, ?, ?)", params)
+    conn.commit()
+
+
+def get_cached_video_ids(conn: sqlite3.Connection, run_date_: date, region_code: str, query_name: str) -> list[str] | None:
+    row = conn.execute(
+        "SELECT video_ids_json FROM QueryCache WHERE run_date = ? AND region_code = ? AND query_name = ?",
+        (run_date_, region_code, query_name),
+    ).fetchone()
+    if not row:
+        return None
+    return json.loads(row[0])
+
+
+def set_cached_video_ids(conn: sqlite3.Connection, run_date_: date, region_code: str, query_name: str, q: str, ids: list[str], fetched_at: datetime) -> None:
+    conn.execute(
+        """
+        INSERT INTO QueryCache (run_date, region_code, query_name, q, video_ids_json, fetched_at) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (run_date, region_code, query_name) DO UPDATE SET
+          q = excluded.q, video_ids_json = excluded.video_ids_json, fetched_at = excluded.fetched_at
+        """,
+        (run_date_, region_code, query_name, q, json.dumps(ids), fetched_at),
+    )
+    conn.commit()
+
+
+def write_daily_theme_trends(conn: sqlite3.Connection, run_date_: date, trends: list[dict[str, Any]]) -> None:
+    conn.execute("DELETE FROM DailyThemeTrends WHERE run_date = ?", (run_date_,))
+    conn.executemany(
+        """
+        INSERT INTO DailyThemeTrends (run_date, theme, score, prev_score, delta_1d, avg_7d, momentum)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (run_date_, t["theme"], float(t["score"]), t.get("prev_score"), t.get("delta_1d"), t.get("avg_7d"), t.get("momentum"))
+            for t in trends
+        ],
+    )
+    conn.commit()
+
+
+def fetch_daily_themes_range(conn: sqlite3.Connection, start_date: date, end_date: date, with_examples: bool = False) -> list[dict[str, Any]]:
+    """Theme scores for the range; `with_examples` adds each row's `examples` list."""
+    cur = conn.execute(
+        f"SELECT run_date, theme, score{', examples_json' if with_examples else ''} FROM DailyThemes WHERE run_date >= ? AND run_date <= ?",
+        (start_date, end_date),
+    )
+    cols = [c[0] for c in cur.description]
+    rows = [dict(zip(cols, row)) for row in cur.fetchall()]
+    if with_examples:
+        attach_examples(rows, fetch_daily_theme_examples_range(conn, start_date, end_date))
+    return rows
+
+
+def fetch_top_themes(conn: sqlite3.Connection, run_date_: date, limit: int, profile: str | None = None) -> list[dict[str, Any]]:
+    """The date's `limit` best themes (theme, score) from DailyThemes, or DailyProfileThemes for `profile`."""
+    if profile is None:
+        cur = conn.execute("SELECT theme, score FROM DailyThemes WHERE run_date = ? ORDER BY score DESC, theme LIMIT ?", (run_date_, limit))
+    else:
+        cur = conn.execute(
+            "SELECT theme, score FROM DailyProfileThemes WHERE run_date = ? AND profile = ? ORDER BY score DESC, theme LIMIT ?",
+            (run_date_, profile, limit),
+        )
+    return [{"theme": theme, "score": score} for theme, score in cur.fetchall()]
+
+
+def fetch_daily_theme_examples_range(conn: sqlite3.Connection, start_date: date, end_date: date) -> list[dict[str, Any]]:
+    """DailyThemeExamples rows for the range, with the video's current title."""
+    cur = conn.execute(
+        """
+        SELECT e.run_date, e.theme, e.rank, e.video_id, e.score, COALESCE(v.title, a.title) AS title
+        FROM DailyThemeExamples e
+        LEFT JOIN Videos v ON v.video_id = e.video_id
+        LEFT JOIN VideosArchive a ON a.video_id = e.video_id
+        WHERE e.run_date >= ? AND e.run_date <= ?
+        ORDER BY e.run_date, e.theme, e.rank
+        """,
+        (start_date, end_date),
+    )
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def fetch_recent_prompt_hashes(conn: sqlite3.Connection, tool: str, since_date: date) -> set[bytes]:
+    cur = conn.execute(
+        "SELECT prompt_hash FROM DailyPromptHistory WHERE tool = ? AND run_date >= ?",
+        (tool, since_date),
+    )
+    return {bytes(row[0]) for row in cur.fetchall()}
+
+
+def write_prompt_history(conn: sqlite3.Connection, run_date_: date, tool: str, prompts: list[dict[str, Any]]) -> None:
+    params = []
+    for p in prompts:
+        prompt = (p.get("prompt") or "").strip()
+        if not prompt:
+            continue
+        params.append((run_date_, tool, prompt, prompt_hash(prompt), p.get("theme_tags")))
+    conn.executemany(
+        "INSERT INTO DailyPromptHistory (run_date, tool, prompt, prompt_hash, theme_tags) VALUES (?, ?, ?, ?, ?)",
+        params,
+    )
+    conn.commit()
+
+
+def write_daily_query_stats(conn: sqlite3.Connection, run_date_: date, region_code: str, rows: list[dict[str, Any]]) -> None:
+    conn.execute("DELETE FROM DailyQueryStats WHERE run_date = ? AND region_code = ?", (run_date_, region_code))
+    conn.executemany(
+        """
+        INSERT INTO DailyQueryStats
+          (run_date, region_code, query_name, q, video_count, total_views, total_likes, total_comments,
+           new_video_count, score_sum, quota_units)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                run_date_,
+                region_code,
+                r["query_name"],
+                r["q"],
+                int(r["video_count"]),
+                r.get("total_views"),
+                r.get("total_likes"),
+                r.get("total_comments"),
+                r.get("new_video_count"),
+                r.get("score_sum"),
+                r.get("quota_units"),
+            )
+            for r in rows
+        ],
+    )
+    conn.commit()
+
+
+def fetch_top_queries(conn: sqlite3.Connection, region_code: str, since_date: date, limit: int = 5) -> list[str]:
+    cur = conn.execute(
+        """
+        SELECT q
+        FROM DailyQueryStats
+        WHERE region_code = ? AND run_date >= ?
+        ORDER BY IFNULL(total_views, 0) DESC, video_count DESC
+        LIMIT ?
+        """,
+        (region_code, since_date, limit),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def fetch_query_watermarks(conn: sqlite3.Connection, region_code: str) -> dict[str, datetime]:
+    """Return {q: last successful fetched_at} for incremental collection."""
+    cur = conn.execute("SELECT q, last_fetched_at FROM QueryWatermarks WHERE region_code = ?", (region_code,))
+    return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def set_query_watermarks(conn: sqlite3.Connection, region_code: str, qs: list[str], fetched_at: datetime) -> None:
+    conn.executemany(
+        """
+        INSERT INTO QueryWatermarks (region_code, q, last_fetched_at) VALUES (?, ?, ?)
+        ON CONFLICT (region_code, q) DO UPDATE SET
+          last_fetched_at = excluded.last_fetched_at,
+          updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+        """,
+        [(region_code, q, fetched_at) for q in qs],
+    )
+    conn.commit()
+
+
+def fetch_known_video_ids(conn: sqlite3.Connection, published_after: datetime) -> dict[str, str | None]:
+    """Return {video_id: query} for stored videos published after `published_after`."""
+    cur = conn.execute("SELECT video_id, query FROM Videos WHERE published_at >= ?", (published_after,))
+    return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def fetch_region_video_ids(conn: sqlite3.Connection, region_code: str, since_date: date) -> set[str]:
+    """Ids VideoRegions has recorded for the region on or after `since_date`."""
+    cur = conn.execute(
+        "SELECT DISTINCT video_id FROM VideoRegions WHERE run_date >= ? AND region_code = ?", (since_date, region_code)
+    )
+    return {row[0] for row in cur.fetchall()}
+
+
+def fetch_query_bandit_state(conn: sqlite3.Connection, region_code: str) -> list[dict[str, Any]]:
+    cur = conn.execute(
+        "SELECT q, pulls, reward_sum, reward_sq_sum, last_run_date FROM QueryBanditState WHERE region_code = ?",
+        (region_code,),
+    )
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def update_query_bandit_state(conn: sqlite3.Connection, region_code: str, run_date_: date, rewards: dict[str, float]) -> None:
+    """Add one pull with the given reward to each query's arm."""
+    conn.executemany(
+        """
+        INSERT INTO QueryBanditState (region_code, q, pulls, reward_sum, reward_sq_sum, last_run_date)
+        VALUES (?, ?, 1, ?, ? * ?, ?)
+        ON CONFLICT (region_code, q) DO UPDATE SET
+          pulls = pulls + 1,
+          reward_sum = reward_sum + excluded.reward_sum,
+          reward_sq_sum = reward_sq_sum + excluded.reward_sq_sum,
+          last_run_date = excluded.last_run_date,
+          updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+        """,
+        [(region_code, q, float(r), float(r), float(r), run_date_) for q, r in rewards.items()],
+    )
+    conn.commit()
+
+
+def fetch_api_key_usage(conn: sqlite3.Connection, usage_date: date) -> dict[str, dict[str, Any]]:
+    cur = conn.execute("SELECT key_id, units_used, exhausted FROM ApiKeyUsage WHERE usage_date = ?", (usage_date,))
+    return {row[0]: {"units_used": int(row[1]), "exhausted": bool(row[2])} for row in cur.fetchall()}
+
+
+def add_api_key_usage(conn: sqlite3.Connection, usage_date: date, usage: list[dict[str, Any]]) -> None:
+    """Add each key's `units_delta` to the ledger (additive, so parallel workers don't clobber)."""
+    conn.executemany(
+        """
+        INSERT INTO ApiKeyUsage (usage_date, key_id, units_used, exhausted) VALUES (?, ?, ?, ?)
+        ON CONFLICT (usage_date, key_id) DO UPDATE SET
+          units_used = units_used + excluded.units_used,
+          exhausted = MAX(exhausted, excluded.exhausted),
+          updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+        """,
+        [(usage_date, u["key_id"], int(u["units_delta"]), int(bool(u["exhausted"]))) for u in usage],
+    )
+    conn.commit()
+
+
+def write_video_regions(conn: sqlite3.Connection, run_date_: date, region_code: str, rows: Iterable[dict[str, Any]]) -> None:
+    """Record which region surfaced each video. Upserts, so intra-day incremental runs only add to the day."""
+    conn.executemany(
+        """
+        INSERT INTO VideoRegions (run_date, region_code, video_id, query) VALUES (?, ?, ?, ?)
+        ON CONFLICT (run_date, region_code, video_id) DO UPDATE SET query = excluded.query
+        """,
+        [(run_date_, region_code, vid, q) for vid, q in {r["video_id"]: r.get("query") for r in rows}.items()],
+    )
+    conn.commit()
+
+
+def fetch_region_videos_for_date(conn: sqlite3.Connection, run_date_: date, region_code: str) -> list[VideoRecord]:
+    """Like fetch_videos_for_date, limited to one region and bucketed by that region's query."""
+    cur = conn.execute(
+        f"""
+        SELECT {_VIDEO_RECORD_COLUMNS.replace("v.query", "vr.query")}
+        FROM VideoRegions vr
+        JOIN Videos v ON v.video_id = vr.video_id
+        {_VIDEO_RECORD_JOINS}
+        WHERE vr.run_date = ? AND vr.region_code = ?
+        """,
+        (run_date_, region_code),
+    )
+    return [VideoRecord(*row) for row in cur.fetchall()]
+
+
+def write_daily_region_themes(conn: sqlite3.Connection, run_date_: date, region_code: str, themes: list[dict[str, Any]]) -> None:
+    conn.execute("DELETE FROM DailyRegionThemes WHERE run_date = ? AND region_code = ?", (run_date_, region_code))
+    conn.executemany(
+        "INSERT INTO DailyRegionThemes (run_date, region_code, theme, score, examples_json) VALUES (?, ?, ?, ?, ?)",
+        [(run_date_, region_code, t["theme"], float(t["score"]), examples_json(t)) for t in themes],
+    )
+    conn.commit()
+
+
+def write_video_queries(conn: sqlite3.Connection, run_date_: date, hits: Mapping[str, Iterable[str]]) -> None:
+    """Record every query string that returned each video. Only adds, like write_video_regions."""
+    conn.executemany(
+        "INSERT INTO VideoQueries (run_date, q, video_id) VALUES (?, ?, ?) ON CONFLICT DO NOTHING",
+        [(run_date_, q, vid) for q, ids in hits.items() for vid in set(ids)],
+    )
+    conn.commit()
+
+
+def fetch_query_videos_for_date(conn: sqlite3.Connection, run_date_: date, qs: Iterable[str]) -> list[VideoRecord]:
+    """Videos returned by any of the query strings `qs` on the date, one record per (q, video) with `query` = q."""
+    qs = sorted(set(qs))
+    if not qs:
+        return []
+    cur = conn.execute(
+        f"""
+        SELECT {_VIDEO_RECORD_COLUMNS.replace("v.query", "vq.q")}
+        FROM VideoQueries vq
+        JOIN Videos v ON v.video_id = vq.video_id
+        {_VIDEO_RECORD_JOINS}
+        WHERE vq.run_date = ? AND vq.q IN ({','.join('?' * len(qs))})
+        """,
+        (run_date_, *qs),
+    )
+    return [VideoRecord(*row) for row in cur.fetchall()]
+
+
+def write_daily_profile_themes(conn: sqlite3.Connection, run_date_: date, profile: str, themes: list[dict[str, Any]]) -> None:
+    conn.execute("DELETE FROM DailyProfileThemes WHERE run_date = ? AND profile = ?", (run_date_, profile))
+    conn.executemany(
+        "INSERT INTO DailyProfileThemes (run_date, profile, theme, score, examples_json) VALUES (?, ?, ?, ?, ?)",
+        [(run_date_, profile, t["theme"], float(t["score"]), examples_json(t)) for t in themes],
+    )
+    conn.commit()
+
+
+def write_daily_profile_prompts(conn: sqlite3.Connection, run_date_: date, profile: str, prompts: list[dict[str, Any]]) -> None:
+    """Replace the profile's prompts for the date."""
+    conn.execute("DELETE FROM DailyProfilePrompts WHERE run_date = ? AND profile = ?", (run_date_, profile))
+    conn.executemany(
+        "INSERT INTO DailyProfilePrompts (run_date, profile, rank, tool, prompt, theme_tags) VALUES (?, ?, ?, ?, ?, ?)",
+        profile_prompt_params(run_date_, profile, prompts),
+    )
+    conn.commit()
+
+
+def write_stage_memory(conn: sqlite3.Connection, row: dict[str, Any]) -> None:
+    """Add one stage's memory profile (keys as in STAGE_MEMORY_COLUMNS)."""
+    conn.execute(
+        f"INSERT INTO StageMemory ({', '.join(STAGE_MEMORY_COLUMNS)}) VALUES ({', '.join('?' * len(STAGE_MEMORY_COLUMNS))})",
+        tuple(row.get(c) for c in STAGE_MEMORY_COLUMNS),
+    )
+    conn.commit()
+
+
+def fetch_stage_memory_range(conn: sqlite3.Connection, start_date: date, end_date: date, stage: str | None = None) -> list[dict[str, Any]]:
+    cur = conn.execute(
+        f"""
+        SELECT {', '.join(STAGE_MEMORY_COLUMNS)}, recorded_at
+        FROM StageMemory
+        WHERE run_date >= ? AND run_date <= ? AND (? IS NULL OR stage = ?)
+        ORDER BY stage, scope, run_date, stage_memory_id
+        """,
+        (start_date, end_date, stage, stage),
+    )
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def fetch_video_signatures(conn: sqlite3.Connection, video_ids: Iterable[str], algo: str) -> list[dict[str, Any]]:
+    """Cached clustering signatures of `algo` for `video_ids` (missing ids are simply absent)."""
+    ids = sorted(set(video_ids))
+    out: list[dict[str, Any]] = []
+    for i in range(0, len(ids), 500):
+        chunk = ids[i : i + 500]
+        cur = conn.execute(
+            f"SELECT video_id, signature, terms FROM VideoSignatures WHERE algo = ? AND video_id IN ({','.join('?' * len(chunk))})",
+            (algo, *chunk),
+        )
+        out.extend({"video_id": r[0], "signature": bytes(r[1]), "terms": r[2]} for r in cur.fetchall())
+    return out
+
+
+def write_video_signatures(conn: sqlite3.Connection, rows: list[dict[str, Any]], algo: str) -> None:
+    conn.executemany(
+        """
+        INSERT INTO VideoSignatures (video_id, algo, signature, terms) VALUES (?, ?, ?, ?)
+        ON CONFLICT (video_id) DO UPDATE SET
+          algo = excluded.algo, signature = excluded.signature, terms = excluded.terms, computed_at = CURRENT_TIMESTAMP
+        """,
+        [(r["video_id"], algo, r["signature"], r["terms"]) for r in rows],
+    )
+    conn.commit()
+
+
+_FINGERPRINT_COLS = "video_id, simhash, duration_seconds, canonical_video_id, published_at"
+
+
+def fetch_video_fingerprints(conn: sqlite3.Connection, video_ids: Iterable[str], algo: str) -> list[dict[str, Any]]:
+    ids = sorted(set(video_ids))
+    out: list[dict[str, Any]] = []
+    for i in range(0, len(ids), 500):
+        chunk = ids[i : i + 500]
+        cur = conn.execute(
+            f"SELECT {_FINGERPRINT_COLS} FROM VideoFingerprints WHERE algo = ? AND video_id IN ({','.join('?' * len(chunk))})",
+            (algo, *chunk),
+        )
+        cols = [c[0] for c in cur.description]
+        out.extend(dict(zip(cols, row)) for row in cur.fetchall())
+    return out
+
+
+def fetch_recent_fingerprints(conn: sqlite3.Connection, published_after: datetime, algo: str) -> list[dict[str, Any]]:
+    """Fingerprints of videos published after `published_after`, to seed the duplicate index."""
+    cur = conn.execute(
+        f"SELECT {_FINGERPRINT_COLS} FROM VideoFingerprints WHERE published_at >= ? AND algo = ?",
+        (published_after, algo),
+    )
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def write_video_fingerprints(conn: sqlite3.Connection, rows: list[dict[str, Any]], algo: str) -> None:
+    conn.executemany(
+        """
+        INSERT INTO VideoFingerprints (video_id, algo, simhash, duration_seconds, canonical_video_id, published_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (video_id) DO UPDATE SET
+          algo = excluded.algo, simhash = excluded.simhash, duration_seconds = excluded.duration_seconds,
+          canonical_video_id = excluded.canonical_video_id, published_at = excluded.published_at,
+          computed_at = CURRENT_TIMESTAMP
+        """,
+        [(r["video_id"], algo, r["simhash"], r.get("duration_seconds"), r["canonical_video_id"], r.get("published_at")) for r in rows],
+    )
+    conn.commit()
+
+
+def fetch_video_features(conn: sqlite3.Connection, video_ids: Iterable[str], version: int) -> dict[str, dict[str, Any]]:
+    """Stored VideoFeatures rows of `version` for `video_ids`, by id (missing ids are simply absent)."""
+    ids = sorted(set(video_ids))
+    out: dict[str, dict[str, Any]] = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i : i + 500]
+        cur = conn.execute(
+            f"SELECT video_id, title_tokens FROM VideoFeatures WHERE version = ? AND video_id IN ({','.join('?' * len(chunk))})",
+            (version, *chunk),
+        )
+        out.update((r[0], {"video_id": r[0], "title_tokens": r[1]}) for r in cur.fetchall())
+    return out
+
+
+def write_video_features(conn: sqlite3.Connection, rows: list[dict[str, Any]], version: int) -> None:
+    conn.executemany(
+        """
+        INSERT INTO VideoFeatures (video_id, version, title_tokens) VALUES (?, ?, ?)
+        ON CONFLICT (video_id) DO UPDATE SET
+          version = excluded.version, title_tokens = excluded.title_tokens, computed_at = CURRENT_TIMESTAMP
+        """,
+        [(r["video_id"], version, r["title_tokens"]) for r in rows],
+    )
+    conn.commit()
+
+
+def iter_videos_for_range(conn: sqlite3.Connection, start_date: date, end_date: date, batch_size: int = 5000) -> Iterator[VideoRecord]:
+    """Stream the videos fetched on `start_date`..`end_date` in one scan, ordered by fetched_at."""
+    start, _ = _day_bounds(start_date)
+    _, end = _day_bounds(end_date)
+    cur = conn.execute(
+        f"""
+        SELECT {_VIDEO_RECORD_COLUMNS}
+        FROM Videos v
+        {_VIDEO_RECORD_JOINS}
+        WHERE v.fetched_at >= ? AND v.fetched_at < ?
+        ORDER BY v.fetched_at
+        """,
+        (start, end),
+    )
+    while True:
+        batch = cur.fetchmany(batch_size)
+        if not batch:
+            return
+        for row in batch:
+            yield VideoRecord(*row)
+
+
+def replace_daily_themes_bulk(conn: sqlite3.Connection, themes_by_date: dict[date, list[dict[str, Any]]]) -> int:
+    """Replace DailyThemes (and their examples) for every date in `themes_by_date` in one transaction. Returns rows written."""
+    params = [(d, t["theme"], float(t["score"])) for d, themes in sorted(themes_by_date.items()) for t in themes]
+    example_params = [p for d, themes in sorted(themes_by_date.items()) for p in theme_example_params(d, themes)]
+    dates = [(d,) for d in sorted(themes_by_date)]
+    with conn:
+        conn.executemany("DELETE FROM DailyThemes WHERE run_date = ?", dates)
+        conn.executemany("DELETE FROM DailyThemeExamples WHERE run_date = ?", dates)
+        conn.executemany("INSERT INTO DailyThemes (run_date, theme, score) VALUES (?, ?, ?)", params)
+        conn.executemany(
+            "INSERT INTO DailyThemeExamples (run_date, theme, rank, video_id, score) VALUES (?, ?, ?, ?, ?)",
+            example_params,
+        )
+    return len(params)
+
+
+def replace_daily_theme_trends_bulk(conn: sqlite3.Connection, trends_by_date: dict[date, list[dict[str, Any]]]) -> int:
+    params = [
+        (d, t["theme"], float(t["score"]), t.get("prev_score"), t.get("delta_1d"), t.get("avg_7d"), t.get("momentum"))
+        for d, trends in sorted(trends_by_date.items())
+        for t in trends
+    ]
+    with conn:
+        conn.executemany("DELETE FROM DailyThemeTrends WHERE run_date = ?", [(d,) for d in sorted(trends_by_date)])
+        conn.executemany(
+            """
+            INSERT INTO DailyThemeTrends (run_date, theme, score, prev_score, delta_1d, avg_7d, momentum)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            params,
+        )
+    return len(params)
+
+
+def fetch_daily_theme_trends_range(conn: sqlite3.Connection, start_date: date, end_date: date) -> list[dict[str, Any]]:
+    cur = conn.execute(
+        """
+        SELECT run_date, theme, score, prev_score, delta_1d, avg_7d, momentum
+        FROM DailyThemeTrends
+        WHERE run_date >= ? AND run_date <= ?
+        ORDER BY run_date, score DESC
+        """,
+        (start_date, end_date),
+    )
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def fetch_daily_prompts_range(conn: sqlite3.Connection, start_date: date, end_date: date, tool: str | None = None) -> list[dict[str, Any]]:
+    cur = conn.execute(
+        """
+        SELECT run_date, tool, prompt, theme_tags
+        FROM DailyPrompts
+        WHERE run_date >= ? AND run_date <= ? AND (? IS NULL OR tool = ?)
+        ORDER BY run_date, prompt_id
+        """,
+        (start_date, end_date, tool, tool),
+    )
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def _retention_batch(conn: sqlite3.Connection, where: str, before: datetime, limit: int) -> list[str]:
+    cur = conn.execute(f"SELECT video_id FROM Videos WHERE fetched_at < ? {where} ORDER BY fetched_at LIMIT ?", (before, limit))
+    return [row[0] for row in cur.fetchall()]
+
+
+def _in(ids: list[str]) -> str:
+    return f"({','.join('?' * len(ids))})"
+
+
+def compress_video_descriptions(conn: sqlite3.Connection, before: datetime, limit: int) -> int:
+    """Move up to `limit` inline descriptions of videos fetched before `before` to VideoDescriptions.
+
+    One short transaction per call. Returns videos moved (0 when nothing is left).
+    """
+    with conn:
+        ids = _retention_batch(conn, "AND description IS NOT NULL", before, limit)
+        if not ids:
+            return 0
+        conn.execute(
+            f"""
+            INSERT INTO VideoDescriptions (video_id, description_gz, moved_at)
+            SELECT video_id, ytm_zip(description), CURRENT_TIMESTAMP FROM Videos WHERE video_id IN {_in(ids)}
+            ON CONFLICT (video_id) DO UPDATE SET description_gz = excluded.description_gz, moved_at = excluded.moved_at
+            """,
+            ids,
+        )
+        conn.execute(f"UPDATE Videos SET description = NULL WHERE video_id IN {_in(ids)}", ids)
+    return len(ids)
+
+
+def archive_videos(conn: sqlite3.Connection, before: datetime, limit: int) -> int:
+    """Move up to `limit` videos fetched before `before` into VideosArchive (description compressed).
+
+    Their side-table rows (VIDEO_SIDE_TABLES) go too. Returns videos moved.
+    """
+    with conn:
+        ids = _retention_batch(conn, "", before, limit)
+        if not ids:
+            return 0
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO VideosArchive
+              (video_id, query, title, description_gz, channel_title, published_at, view_count, like_count,
+               comment_count, duration_seconds, fetched_at, channel_id, archived_at)
+            SELECT v.video_id, v.query, v.title, COALESCE(d.description_gz, ytm_zip(v.description)), v.channel_title,
+                   v.published_at, v.view_count, v.like_count, v.comment_count, v.duration_seconds, v.fetched_at,
+                   v.channel_id, CURRENT_TIMESTAMP
+            FROM Videos v
+            {_VIDEO_RECORD_JOINS}
+            WHERE v.video_id IN {_in(ids)}
+            """,
+            ids,
+        )
+        _delete_videos(conn, ids)
+    return len(ids)
+
+
+def fetch_archivable_videos(conn: sqlite3.Connection, before: datetime, limit: int) -> list[VideoRecord]:
+    """Up to `limit` of the oldest videos fetched before `before`, descriptions decompressed."""
+    cur = conn.execute(
+        f"""
+        SELECT {_VIDEO_RECORD_COLUMNS}
+        FROM Videos v
+        {_VIDEO_RECORD_JOINS}
+        WHERE v.fetched_at < ?
+        ORDER BY v.fetched_at
+        LIMIT ?
+        """,
+        (before, limit),
+    )
+    return [VideoRecord(*row) for row in cur.fetchall()]
+
+
+def delete_videos(conn: sqlite3.Connection, video_ids: Iterable[str]) -> int:
+    """Delete videos (with their VIDEO_SIDE_TABLES rows) once archived elsewhere."""
+    ids = list(video_ids)
+    if not ids:
+        return 0
+    with conn:
+        _delete_videos(conn, ids)
+    return len(ids)
+
+
+def _delete_videos(conn: sqlite3.Connection, ids: list[str]) -> None:
+    for table in (*VIDEO_SIDE_TABLES, "Videos"):
+        conn.execute(f"DELETE FROM {table} WHERE video_id IN {_in(ids)}", ids)
+
+
+def fetch_channels(conn: sqlite3.Connection, channel_ids: Iterable[str]) -> dict[str, dict[str, Any]]:
+    """Cached Channels rows for `channel_ids`, by id (missing ids are simply absent)."""
+    ids = sorted(set(channel_ids))
+    out: dict[str, dict[str, Any]] = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i : i + 500]
+        cur = conn.execute(
+            f"SELECT channel_id, subscriber_count, video_count, view_count, fetched_at FROM Channels WHERE channel_id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        )
+        cols = [c[0] for c in cur.description]
+        out.update((r[0], dict(zip(cols, r))) for r in cur.fetchall())
+    return out
+
+
+def upsert_channels(conn: sqlite3.Connection, rows: list[dict[str, Any]]) -> None:
+    conn.executemany(
+        """
+        INSERT INTO Channels (channel_id, subscriber_count, video_count, view_count, fetched_at) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (channel_id) DO UPDATE SET
+          subscriber_count = excluded.subscriber_count, video_count = excluded.video_count,
+          view_count = excluded.view_count, fetched_at = excluded.fetched_at
+        """,
+        [(r["channel_id"], r.get("subscriber_count"), r.get("video_count"), r.get("view_count"), r["fetched_at"]) for r in rows],
+    )
+    conn.commit()
+
+
+def _scope(run_date_: date, region_code: str | None) -> tuple[str, str, str, dict[str, Any]]:
+    """(FROM clause, WHERE clause, bucket column, named params) selecting a day's videos
+    the way fetch_videos_for_date / fetch_region_videos_for_date do."""
+    if region_code is None:
+        start, end = _day_bounds(run_date_)
+        return "FROM Videos v", "v.fetched_at >= :start AND v.fetched_at < :end", "v.query", {"start": start, "end": end}
+    return (
+        "FROM VideoRegions vr JOIN Videos v ON v.video_id = vr.video_id",
+        "vr.run_date = :run_date AND vr.region_code = :region_code",
+        "vr.query",
+        {"run_date": run_date_, "region_code": region_code},
+    )
+
+
+def fetch_unfingerprinted_videos(conn: sqlite3.Connection, run_date_: date, algo: str, region_code: str | None = None) -> list[VideoRecord]:
+    """The day's videos (one region's with `region_code`) that have no `algo` fingerprint yet."""
+    frm, cond, bucket, params = _scope(run_date_, region_code)
+    cur = conn.execute(
+        f"""
+        SELECT {_VIDEO_RECORD_COLUMNS.replace("v.query", bucket)}
+        {frm}
+        {_VIDEO_RECORD_JOINS}
+        WHERE {cond}
+          AND NOT EXISTS (SELECT 1 FROM VideoFingerprints f WHERE f.video_id = v.video_id AND f.algo = :algo)
+        """,
+        {**params, "algo": algo},
+    )
+    return [VideoRecord(*row) for row in cur.fetchall()]
+
+
+# scoring.compute_video_score as SQL, operation for operation, so results match the
+# Python scorer to the last bit before summing. `base` is the subscriber-free score
+# collapse_duplicates ranks duplicates by.
+_SCORED_VIDEOS = """
+    WITH src AS (
+        SELECT {bucket} AS query, v.video_id, v.title,
+               COALESCE(v.view_count, 0) AS views, COALESCE(v.like_count, 0) AS likes,
+               COALESCE(v.comment_count, 0) AS comments,
+               CAST(strftime('%s', v.fetched_at) AS INTEGER) - CAST(strftime('%s', v.published_at) AS INTEGER) AS age_seconds,
+               c.subscriber_count AS subscribers,
+               CASE WHEN :dedup THEN COALESCE(f.canonical_video_id, v.video_id) ELSE v.video_id END AS dup_group
+        {frm}
+        LEFT JOIN Channels c ON c.channel_id = v.channel_id
+        LEFT JOIN VideoFingerprints f ON f.video_id = v.video_id AND f.algo = :algo
+        WHERE {cond}
+    ),
+    scored AS (
+        SELECT *,
+               CASE WHEN age_seconds IS NULL THEN CAST(views AS REAL)
+                    ELSE log10(views / max(age_seconds / 3600.0, 1.0) + 1.0)
+                         * (1.0 + 2.0 * (CAST(likes AS REAL) / max(views, 1)) + 3.0 * (CAST(comments AS REAL) / max(views, 1)))
+               END AS base
+        FROM src
+    ),
+    kept AS (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY dup_group ORDER BY base DESC, video_id) AS dup_rank
+        FROM scored
+    ),
+    final AS (
+        SELECT COALESCE(NULLIF(query, ''), '(unknown)') AS theme, video_id, title,
+               base + CASE WHEN :weight <> 0 AND subscribers IS NOT NULL
+                           THEN :weight * log10(1.0 + CAST(views AS REAL) / max(subscribers, 1000)) ELSE 0.0 END AS score
+        FROM kept
+        WHERE dup_rank = 1
+    )
+    SELECT theme, video_id, title, score, ROW_NUMBER() OVER (PARTITION BY theme ORDER BY score DESC, video_id) AS theme_rank
+    FROM final
+"""
+
+
+def score_query_themes(
+    conn: sqlite3.Connection,
+    run_date_: date,
+    region_code: str | None = None,
+    *,
+    subscriber_weight: float = 0.0,
+    dedup_algo: str | None = None,
+    write: bool = True,
+) -> list[dict[str, Any]]:
+    """score_themes_by_query for a day's videos, computed in the database.
+
+    Videos are scored and collapsed to one per duplicate group (stored `dedup_algo`
+    fingerprints; None skips that) into a temp table, and themes and their top-5
+    examples are aggregated from it. With `write`, DailyThemes/DailyThemeExamples
+    (or DailyRegionThemes for `region_code`) are replaced like write_daily_themes /
+    write_daily_region_themes would. Returns the theme rows.
+    """
+    frm, cond, bucket, params = _scope(run_date_, region_code)
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS temp.ThemeScores")
+        conn.execute(
+            "CREATE TEMP TABLE ThemeScores AS " + _SCORED_VIDEOS.format(bucket=bucket, frm=frm, cond=cond),
+            {**params, "dedup": dedup_algo is not None, "algo": dedup_algo, "weight": float(subscriber_weight)},
+        )
+        themes = scored_themes(
+            conn.execute("SELECT theme, ROUND(SUM(score), 6) FROM temp.ThemeScores GROUP BY theme").fetchall(),
+            conn.execute(
+                "SELECT theme, video_id, title, ROUND(score, 4) FROM temp.ThemeScores WHERE theme_rank <= 5 ORDER BY theme, theme_rank"
+            ).fetchall(),
+        )
+        if write and region_code is None:
+            conn.execute(
+                """
+                INSERT INTO DailyThemes (run_date, theme, score, examples_json)
+                SELECT ?, theme, ROUND(SUM(score), 6), NULL FROM temp.ThemeScores WHERE true GROUP BY theme
+                ON CONFLICT (run_date, theme) DO UPDATE SET score = excluded.score, examples_json = NULL
+                """,
+                (run_date_,),
+            )
+            conn.execute("DELETE FROM DailyThemeExamples WHERE run_date = ?", (run_date_,))
+            conn.execute(
+                """
+                INSERT INTO DailyThemeExamples (run_date, theme, rank, video_id, score)
+                SELECT ?, theme, theme_rank, video_id, ROUND(score, 4) FROM temp.ThemeScores WHERE theme_rank <= 5
+                """,
+                (run_date_,),
+            )
+        conn.execute("DROP TABLE temp.ThemeScores")
+    if write and region_code is not None:
+        # Regions keep examples inline as JSON; that is a handful of rows per theme.
+        write_daily_region_themes(conn, run_date_, region_code, themes)
+    return themes
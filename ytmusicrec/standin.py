@@ -0,0 +1,309 @@
+"""Record/replay stand-in servers for the external HTTP services (stdlib only).
+
+Each service the pipeline calls (YouTube Data API, Ollama, Discord webhooks,
+Google Sheets) gets a local HTTP server. Point the matching setting at it
+(YOUTUBE_BASE_URL, OLLAMA_BASE_URL, DISCORD_WEBHOOK_URL, GOOGLE_SHEETS_BASE_URL;
+see `env_for`) and the DAG runs with no network:
+
+- record mode forwards every request to the real upstream and appends the
+  exchange to the service's cassette (``<cassette_dir>/<service>.jsonl``);
+- replay mode answers from the cassette, with optional added latency, jitter,
+  injected errors and a requests-per-second cap (`Behavior`).
+
+Secrets never reach a cassette: API keys and tokens are dropped from query
+strings, Authorization headers are not stored, and Discord webhook tokens are
+masked in paths. Replay matches on method, path, the query minus volatile
+parameters (publishedAfter moves every run) and a hash of the body. Requests
+with no exact match get the recorded responses for the same method and path in
+rotation, so a run with new dates or prompts still replays; anything else is a
+404 with the reason.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Service:
+    name: str
+    upstream: str
+    port: int
+    # Env var the pipeline reads, and the path prefix it should carry.
+    env: str
+    env_path: str = ""
+
+
+SERVICES = {
+    "youtube": Service("youtube", "https://www.googleapis.com", 9101, "YOUTUBE_BASE_URL", "/youtube/v3"),
+    "ollama": Service("ollama", "http://host.docker.internal:11434", 9102, "OLLAMA_BASE_URL"),
+    "discord": Service("discord", "https://discord.com", 9103, "DISCORD_WEBHOOK_URL", "/api/webhooks/<id>/<token>"),
+    "sheets": Service("sheets", "https://sheets.googleapis.com", 9104, "GOOGLE_SHEETS_BASE_URL", "/"),
+}
+
+_SECRET_PARAMS = {"key", "access_token"}
+# Left out of the match key: different on every run, irrelevant to the response shape.
+_VOLATILE_PARAMS = {"publishedAfter", "quotaUser"}
+_MASKED_PATHS = [(re.compile(r"^/api/webhooks/[^/]+/[^/?]+"), "/api/webhooks/:id/:token")]
+_TEXT_TYPES = ("application/json", "text/")
+
+
+def mask_path(path: str) -> str:
+    for pattern, repl in _MASKED_PATHS:
+        path = pattern.sub(repl, path)
+    return path
+
+
+def _match_key(method: str, path: str, query: list[tuple[str, str]], body: bytes) -> tuple[str, str, str, str]:
+    params = urlencode(sorted((k, v) for k, v in query if k not in _SECRET_PARAMS and k not in _VOLATILE_PARAMS))
+    return method, path, params, hashlib.sha256(body).hexdigest() if body else ""
+
+
+class Cassette:
+    """Recorded exchanges for one service, in a JSON Lines file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._exact: dict[tuple[str, str, str, str], list[dict[str, Any]]] = defaultdict(list)
+        self._by_path: dict[tuple[str, str], list[dict[str, Any]]] = defaultdict(list)
+        self._turn: dict[Any, int] = defaultdict(int)
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._by_path.values())
+
+    def _index(self, entry: dict[str, Any]) -> None:
+        self._exact[tuple(entry["key"])].append(entry)
+        self._by_path[(entry["method"], entry["path"])].append(entry)
+
+    def _next(self, bucket: Any, entries: list[dict[str, Any]]) -> dict[str, Any]:
+        i = self._turn[bucket]
+        self._turn[bucket] = i + 1
+        return entries[i % len(entries)]
+
+    def find(self, method: str, path: str, query: list[tuple[str, str]], body: bytes) -> dict[str, Any] | None:
+        key = _match_key(method, path, query, body)
+        with self._lock:
+            if self._exact.get(key):
+                return self._next(key, self._exact[key])
+            if self._by_path.get((method, path)):
+                return self._next((method, path), self._by_path[(method, path)])
+        return None
+
+    def record(self, method: str, path: str, query: list[tuple[str, str]], body: bytes, resp: requests.Response, elapsed_ms: float) -> None:
+        content_type = resp.headers.get("Content-Type", "")
+        entry: dict[str, Any] = {
+            "key": list(_match_key(method, path, query, body)),
+            "method": method,
+            "path": path,
+            "query": urlencode([(k, v) for k, v in query if k not in _SECRET_PARAMS]),
+            "status": resp.status_code,
+            "content_type": content_type,
+            "elapsed_ms": round(elapsed_ms, 1),
+        }
+        if content_type.startswith(_TEXT_TYPES):
+            entry["body"] = resp.content.decode(resp.encoding or "utf-8", errors="replace")
+        else:
+            entry["body_b64"] = base64.b64encode(resp.content).decode("ascii")
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._index(entry)
+
+
+@dataclass(frozen=True)
+class Behavior:
+    """How a replaying stand-in misbehaves: latency, injected errors, throughput cap."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Sleep for the upstream time captured in the cassette instead of latency_ms.
+    recorded_latency: bool = False
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Requests per second across all clients; excess requests queue (0 = unlimited).
+    max_rps: float = 0.0
+    seed: int | None = None
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        service: Service,
+        cassette: Cassette,
+        *,
+        host: str = "127.0.0.1",
+        port: int | None = None,
+        record: bool = False,
+        upstream: str | None = None,
+        behavior: Behavior = Behavior(),
+    ) -> None:
+        self.service = service
+        self.cassette = cassette
+        self.record = record
+        self.upstream = (upstream or service.upstream).rstrip("/")
+        self.behavior = behavior
+        self.stats: dict[str, int] = defaultdict(int)
+        self._rng = random.Random(behavior.seed)
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        super().__init__((host, service.port if port is None else port), StandinHandler)
+
+    def delay(self, entry: dict[str, Any]) -> tuple[float, bool]:
+        """Seconds to wait before answering and whether to inject an error."""
+        b = self.behavior
+        with self._lock:
+            wait = 0.0
+            if b.max_rps > 0:
+                now = time.monotonic()
+                slot = max(now, self._next_slot)
+                self._next_slot = slot + 1.0 / b.max_rps
+                wait = slot - now
+            latency = float(entry.get("elapsed_ms") or 0.0) if b.recorded_latency else b.latency_ms
+            if b.jitter_ms:
+                latency = max(latency + self._rng.uniform(-b.jitter_ms, b.jitter_ms), 0.0)
+            fail = b.error_rate > 0 and self._rng.random() < b.error_rate
+        return wait + latency / 1000.0, fail
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandinServer
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._handle()
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._handle()
+
+    def do_PUT(self) -> None:  # noqa: N802
+        self._handle()
+
+    def _handle(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/_standin/stats":
+            self._send(200, "application/json", json.dumps(dict(self.server.stats)).encode("utf-8"))
+            return
+
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        query = parse_qsl(url.query, keep_blank_values=True)
+        path = mask_path(url.path)
+        srv = self.server
+        with srv._lock:
+            srv.stats["requests"] += 1
+
+        if srv.record:
+            self._forward(url, path, query, body)
+            return
+
+        entry = srv.cassette.find(self.command, path, query, body)
+        if entry is None:
+            with srv._lock:
+                srv.stats["misses"] += 1
+            log.warning("%s stand-in: no cassette entry for %s %s", srv.service.name, self.command, path)
+            error = {"error": {"code": 404, "message": f"standin: no cassette entry for {self.command} {path}"}}
+            self._send(404, "application/json", json.dumps(error).encode("utf-8"))
+            return
+
+        wait, fail = srv.delay(entry)
+        if wait > 0:
+            time.sleep(wait)
+        if fail:
+            with srv._lock:
+                srv.stats["injected_errors"] += 1
+            error = {"error": {"code": srv.behavior.error_status, "message": "standin: injected error"}}
+            self._send(srv.behavior.error_status, "application/json", json.dumps(error).encode("utf-8"))
+            return
+        payload = entry["body"].encode("utf-8") if "body" in entry else base64.b64decode(entry.get("body_b64") or "")
+        self._send(int(entry["status"]), entry.get("content_type") or "application/json", payload)
+
+    def _forward(self, url: Any, path: str, query: list[tuple[str, str]], body: bytes) -> None:
+        srv = self.server
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in ("host", "content-length", "accept-encoding", "connection")}
+        t0 = time.perf_counter()
+        try:
+            resp = requests.request(
+                self.command,
+                srv.upstream + url.path,
+                params=query,
+                data=body or None,
+                headers=headers,
+                timeout=300,
+            )
+        except requests.RequestException as e:
+            log.error("%s stand-in: upstream failed: %s", srv.service.name, e)
+            self._send(502, "application/json", json.dumps({"error": {"code": 502, "message": str(e)}}).encode("utf-8"))
+            return
+        srv.cassette.record(self.command, path, query, body, resp, (time.perf_counter() - t0) * 1000)
+        self._send(resp.status_code, resp.headers.get("Content-Type") or "application/octet-stream", resp.content)
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        log.debug("%s - %s", self.address_string(), format % args)
+
+
+def env_for(service: Service, host: str, port: int) -> str:
+    """The setting that points the pipeline at a stand-in, as an env assignment."""
+    return f"{service.env}=http://{host}:{port}{service.env_path}"
+
+
+def start_standins(
+    names: list[str],
+    cassette_dir: Path,
+    *,
+    host: str = "127.0.0.1",
+    base_port: int | None = None,
+    record: bool = False,
+    upstreams: dict[str, str] | None = None,
+    behavior: Behavior = Behavior(),
+) -> list[StandinServer]:
+    """Start one stand-in per service on background threads; call shutdown() on each to stop."""
+    servers = []
+    for i, name in enumerate(names):
+        service = SERVICES[name]
+        server = StandinServer(
+            service,
+            Cassette(Path(cassette_dir) / f"{name}.jsonl"),
+            host=host,
+            port=None if base_port is None else base_port + i,
+            record=record,
+            upstream=(upstreams or {}).get(name),
+            behavior=behavior,
+        )
+        threading.Thread(target=server.serve_forever, name=f"standin-{name}", daemon=True).start()
+        log.info(
+            "%s stand-in on %s (%s, %s recorded exchanges)",
+            name, env_for(service, host, server.server_port), "recording" if record else "replay", len(server.cassette),
+        )
+        servers.append(server)
+    return servers
@@ -0,0 +1,197 @@
+"""Storage backend selection.
+
+A backend is a module exposing the functions in `STORAGE_FUNCTIONS` with the
+signatures of `ytmusicrec.mssql` (each takes the backend's connection first).
+`Settings.storage_backend` picks one:
+
+- ``mssql``  — host SQL Server via pyodbc (production)
+- ``sqlite`` — embedded SQLite file (local backfills, tests, benchmarks)
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from types import ModuleType
+from typing import Any, Iterable
+
+from ytmusicrec.settings import Settings
+
+BACKENDS = {
+    "mssql": "ytmusicrec.mssql",
+    "sqlite": "ytmusicrec.sqlite_store",
+}
+
+STORAGE_FUNCTIONS = (
+    "connect",
+    "ensure_schema",
+    "create_run",
+    "update_run_video_count",
+    "upsert_videos",
+    "fetch_videos_for_date",
+    "write_daily_themes",
+    "write_daily_prompts",
+    "get_cached_video_ids",
+    "set_cached_video_ids",
+    "write_daily_theme_trends",
+    "fetch_daily_themes_range",
+    "fetch_top_themes",
+    "fetch_recent_prompt_hashes",
+    "write_prompt_history",
+    "write_daily_query_stats",
+    "fetch_top_queries",
+    "fetch_query_watermarks",
+    "set_query_watermarks",
+    "fetch_known_video_ids",
+    "fetch_region_video_ids",
+    "fetch_query_bandit_state",
+    "update_query_bandit_state",
+    "fetch_api_key_usage",
+    "add_api_key_usage",
+    "write_video_regions",
+    "fetch_region_videos_for_date",
+    "write_daily_region_themes",
+    "fetch_video_signatures",
+    "write_video_signatures",
+    "fetch_video_fingerprints",
+    "fetch_recent_fingerprints",
+    "write_video_fingerprints",
+    "iter_videos_for_range",
+    "replace_daily_themes_bulk",
+    "replace_daily_theme_trends_bulk",
+    "fetch_daily_theme_trends_range",
+    "fetch_daily_prompts_range",
+    "fetch_daily_theme_examples_range",
+    "compress_video_descriptions",
+    "archive_videos",
+    "fetch_archivable_videos",
+    "delete_videos",
+    "fetch_channels",
+    "upsert_channels",
+    "fetch_unfingerprinted_videos",
+    "score_query_themes",
+    "fetch_video_features",
+    "write_video_features",
+    "write_video_queries",
+    "fetch_query_videos_for_date",
+    "write_daily_profile_themes",
+    "write_daily_profile_prompts",
+    "write_stage_memory",
+    "fetch_stage_memory_range",
+)
+
+# Per-video tables whose rows leave with the video when retention archives it
+# (archive_videos / delete_videos). VideoRegions and VideoQueries rows are looked up by their
+# IX_*_VideoId indexes.
+VIDEO_SIDE_TABLES = (
+    "VideoDescriptions",
+    "VideoSignatures",
+    "VideoFeatures",
+    "VideoFingerprints",
+    "VideoRegions",
+    "VideoQueries",
+)
+
+# StageMemory columns written by write_stage_memory, in insert order (see memprofile.py).
+STAGE_MEMORY_COLUMNS = (
+    "run_date",
+    "stage",
+    "scope",
+    "row_count",
+    "peak_bytes",
+    "retained_bytes",
+    "bytes_per_row",
+    "max_rss_bytes",
+    "seconds",
+    "top_sites_json",
+)
+
+
+@dataclass
+class RunInfo:
+    run_id: int
+    run_date: date
+    region_code: str
+
+
+def prompt_hash(prompt: str) -> bytes:
+    return hashlib.sha256(prompt.strip().encode("utf-8")).digest()
+
+
+def theme_example_params(run_date: date, themes: Iterable[dict[str, Any]]) -> list[tuple[Any, ...]]:
+    """(run_date, theme, rank, video_id, score) rows for DailyThemeExamples."""
+    return [
+        (run_date, t["theme"], rank, ex["video_id"], float(ex["score"]))
+        for t in themes
+        for rank, ex in enumerate(t.get("examples") or (), start=1)
+        if ex.get("video_id")
+    ]
+
+
+def profile_prompt_params(run_date: date, profile: str, prompts: Iterable[dict[str, Any]]) -> list[tuple[Any, ...]]:
+    """(run_date, profile, rank, tool, prompt, theme_tags) rows for DailyProfilePrompts; rank counts within each tool."""
+    ranks: dict[str, int] = defaultdict(int)
+    params = []
+    for p in prompts:
+        tool = (p.get("tool") or "").strip()
+        prompt = (p.get("prompt") or "").strip()
+        if not tool or not prompt:
+            continue
+        ranks[tool] += 1
+        params.append((run_date, profile, ranks[tool], tool, prompt, p.get("theme_tags")))
+    return params
+
+
+def examples_json(t: dict[str, Any]) -> str | None:
+    """JSON blob for tables that still store examples inline (DailyRegionThemes)."""
+    examples = t.get("examples")
+    if examples is None:
+        return t.get("examples_json")
+    return json.dumps(examples, ensure_ascii=False)
+
+
+def attach_examples(themes: list[dict[str, Any]], example_rows: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Set each theme row's `examples` from DailyThemeExamples rows (ordered by rank).
+
+    Rows written before DailyThemeExamples existed fall back to their examples_json blob.
+    """
+    grouped: dict[tuple[Any, str], list[dict[str, Any]]] = defaultdict(list)
+    for r in example_rows:
+        grouped[(r["run_date"], r["theme"])].append({"video_id": r["video_id"], "title": r.get("title") or "", "score": r["score"]})
+    for t in themes:
+        legacy = t.pop("examples_json", None)
+        examples = grouped.get((t["run_date"], t["theme"]))
+        t["examples"] = examples if examples is not None else json.loads(legacy or "[]")
+    return themes
+
+
+def scored_themes(theme_rows: Iterable[tuple[Any, ...]], example_rows: Iterable[tuple[Any, ...]]) -> list[dict[str, Any]]:
+    """score_themes_by_query-shaped rows from (theme, score) and (theme, video_id, title, score) rows.
+
+    Used by the backends' score_query_themes; example rows come ordered by rank.
+    """
+    grouped: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for theme, video_id, title, score in example_rows:
+        grouped[theme].append({"video_id": video_id, "title": title or "", "score": float(score)})
+    themes = [{"theme": theme, "score": float(score), "examples": grouped.get(theme, [])} for theme, score in theme_rows]
+    themes.sort(key=lambda x: x["score"], reverse=True)
+    return themes
+
+
+def load_backend(s: Settings) -> ModuleType:
+    """Import and return the backend module selected by `s.storage_backend`.
+
+    Imported lazily so the sqlite backend works without pyodbc installed.
+    """
+    name = (s.storage_backend or "mssql").lower()
+    if name not in BACKENDS:
+        raise RuntimeError(f"Unknown storage backend {name!r}; expected one of {sorted(BACKENDS)}")
+
+    mod = importlib.import_module(BACKENDS[name])
+    missing = [fn for fn in STORAGE_FUNCTIONS if not callable(getattr(mod, fn, None))]
+    if missing:
+        raise RuntimeError(f"Storage backend {name!r} is missing: {', '.join(missing)}")
+    return mod
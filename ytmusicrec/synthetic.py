@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import random
+import string
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Iterator
+
+from ytmusicrec.prompts import GeneratedPrompts
+from ytmusicrec.records import VideoRecord, to_epoch
+
+# Theme buckets mirror config/queries.yaml so synthetic runs look like real ones.
+DEFAULT_QUERY_NAMES = [
+    "Cyberpunk Synthwave",
+    "Dark Phonk",
+    "Lo-fi Study",
+    "Epic Orchestral",
+    "Chill Gaming",
+    "Drum & Bass",
+    "Liquid DnB",
+    "Future Bass",
+    "EDM Festival",
+    "Melodic Techno",
+    "Deep House",
+    "Trance",
+    "Ambient Soundscape",
+    "Dark Ambient",
+    "Cinematic Tension",
+    "Emotional Piano",
+    "Anime EDM",
+    "J-Pop Remix",
+    "K-Pop Instrumental",
+    "Trap Instrumental",
+    "Boom Bap",
+]
+
+_TITLE_WORDS = [
+    "mix", "beats", "night", "drive", "neon", "rain", "study", "focus", "chill", "epic",
+    "dark", "phonk", "synthwave", "lofi", "remix", "instrumental", "2026", "playlist",
+    "vibes", "sleep", "gaming", "bass", "trance", "ambient", "piano", "hour", "loop",
+    "official", "video", "live", "set", "festival", "cinematic", "tension", "anime",
+]
+_ID_ALPHABET = string.ascii_letters + string.digits + "-_"
+
+
+def _video_id(rng: random.Random) -> str:
+    return "".join(rng.choice(_ID_ALPHABET) for _ in range(11))
+
+
+def _title(rng: random.Random, query_name: str) -> str:
+    words = rng.sample(_TITLE_WORDS, k=rng.randint(3, 7))
+    return f"{query_name} {' '.join(words)}"
+
+
+def generate_video_rows(
+    n: int,
+    *,
+    run_date: date,
+    days_back: int = 5,
+    query_names: list[str] | None = None,
+    seed: int = 0,
+) -> Iterator[VideoRecord]:
+    """Yield `n` records shaped like `youtube.parse_video_row` output.
+
+    Views are log-normal and likes/comments are drawn as ratios of views so that
+    the score distribution resembles real trend data (a few hits, a long tail).
+    """
+    rng = random.Random(seed)
+    names = query_names or DEFAULT_QUERY_NAMES
+    fetched_ts = to_epoch(datetime.combine(run_date, time(9, 0), tzinfo=timezone.utc))
+    window_s = days_back * 86400
+
+    for _ in range(n):
+        query_name = rng.choice(names)
+        views = int(rng.lognormvariate(7.0, 2.2))
+        likes = int(views * rng.uniform(0.005, 0.08))
+        comments = int(views * rng.uniform(0.0, 0.01))
+        row = VideoRecord(
+            video_id=_video_id(rng),
+            query=query_name,
+            title=_title(rng, query_name),
+            description=" ".join(rng.choices(_TITLE_WORDS, k=rng.randint(10, 60))),
+            channel_title=f"channel_{rng.randint(1, max(n // 20, 10))}",
+            published_ts=fetched_ts - rng.randint(600, window_s),
+            view_count=views,
+            like_count=likes if rng.random() > 0.05 else None,
+            comment_count=comments if rng.random() > 0.1 else None,
+            fetched_ts=fetched_ts,
+        )
+        row.channel_id = f"UC{row.channel_title}"
+        yield row
+
+
+def generate_theme_history(
+    *,
+    end_date: date,
+    days: int = 7,
+    themes: list[str] | None = None,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Return fake `DailyThemes` rows ({run_date, theme, score}) for the `days` before `end_date`."""
+    rng = random.Random(seed)
+    names = themes or DEFAULT_QUERY_NAMES
+    base = {t: rng.uniform(5.0, 200.0) for t in names}
+
+    rows: list[dict[str, Any]] = []
+    for offset in range(days, 0, -1):
+        d = end_date - timedelta(days=offset)
+        for t in names:
+            # Random walk so deltas/momentum are non-trivial; some themes skip days.
+            base[t] = max(base[t] * rng.uniform(0.8, 1.25), 0.1)
+            if rng.random() < 0.9:
+                rows.append({"run_date": d, "theme": t, "score": round(base[t], 6)})
+    return rows
+
+
+def generate_prompts(n: int = 12, *, seed: int = 0) -> GeneratedPrompts:
+    """Return a `GeneratedPrompts` with `n` plausible Suno prompts."""
+    rng = random.Random(seed)
+    suno = []
+    for _ in range(n):
+        theme = rng.choice(DEFAULT_QUERY_NAMES)
+        suno.append(
+            {
+                "prompt": f"{theme.lower()}, {' '.join(rng.sample(_TITLE_WORDS, k=6))}, 120 bpm",
+                "tags": rng.sample(_TITLE_WORDS, k=3),
+                "theme": theme,
+            }
+        )
+    return GeneratedPrompts(suno=suno)
@@ -0,0 +1,360 @@
+"""Title-derived theme clustering.
+
+Each video's title words, title bigrams and description hashtags are hashed into
+a shingle set and summarised as a MinHash signature. LSH banding proposes pairs
+of videos that share a band; pairs whose signatures agree on at least
+``min_similarity`` of their slots (an estimate of Jaccard similarity) are kept,
+grouped into star-shaped clusters, and labelled by their highest TF-IDF terms. Free-text description bodies are left out on purpose: they are
+mostly channel boilerplate and links, which glue unrelated uploads together.
+
+Signatures only depend on the video itself, so they are cached per video_id
+(dbo.VideoSignatures) and each run hashes just the videos it has not seen.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import math
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import Any, Iterable
+
+import numpy as np
+
+from ytmusicrec.dedup import FINGERPRINT_ALGO, fingerprint_new_videos
+from ytmusicrec.records import to_epoch
+from ytmusicrec.scoring import score_theme_buckets, score_themes_by_query
+
+log = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Bump when tokenization or hashing changes; cached signatures of other versions are ignored.
+SIGNATURE_ALGO = f"minhash{NUM_PERM}-v1"
+
+_CHUNK_SHINGLES = 250_000
+_MAX_TERMS_CHARS = 1000
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+# Two or more letters/digits, not all digits.
+_TOKEN_RE = re.compile(r"\b(?!\d+\b)[^\W_]{2,}")
+_HASHTAG_RE = re.compile(r"#([^\W_][\w]*)")
+
+# Generic English plus YouTube upload boilerplate; these would glue unrelated videos together.
+STOPWORDS = frozenset(
+    """
+    an and are as at be by for from in into is it its of on or the this that to with
+    you your my our we me
+    official video audio music lyric lyrics hd hq 4k 8k full version ft feat prod
+    mix mixes playlist hour hours hr min mins minutes best new top free no copyright
+    subscribe channel live remastered shorts
+    """.split()
+)
+
+
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(_URL_RE.sub(" ", text.lower())) if t not in STOPWORDS]
+
+
+def video_terms(row: dict[str, Any]) -> tuple[list[str], list[str]]:
+    """Return (title tokens in order, de-duplicated title tokens + description hashtags)."""
+    title = tokenize(row.get("title"))
+    tags = [t for t in _HASHTAG_RE.findall((row.get("description") or "").lower()) if t not in STOPWORDS]
+    return title, list(dict.fromkeys(title + tags))
+
+
+def _shingles(title: list[str], terms: list[str], vocab: dict[str, int]) -> list[int]:
+    ids = []
+    for t in terms:
+        h = vocab.get(t)
+        if h is None:
+            h = vocab[t] = zlib.crc32(t.encode("utf-8"))
+        ids.append(h)
+    # Bigram ids are derived from the unigram ids, so only unigrams are ever hashed.
+    ids.extend((vocab[a] * 0x9E3779B1 + vocab[b]) & 0xFFFFFFFF for a, b in zip(title, title[1:]))
+    return list(set(ids))
+
+
+def _hash_params() -> tuple[np.ndarray, np.ndarray]:
+    # Fixed seed: signatures are persisted, so the permutations must never change.
+    rng = np.random.default_rng(0x5EED)
+    a = rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+_A, _B = _hash_params()
+
+
+def minhash_signatures(shingle_sets: list[list[int]]) -> np.ndarray:
+    """MinHash each shingle set into a (n, NUM_PERM) uint32 matrix.
+
+    Uses multiply-shift hashing, ``((a*x + b) mod 2**64) >> 32``, vectorised over a
+    chunk of videos at a time; empty sets keep the all-ones sentinel row.
+    """
+    n = len(shingle_sets)
+    out = np.full((n, NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    start = 0
+    while start < n:
+        end, total = start, 0
+        while end < n and (total == 0 or total + len(shingle_sets[end]) <= _CHUNK_SHINGLES):
+            total += len(shingle_sets[end])
+            end += 1
+        chunk = shingle_sets[start:end]
+        lengths = np.fromiter((len(s) for s in chunk), dtype=np.int64, count=len(chunk))
+        nonempty = np.flatnonzero(lengths)
+        if nonempty.size:
+            flat = np.fromiter(itertools.chain.from_iterable(chunk), dtype=np.uint64, count=int(lengths.sum()))
+            hashed = ((_A[:, None] * flat[None, :] + _B[:, None]) >> np.uint64(32)).astype(np.uint32)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+            out[start + nonempty] = np.minimum.reduceat(hashed, offsets, axis=1).T
+        start = end
+    return out
+
+
+def compute_signatures(videos: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Rows for write_video_signatures: {video_id, signature (bytes), terms}."""
+    ids: list[str] = []
+    terms_out: list[str] = []
+    shingle_sets: list[list[int]] = []
+    vocab: dict[str, int] = {}
+    for v in videos:
+        title, terms = video_terms(v)
+        ids.append(v["video_id"])
+        terms_out.append(" ".join(terms)[:_MAX_TERMS_CHARS])
+        shingle_sets.append(_shingles(title, terms, vocab))
+
+    sigs = minhash_signatures(shingle_sets).astype("<u4", copy=False)
+    return [{"video_id": vid, "signature": sigs[i].tobytes(), "terms": terms_out[i]} for i, vid in enumerate(ids)]
+
+
+def lsh_clusters(sigs: np.ndarray, *, min_similarity: float = 0.5) -> np.ndarray:
+    """Label each row with the row index of its cluster's leader.
+
+    Candidate pairs come from LSH buckets (each member against the bucket's first
+    row) and are kept if the signatures agree on `min_similarity` of their slots.
+    Clusters are stars rather than connected components: rows are visited in index
+    order, a row next to an existing leader joins the smallest such leader, and
+    any other row becomes a leader. Every member is therefore similar to its
+    leader, and long chains of loosely related titles don't merge into one theme.
+    """
+    n = len(sigs)
+    idx = np.arange(n, dtype=np.int64)
+    if n < 2:
+        return idx
+
+    src: list[np.ndarray] = []
+    dst: list[np.ndarray] = []
+    for band in range(BANDS):
+        # Fold the band's slots into one uint64 bucket key; a rare collision only adds a
+        # candidate pair that the similarity check below throws out.
+        keys = np.zeros(n, dtype=np.uint64)
+        for col in sigs[:, band * ROWS : (band + 1) * ROWS].T:
+            keys = keys * np.uint64(0x100000001B3) ^ col.astype(np.uint64)
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        head = first[inverse.ravel()]
+        pair = np.flatnonzero(head != idx)
+        if pair.size:
+            src.append(pair)
+            dst.append(head[pair])
+    if not src:
+        return idx
+
+    pairs = np.unique(np.concatenate(src) * n + np.concatenate(dst))
+    a, b = pairs // n, pairs % n
+    agree = (sigs[a] == sigs[b]).mean(axis=1) >= min_similarity
+    u = np.concatenate([a[agree], b[agree]])
+    v = np.concatenate([b[agree], a[agree]])
+
+    # Greedy leader election by index, one vectorised round per dependency level.
+    labels = idx.copy()
+    leader = np.zeros(n, dtype=bool)
+    undecided = np.ones(n, dtype=bool)
+    while undecided.any():
+        e = undecided[u] & leader[v]
+        if e.any():
+            best = np.full(n, n, dtype=np.int64)
+            np.minimum.at(best, u[e], v[e])
+            join = undecided & (best < n)
+            labels[join] = best[join]
+            undecided &= ~join
+
+        blocked = np.zeros(n, dtype=bool)
+        blocked[u[undecided[u] & undecided[v] & (v < u)]] = True
+        new = undecided & ~blocked
+        leader |= new
+        undecided &= ~new
+    return labels
+
+
+def _label(members: list[list[str]], df: Counter[str], n_docs: int, label_terms: int) -> str | None:
+    """Top TF-IDF terms of a cluster, in the order they usually appear in titles."""
+    tf: Counter[str] = Counter()
+    pos: defaultdict[str, float] = defaultdict(float)
+    for terms in members:
+        tf.update(terms)
+        for i, t in enumerate(terms):
+            pos[t] += i
+    top = sorted(tf, key=lambda t: (-tf[t] * math.log(n_docs / df[t] + 1.0), pos[t] / tf[t], t))[:label_terms]
+    top.sort(key=lambda t: pos[t] / tf[t])
+    return " ".join(top) if top else None
+
+
+def _canonical_key(v: dict[str, Any]) -> tuple[bool, int, str]:
+    ts = to_epoch(v.get("published_at"))
+    return ts is None, ts or 0, v["video_id"]
+
+
+def cluster_themes(
+    videos: list[dict[str, Any]],
+    signatures: dict[str, dict[str, Any]],
+    *,
+    min_cluster_size: int = 3,
+    label_terms: int = 2,
+    min_similarity: float = 0.5,
+) -> dict[str, str]:
+    """Return {video_id: theme label} for videos in clusters of at least `min_cluster_size`.
+
+    Leaders are elected in row order, so rows are put in a canonical order first
+    (oldest upload first, then video_id): storage returns a day's videos in no
+    particular order, and every video of a run shares its fetched_at.
+    """
+    rows = [signatures[v["video_id"]] for v in sorted(videos, key=_canonical_key) if (signatures.get(v["video_id"]) or {}).get("terms")]
+    if not rows:
+        return {}
+
+    sigs = np.frombuffer(b"".join(r["signature"] for r in rows), dtype="<u4").reshape(len(rows), NUM_PERM)
+    labels = lsh_clusters(sigs, min_similarity=min_similarity)
+
+    terms = [r["terms"].split() for r in rows]
+    df: Counter[str] = Counter()
+    for t in terms:
+        df.update(set(t))
+
+    groups: dict[int, list[int]] = defaultdict(list)
+    for i, lbl in enumerate(labels.tolist()):
+        groups[lbl].append(i)
+
+    out: dict[str, str] = {}
+    for idxs in groups.values():
+        if len(idxs) < min_cluster_size:
+            continue
+        name = _label([terms[i] for i in idxs], df, len(rows), label_terms)
+        if name:
+            for i in idxs:
+                out[rows[i]["video_id"]] = name
+    return out
+
+
+def score_themes_by_cluster(
+    videos: list[dict[str, Any]],
+    signatures: dict[str, dict[str, Any]],
+    *,
+    min_cluster_size: int = 3,
+    label_terms: int = 2,
+    min_similarity: float = 0.5,
+    unclustered: str = "query",
+    subscriber_weight: float = 0.0,
+) -> list[dict[str, Any]]:
+    """Like score_themes_by_query, with emergent title clusters as the themes.
+
+    Videos outside any cluster fall back to their query bucket
+    (``unclustered="query"``) or are left out (``"drop"``).
+    """
+    if unclustered not in ("query", "drop"):
+        raise ValueError(f"Unknown unclustered mode {unclustered!r}")
+
+    theme_of = cluster_themes(
+        videos, signatures, min_cluster_size=min_cluster_size, label_terms=label_terms, min_similarity=min_similarity
+    )
+    pairs = []
+    for v in videos:
+        theme = theme_of.get(v["video_id"])
+        if theme is None:
+            if unclustered == "drop":
+                continue
+            theme = v.get("query") or "(unknown)"
+        pairs.append((theme, v))
+    return score_theme_buckets(pairs, subscriber_weight=subscriber_weight)
+
+
+def theme_method(theme_cfg: dict[str, Any]) -> str:
+    method = theme_cfg.get("method", "query")
+    if method not in ("query", "cluster"):
+        raise ValueError(f"Unknown themes.method {method!r}")
+    return method
+
+
+def theme_engine(theme_cfg: dict[str, Any]) -> str:
+    """``python`` scores fetched rows in the worker; ``sql`` scores in the database (method: query only)."""
+    engine = theme_cfg.get("engine", "python")
+    if engine not in ("python", "sql"):
+        raise ValueError(f"Unknown themes.engine {engine!r}")
+    if engine == "sql" and theme_method(theme_cfg) != "query":
+        raise ValueError("themes.engine: sql only supports method: query")
+    return engine
+
+
+def score_themes(videos: list[dict[str, Any]], theme_cfg: dict[str, Any], signatures: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+    """Score `videos` with the `themes:` settings from queries.yaml.
+
+    For ``method: cluster`` the videos' rows must already be in `signatures` (load_signatures).
+    """
+    subscriber_weight = float(theme_cfg.get("subscriber_weight", 0.0))
+    if theme_method(theme_cfg) == "query":
+        return score_themes_by_query(videos, subscriber_weight=subscriber_weight)
+    return score_themes_by_cluster(
+        videos,
+        signatures,
+        min_cluster_size=int(theme_cfg.get("min_cluster_size", 3)),
+        label_terms=int(theme_cfg.get("label_terms", 2)),
+        unclustered=theme_cfg.get("unclustered", "query"),
+        subscriber_weight=subscriber_weight,
+    )
+
+
+def load_signatures(db: Any, conn: Any, videos: list[dict[str, Any]], known: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Fill `known` with signatures for `videos` from storage, hashing only uncached ones."""
+    want = {v["video_id"] for v in videos} - known.keys()
+    if want:
+        known.update((r["video_id"], r) for r in db.fetch_video_signatures(conn, want, SIGNATURE_ALGO))
+    missing = [v for v in videos if v["video_id"] not in known]
+    if missing:
+        rows = compute_signatures(missing)
+        db.write_video_signatures(conn, rows, SIGNATURE_ALGO)
+        known.update((r["video_id"], r) for r in rows)
+        log.info("Computed %s new video signatures (%s cached)", len(rows), len(videos) - len(rows))
+    return known
+
+
+def score_themes_in_db(
+    db: Any,
+    conn: Any,
+    run_date: Any,
+    theme_cfg: dict[str, Any],
+    dedup_cfg: dict[str, Any],
+    region_code: str | None = None,
+    *,
+    write: bool = True,
+) -> list[dict[str, Any]]:
+    """``engine: sql`` counterpart of fetching the day's videos and calling score_themes.
+
+    Only videos without a stored fingerprint come back to Python (to be
+    fingerprinted); scoring, duplicate collapsing and the top examples run in the
+    database, which also writes the results unless `write` is false.
+    """
+    dedup = dedup_cfg.get("enabled", False)
+    if dedup:
+        fingerprint_new_videos(db, conn, run_date, db.fetch_unfingerprinted_videos(conn, run_date, FINGERPRINT_ALGO, region_code), dedup_cfg)
+    return db.score_query_themes(
+        conn,
+        run_date,
+        region_code,
+        subscriber_weight=float(theme_cfg.get("subscriber_weight", 0.0)),
+        dedup_algo=FINGERPRINT_ALGO if dedup else None,
+        write=write,
+    )
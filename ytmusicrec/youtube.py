@@ -1,120 +1,336 @@
 from __future__ import annotations
 
+import hashlib
 import logging
-from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
-from typing import Any
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Collection, Iterator
+from zoneinfo import ZoneInfo
 
 import requests
 
+from ytmusicrec.httpclient import http_client
+from ytmusicrec.records import VideoRecord, to_epoch
+
 log = logging.getLogger(__name__)
 
+# YouTube Data API v3 quota costs (units per call).
+SEARCH_QUOTA_COST = 100
+VIDEOS_LIST_QUOTA_COST = 1
+CHANNELS_LIST_QUOTA_COST = 1
+DEFAULT_DAILY_QUOTA = 10_000
+
+# Settings.youtube_base_url overrides this, e.g. to point at a stand-in server (standin.py).
+YOUTUBE_BASE_URL = "https://www.googleapis.com/youtube/v3"
+
+# Quota resets at midnight Pacific time, so ledgers are keyed by that calendar day.
+_QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+_QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+
 
 @dataclass(frozen=True)
 class QueryConfig:
     name: str
     q: str
+    # search.list pages to follow for this query; None = max_pages_per_query.
+    max_pages: int | None = None
 
 
 def _iso(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
-def search_videos(
+class QuotaExhausted(RuntimeError):
+    """Every key in the pool is out of quota for today."""
+
+
+@dataclass
+class ApiKey:
+    key: str = field(repr=False)
+    key_id: str
+    daily_limit: int
+    used: int = 0
+    used_at_start: int = 0
+    exhausted: bool = False
+
+    @property
+    def remaining(self) -> int:
+        return 0 if self.exhausted else max(self.daily_limit - self.used, 0)
+
+
+class KeyPool:
+    """YouTube API keys with a per-key quota ledger.
+
+    Calls go to the key with the most quota left, which spreads load across
+    projects; a key that answers quotaExceeded is rotated out for the day.
+    """
+
+    def __init__(self, keys: list[str] | tuple[str, ...], *, daily_limit: int = DEFAULT_DAILY_QUOTA) -> None:
+        unique = list(dict.fromkeys(k for k in keys if k))
+        if not unique:
+            raise RuntimeError("KeyPool needs at least one YouTube API key")
+        self.keys = [ApiKey(key=k, key_id=key_id(k), daily_limit=daily_limit) for k in unique]
+
+    def load_usage(self, usage: dict[str, dict[str, Any]]) -> None:
+        """Seed from the persisted ledger: {key_id: {"units_used": int, "exhausted": bool}}."""
+        for k in self.keys:
+            u = usage.get(k.key_id)
+            if u:
+                k.used = k.used_at_start = int(u.get("units_used") or 0)
+                k.exhausted = bool(u.get("exhausted"))
+
+    def acquire(self, cost: int) -> ApiKey:
+        best = max(self.keys, key=lambda k: k.remaining)
+        if best.remaining < cost:
+            raise QuotaExhausted(f"All {len(self.keys)} YouTube API keys are out of quota for today")
+        return best
+
+    def charge(self, key: ApiKey, cost: int) -> None:
+        key.used += cost
+
+    def mark_exhausted(self, key: ApiKey) -> None:
+        log.warning("YouTube API key %s returned quotaExceeded; rotating it out", key.key_id)
+        key.exhausted = True
+
+    def remaining(self) -> int:
+        return sum(k.remaining for k in self.keys)
+
+    def usage(self) -> list[dict[str, Any]]:
+        """Per-key ledger rows; `units_delta` is what this process spent."""
+        return [
+            {
+                "key_id": k.key_id,
+                "units_used": k.used,
+                "units_delta": k.used - k.used_at_start,
+                "exhausted": k.exhausted,
+            }
+            for k in self.keys
+        ]
+
+
+def key_id(api_key: str) -> str:
+    """Stable, non-secret identifier for logging and the quota ledger."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def quota_day(now: datetime | None = None) -> date:
+    return (now or datetime.now(timezone.utc)).astimezone(_QUOTA_TZ).date()
+
+
+def _is_quota_error(r: requests.Response) -> bool:
+    if r.status_code != 403:
+        return False
+    try:
+        errors = (r.json().get("error") or {}).get("errors") or []
+    except ValueError:
+        return False
+    return any(e.get("reason") in _QUOTA_REASONS for e in errors)
+
+
+def _get(url: str, params: dict[str, Any], *, api_key: str | KeyPool, cost: int) -> dict[str, Any]:
+    """GET a YouTube API endpoint, charging `cost` units to a key from the pool."""
+    pool = api_key if isinstance(api_key, KeyPool) else KeyPool([api_key])
+    while True:
+        key = pool.acquire(cost)
+        r = http_client().get(
+            url,
+            params={**params, "key": key.key},
+            service="youtube",
+            endpoint=f"youtube {url.rsplit('/', 1)[-1]}",
+            # Google charges quota for failed calls (and retried ones) too.
+            on_attempt=lambda: pool.charge(key, cost),
+        )
+        if _is_quota_error(r):
+            pool.mark_exhausted(key)
+            continue
+        if r.status_code != 200:
+            log.error("YouTube API error %s: %s", r.status_code, r.text[:2000])
+        r.raise_for_status()
+        return r.json()
+
+
+def iter_search_pages(
     *,
-    api_key: str,
+    api_key: str | KeyPool,
     query: QueryConfig,
     region_code: str,
     relevance_language: str,
-    max_results: int,
     published_after: datetime,
-) -> list[str]:
-    """Return a list of video ids for a given query."""
-    url = "https://www.googleapis.com/youtube/v3/search"
+    page_size: int = 50,
+    max_pages: int = 1,
+    stop_before: datetime | None = None,
+    known_ids: Collection[str] = (),
+    base_url: str = YOUTUBE_BASE_URL,
+) -> Iterator[list[str]]:
+    """Yield a query's video ids one search.list page at a time, newest first.
+
+    Follows nextPageToken for up to `max_pages` pages (SEARCH_QUOTA_COST each).
+    Results are ordered by date, so a page that reaches a video published before
+    `stop_before` (the query's watermark) or one of `known_ids` is the last one
+    requested: everything further back was collected by an earlier run.
+    """
+    url = base_url.rstrip("/") + "/search"
     params = {
-        "key": api_key,
         "part": "snippet",
         "type": "video",
         "q": query.q,
-        "maxResults": max_results,
+        "maxResults": page_size,
         "regionCode": region_code,
         "relevanceLanguage": relevance_language,
         "publishedAfter": _iso(published_after),
         # "order": "viewCount",  # keep deterministic for recent trends
         "order": "date",
     }
+    stop_ts = to_epoch(stop_before) if stop_before is not None else None
 
-    r = requests.get(url, params=params, timeout=30)
-    if r.status_code != 200:
-        log.error("YouTube API error %s: %s", r.status_code, r.text[:2000])
-    r.raise_for_status()
-    data = r.json()
+    for _ in range(max_pages):
+        data = _get(url, params, api_key=api_key, cost=SEARCH_QUOTA_COST)
 
-    ids: list[str] = []
-    for item in data.get("items", []):
-        vid = (item.get("id") or {}).get("videoId")
-        if vid:
-            ids.append(vid)
+        ids: list[str] = []
+        reached = False
+        for item in data.get("items", []):
+            vid = (item.get("id") or {}).get("videoId")
+            if vid:
+                ids.append(vid)
+                reached = reached or vid in known_ids
+            if stop_ts is not None and not reached:
+                published_ts = _published_ts((item.get("snippet") or {}).get("publishedAt"))
+                reached = published_ts is not None and published_ts < stop_ts
+        yield ids
 
-    return ids
+        token = data.get("nextPageToken")
+        if reached or not token:
+            return
+        params["pageToken"] = token
 
 
-def fetch_video_details(*, api_key: str, video_ids: list[str]) -> list[dict[str, Any]]:
+def search_videos(
+    *,
+    api_key: str | KeyPool,
+    query: QueryConfig,
+    region_code: str,
+    relevance_language: str,
+    max_results: int,
+    published_after: datetime,
+    base_url: str = YOUTUBE_BASE_URL,
+) -> list[str]:
+    """Return a list of video ids for a given query (the first search.list page)."""
+    pages = iter_search_pages(
+        api_key=api_key,
+        query=query,
+        region_code=region_code,
+        relevance_language=relevance_language,
+        published_after=published_after,
+        page_size=max_results,
+        base_url=base_url,
+    )
+    return [vid for page in pages for vid in page]
+
+
+def fetch_video_details(*, api_key: str | KeyPool, video_ids: list[str], base_url: str = YOUTUBE_BASE_URL) -> list[dict[str, Any]]:
     if not video_ids:
         return []
 
-    url = "https://www.googleapis.com/youtube/v3/videos"
+    url = base_url.rstrip("/") + "/videos"
     out: list[dict[str, Any]] = []
 
     # Videos API supports up to 50 ids per request.
     for i in range(0, len(video_ids), 50):
         chunk = video_ids[i : i + 50]
         params = {
-            "key": api_key,
             "part": "snippet,statistics,contentDetails",
             "id": ",".join(chunk),
             "maxResults": len(chunk),
         }
-        r = requests.get(url, params=params, timeout=30)
-            
-        r.raise_for_status()
-        if r.status_code != 200:
-            log.error("YouTube API error %s: %s", r.status_code, r.text[:2000])
-        data = r.json()
+        data = _get(url, params, api_key=api_key, cost=VIDEOS_LIST_QUOTA_COST)
         out.extend(data.get("items", []))
 
     return out
 
 
-def parse_video_row(*, video_item: dict[str, Any], query_name: str, fetched_at: datetime) -> dict[str, Any]:
-    snippet = video_item.get("snippet", {}) or {}
-    stats = video_item.get("statistics", {}) or {}
+def fetch_channel_details(*, api_key: str | KeyPool, channel_ids: list[str], base_url: str = YOUTUBE_BASE_URL) -> list[dict[str, Any]]:
+    if not channel_ids:
+        return []
+
+    url = base_url.rstrip("/") + "/channels"
+    out: list[dict[str, Any]] = []
+
+    # Like videos.list: up to 50 ids per request, 1 unit each.
+    for i in range(0, len(channel_ids), 50):
+        chunk = channel_ids[i : i + 50]
+        params = {
+            "part": "statistics",
+            "id": ",".join(chunk),
+            "maxResults": len(chunk),
+        }
+        data = _get(url, params, api_key=api_key, cost=CHANNELS_LIST_QUOTA_COST)
+        out.extend(data.get("items", []))
+
+    return out
 
-    published_at_raw = snippet.get("publishedAt")
-    published_at: datetime | None = None
-    if published_at_raw:
-        try:
-            published_at = datetime.fromisoformat(published_at_raw.replace("Z", "+00:00")).astimezone(timezone.utc)
-        except Exception:  # noqa: BLE001
-            published_at = None
-
-    def to_int(x: Any) -> int | None:
-        if x is None:
-            return None
-        try:
-            return int(x)
-        except Exception:  # noqa: BLE001
-            return None
 
+def _to_int(x: Any) -> int | None:
+    if x is None:
+        return None
+    try:
+        return int(x)
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def parse_channel_row(*, channel_item: dict[str, Any], fetched_at: datetime) -> dict[str, Any]:
+    """Parse a channels.list item into a Channels row; hidden subscriber counts become None."""
+    stats = channel_item.get("statistics", {}) or {}
     return {
-        "video_id": video_item.get("id"),
-        "query": query_name,
-        "title": snippet.get("title"),
-        "description": snippet.get("description"),
-        "channel_title": snippet.get("channelTitle"),
-        "published_at": published_at,
-        "view_count": to_int(stats.get("viewCount")),
-        "like_count": to_int(stats.get("likeCount")),
-        "comment_count": to_int(stats.get("commentCount")),
+        "channel_id": channel_item.get("id"),
+        "subscriber_count": None if stats.get("hiddenSubscriberCount") else _to_int(stats.get("subscriberCount")),
+        "video_count": _to_int(stats.get("videoCount")),
+        "view_count": _to_int(stats.get("viewCount")),
         "fetched_at": fetched_at,
     }
+
+
+_DURATION_RE = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def parse_iso_duration(value: str | None) -> int | None:
+    """contentDetails.duration ("PT1H2M3S") in seconds; None for missing/live ("P0D") values."""
+    m = _DURATION_RE.match(value or "")
+    if not m:
+        return None
+    d, h, mi, sec = (int(x or 0) for x in m.groups())
+    total = ((d * 24 + h) * 60 + mi) * 60 + sec
+    return total or None
+
+
+def _published_ts(raw: str | None) -> int | None:
+    """snippet.publishedAt ("2026-01-14T00:00:00Z") as epoch seconds."""
+    if not raw:
+        return None
+    try:
+        return to_epoch(datetime.fromisoformat(raw.replace("Z", "+00:00")))
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def parse_video_row(*, video_item: dict[str, Any], query_name: str, fetched_at: datetime | int) -> VideoRecord:
+    """Parse a videos.list item. `fetched_at` may be passed as epoch seconds to skip converting it per row."""
+    snippet = video_item.get("snippet", {}) or {}
+    stats = video_item.get("statistics", {}) or {}
+    details = video_item.get("contentDetails", {}) or {}
+
+    return VideoRecord(
+        video_item.get("id"),
+        query_name,
+        snippet.get("title"),
+        snippet.get("description"),
+        snippet.get("channelTitle"),
+        _published_ts(snippet.get("publishedAt")),
+        _to_int(stats.get("viewCount")),
+        _to_int(stats.get("likeCount")),
+        _to_int(stats.get("commentCount")),
+        parse_iso_duration(details.get("duration")),
+        fetched_at if isinstance(fetched_at, int) else to_epoch(fetched_at),
+        snippet.get("channelId"),
+    )